@@ -0,0 +1,181 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from registry import ContainerRecord
+
+RDP_PORT = 3389
+# États dans /proc/net/tcp (colonne `st`)
+TCP_ESTABLISHED = "01"
+TCP_SYN_RECV = "03"
+TCP_LISTEN = "0A"
+
+
+def rdp_sockets(pid: int, port: int = RDP_PORT) -> List[Tuple[str, str]]:
+    """
+    Sockets TCP de port local `port` (hors écoute) dans l'espace réseau du process `pid`,
+    lus depuis /proc/<pid>/net/tcp{,6} sur l'hôte : ni exec ni outil dans l'image.
+    Retourne des couples (adresse distante, état hexadécimal). Lève OSError si le
+    process n'existe plus ou si /proc n'est pas lisible.
+    """
+    local_suffix = f":{port:04X}"
+    sockets = []
+    for table in ("tcp", "tcp6"):
+        try:
+            with open(f"/proc/{pid}/net/{table}", "r") as f:
+                next(f, None)  # en-tête
+                for line in f:
+                    fields = line.split(None, 4)
+                    # sl local_address rem_address st ...
+                    if len(fields) >= 4 and fields[1].endswith(local_suffix) and fields[3] != TCP_LISTEN:
+                        sockets.append((fields[2], fields[3]))
+        except FileNotFoundError:
+            if table == "tcp":
+                raise
+            # tcp6 absent (IPv6 désactivé) : seulement tcp
+    return sockets
+
+
+def count_established(pid: int, port: int = RDP_PORT) -> int:
+    """Connexions établies sur `port` (local) dans l'espace réseau du process `pid`."""
+    return sum(1 for _, state in rdp_sockets(pid, port) if state == TCP_ESTABLISHED)
+
+
+def net_bytes(pid: int, received_only: bool = False) -> int:
+    """
+    Octets reçus + émis (ou reçus seulement) par les interfaces (hors lo) de l'espace
+    réseau de `pid` : compteurs du veth.
+    """
+    total = 0
+    with open(f"/proc/{pid}/net/dev", "r") as f:
+        for line in f:
+            if ":" not in line:
+                continue  # en-têtes
+            name, counters = line.split(":", 1)
+            if name.strip() == "lo":
+                continue
+            fields = counters.split()
+            # Reçus : octets en 1re colonne ; émis : octets en 9e
+            total += int(fields[0]) if received_only else int(fields[0]) + int(fields[8])
+    return total
+
+
+class ActivityTracker:
+    """
+    Table d'activité RDP des conteneurs en marche.
+
+    Toutes les `interval` secondes, un seul passage lit en parallèle la table TCP
+    de chaque conteneur (PID init du registre) et note la dernière fois qu'une
+    connexion :3389 était établie. L'inactivité se mesure depuis ce moment (ou le
+    démarrage si aucune connexion n'a été vue). Si /proc n'est pas lisible,
+    `fallback_fn(container_id)` est utilisé (None = indéterminé, considéré actif).
+
+    Le même passage relève les compteurs d'octets réseau du conteneur : plus de
+    `traffic_threshold` octets depuis le passage précédent = trafic, daté dans
+    `last_traffic` (une session ouverte mais laissée de côté n'en fait presque pas).
+    """
+
+    def __init__(self, records_fn: Callable[[], List[ContainerRecord]], interval: float,
+                 workers: int = 16, fallback_fn: Optional[Callable[[str], Optional[int]]] = None,
+                 traffic_threshold: int = 4096):
+        self._records_fn = records_fn
+        self._interval = interval
+        self._traffic_threshold = traffic_threshold
+        self._fallback_fn = fallback_fn
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="activity")
+        self._lock = threading.Lock()
+        self._table: Dict[str, Dict] = {}
+        self._thread: Optional[threading.Thread] = None
+        self.last_sweep_seconds = 0.0
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="activity-tracker", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"[ACTIVITY] Erreur: {e}")
+            time.sleep(self._interval)
+
+    def _probe(self, record: ContainerRecord) -> Dict:
+        if record.pid:
+            try:
+                return {"established": count_established(record.pid), "source": "proc",
+                        "net_bytes": net_bytes(record.pid)}
+            except OSError:
+                pass
+        if self._fallback_fn is not None:
+            return {"established": self._fallback_fn(record.id), "source": "exec", "net_bytes": None}
+        return {"established": None, "source": "none", "net_bytes": None}
+
+    def sweep(self) -> Dict[str, Dict]:
+        """Un passage sur tous les conteneurs en marche ; retourne la table à jour."""
+        started = time.perf_counter()
+        records = self._records_fn()
+        probes = list(self._pool.map(self._probe, records))
+        now = time.time()
+        with self._lock:
+            table = {}
+            for record, probe in zip(records, probes):
+                previous = self._table.get(record.id) or {}
+                last_active = previous.get("last_active") or record.started_at or now
+                # Indéterminé (None) : on ne sait pas, donc on considère actif par sécurité
+                if probe["established"] is None or probe["established"] > 0:
+                    last_active = now
+                # Première mesure ou compteurs illisibles : pas de trafic connu, on part de maintenant
+                last_traffic = previous.get("last_traffic") or now
+                bytes_now, bytes_before = probe["net_bytes"], previous.get("net_bytes")
+                if bytes_now is None or bytes_before is None or bytes_now - bytes_before > self._traffic_threshold:
+                    last_traffic = now
+                table[record.id] = {
+                    "name": record.name,
+                    "established": probe["established"],
+                    "source": probe["source"],
+                    "last_active": last_active,
+                    "net_bytes": bytes_now,
+                    "last_traffic": last_traffic,
+                    "checked_at": now,
+                }
+            self._table = table
+            self.last_sweep_seconds = time.perf_counter() - started
+        return table
+
+    def idle_seconds(self, container_id: str) -> Optional[float]:
+        """Secondes depuis la dernière connexion RDP vue ; None si le conteneur n'a pas encore été balayé."""
+        with self._lock:
+            entry = self._table.get(container_id)
+        if entry is None:
+            return None
+        return time.time() - entry["last_active"]
+
+    def traffic_idle_seconds(self, container_id: str) -> Optional[float]:
+        """Secondes sans trafic réseau notable ; None si le conteneur n'a pas encore été balayé."""
+        with self._lock:
+            entry = self._table.get(container_id)
+        if entry is None:
+            return None
+        return time.time() - entry["last_traffic"]
+
+    def touch(self, container_id: str) -> None:
+        """Remet à zéro l'inactivité (session dégelée : elle a une fenêtre complète avant un nouveau gel)."""
+        now = time.time()
+        with self._lock:
+            entry = self._table.get(container_id)
+            if entry is not None:
+                self._table[container_id] = {**entry, "last_active": now, "last_traffic": now, "net_bytes": None}
+
+    def table(self) -> Dict[str, Dict]:
+        now = time.time()
+        with self._lock:
+            return {
+                cid: {**entry, "idle_seconds": round(now - entry["last_active"], 1),
+                      "traffic_idle_seconds": round(now - entry["last_traffic"], 1)}
+                for cid, entry in self._table.items()
+            }
@@ -1,30 +1,69 @@
-import os
 import time
+import secrets
 import threading
-import subprocess
-from flask import Flask, request, jsonify
+import socket
 import psutil
+from flask import Flask, request, jsonify
 
 from config import (
     AGENT_ID, AGENT_PORT, PUBLIC_HOST,
-    RDP_PORT_RANGE_START, RDP_PORT_RANGE_END,
+    PORT_SYNC_INTERVAL_SECONDS,
+    PULL_TIMEOUT_SECONDS, LAUNCH_CONCURRENCY, LAUNCH_MAX_ACTIVE, LAUNCH_TTL_SECONDS,
+    CPU_OVERCOMMIT_RATIO, MEM_OVERCOMMIT_RATIO,
     GPU_ENABLED,
-    CLEANUP_INTERVAL_MINUTES, CONTAINER_IDLE_TIMEOUT_MINUTES
+    CLEANUP_INTERVAL_MINUTES, CONTAINER_IDLE_TIMEOUT_MINUTES,
+    SAMPLE_INTERVAL_SECONDS, CONTAINER_SAMPLE_INTERVAL_SECONDS, SAMPLE_HISTORY,
+    SAMPLE_SHORT_WINDOW_SECONDS, SAMPLE_LONG_WINDOW_SECONDS
 )
 from utils import (
     detect_gpu_capability,
-    pick_free_rdp_port,
     sanitize_image,
-    compute_used_cpu,
-    get_running_managed_containers_count,
+    get_sessions_by_user,
     get_ip_candidate,
-    cleanup_inactive_containers
+    cleanup_inactive_containers,
+    is_managed_container,
+    remove_container,
+    launch_container,
+    list_managed_containers,
+    get_all_managed_containers,
+    registry,
+    activity,
+    freezer,
+    paused_summary,
+    stats,
+    ports,
+    pulls,
+    sync_ports,
+    PortInUseError
 )
+from docker_api import DockerAPIError
+from sampler import ResourceSampler
+from capacity import CapacityLedger
+from launcher import Launch, LaunchExecutor
 
 app = Flask(__name__)
 
 GPU_CAPABLE = detect_gpu_capability() if GPU_ENABLED else False
 
+# Mesures CPU / RAM / conteneurs en tâche de fond ; démarré au premier /info
+sampler = ResourceSampler(
+    SAMPLE_INTERVAL_SECONDS, CONTAINER_SAMPLE_INTERVAL_SECONDS, SAMPLE_HISTORY,
+    SAMPLE_SHORT_WINDOW_SECONDS, SAMPLE_LONG_WINDOW_SECONDS,
+    sessions_fn=get_sessions_by_user,
+    host_fn=lambda: PUBLIC_HOST or get_ip_candidate()
+)
+# Capacité engagée (limites des sessions) face à l'allouable (total x ratio de surengagement)
+capacity = CapacityLedger(
+    sampler.total_cpu, int(psutil.virtual_memory().total / 1024 / 1024),
+    CPU_OVERCOMMIT_RATIO, MEM_OVERCOMMIT_RATIO, committed_fn=registry.committed
+)
+# Chaque changement du registre (événement Docker, lancement, suppression) met à jour l'échantillon courant
+registry.on_change = sampler.refresh_containers
+# Historique max renvoyé par /info?history=N
+INFO_HISTORY_MAX = 300
+# Ports essayés par /execute quand le port attribué se révèle pris par l'hôte
+PORT_ATTEMPTS = 3
+
 # ------------------------------
 # Thread de nettoyage des conteneurs (optionnel)
 # ------------------------------
@@ -38,6 +77,17 @@ def cleanup_loop():
             print(f"[CLEANUP] Erreur nettoyage: {e}")
         time.sleep(CLEANUP_INTERVAL_MINUTES * 60)
 
+# ------------------------------
+# Thread de resynchronisation des ports (sockets ouverts par l'hôte hors agent)
+# ------------------------------
+def port_sync_loop():
+    while True:
+        time.sleep(PORT_SYNC_INTERVAL_SECONDS)
+        try:
+            sync_ports()
+        except Exception as e:
+            print(f"[PORTS] Erreur synchronisation: {e}")
+
 # ------------------------------
 # Routes
 # ------------------------------
@@ -47,25 +97,40 @@ def ping():
 
 @app.route("/info")
 def info():
-    """Retourne l'état temps-réel (remplace l'ancien heartbeat)."""
+    """
+    Retourne l'état (remplace l'ancien heartbeat) depuis le dernier échantillon :
+    pas de mesure ni de fork sur le chemin de la requête.
+    `?history=N` ajoute les N derniers échantillons.
+    """
     try:
-        total_cpu = psutil.cpu_count()
-        used_cpu = compute_used_cpu()
-        vm = psutil.virtual_memory()
-        total_mem_mb = int(vm.total / 1024 / 1024)
-        used_mem_mb = int((vm.total - vm.available) / 1024 / 1024)
-        running_containers = get_running_managed_containers_count()
-        return jsonify({
+        sample = sampler.latest()
+        payload = {
             "agent_id": AGENT_ID,
-            "url": f"http://{PUBLIC_HOST or get_ip_candidate()}:{AGENT_PORT}",
-            "total_cpu": total_cpu,
-            "used_cpu": used_cpu,
-            "total_mem_mb": total_mem_mb,
-            "used_mem_mb": used_mem_mb,
-            "running_containers": running_containers,
+            "url": f"http://{sampler.host}:{AGENT_PORT}",
+            "total_cpu": sampler.total_cpu,
+            "used_cpu": sample["used_cpu"],
+            "total_mem_mb": sample["total_mem_mb"],
+            "used_mem_mb": sample["used_mem_mb"],
+            "running_containers": sample["running_containers"],
+            "sessions_by_user": sample["sessions_by_user"],
             "gpu_capable": GPU_CAPABLE,
-            "ts": int(time.time())
-        })
+            "ts": int(time.time()),
+            # Lissage : moyennes glissantes courte / longue
+            "cpu_avg_short": round(sample["cpu_avg_short"], 2),
+            "cpu_avg_long": round(sample["cpu_avg_long"], 2),
+            "mem_avg_short_mb": sample["mem_avg_short_mb"],
+            "mem_avg_long_mb": sample["mem_avg_long_mb"],
+            "sample_age": sample["age"],
+            "sample_interval": SAMPLE_INTERVAL_SECONDS,
+            # Sessions gelées (comptées aussi dans running_containers / sessions_by_user)
+            **paused_summary(),
+            # Capacité engagée : limites des sessions, allouable et disponible
+            **capacity.snapshot()
+        }
+        history = request.args.get("history", type=int)
+        if history:
+            payload["history"] = sampler.history(min(history, INFO_HISTORY_MAX))
+        return jsonify(payload)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -82,6 +147,7 @@ def execute():
       "memory_limit_mb": 4096,
       "gpu": false
     }
+    `?async=1` (ou `"async": true`) : répond 202 avec un `launch_id` sans attendre le lancement.
     """
     data = request.get_json(force=True, silent=True) or {}
 
@@ -92,7 +158,10 @@ def execute():
 
     username = data["username"].strip()
     password = data["password"].strip()
-    image = sanitize_image(data["image"].strip())
+    try:
+        image = sanitize_image(data["image"])
+    except ValueError as e:
+        return jsonify({"status": "error", "error": str(e)}), 400
     cpu_limit = int(data["cpu_limit"])
     memory_limit_mb = int(data["memory_limit_mb"])
     want_gpu = bool(data["gpu"])
@@ -106,79 +175,203 @@ def execute():
     if want_gpu and not GPU_CAPABLE:
         return jsonify({"status": "error", "error": "GPU demandé mais agent non GPU-capable"}), 400
 
+    # Suffixe aléatoire : deux lancements du même utilisateur dans la même seconde ont des noms (et baux) distincts
+    container_name = f"rdp_{username}_{int(time.time())}-{secrets.token_hex(2)}"
+    # Vérification et réservation atomiques : les /execute concurrents ne dépassent pas l'allouable
+    refusal = capacity.reserve(container_name, cpu_limit, memory_limit_mb)
+    if refusal:
+        return jsonify({"status": "error", "error": f"Capacité insuffisante: {refusal}"}), 409
+
+    launch = launches.submit({
+        "image": image, "name": container_name, "cpu_limit": cpu_limit, "memory_limit_mb": memory_limit_mb,
+        "gpu": want_gpu and GPU_CAPABLE, "username": username, "password": password,
+    })
+    if request.args.get("async", type=int) or data.get("async"):
+        # Mode asynchrone : suivi par GET /launches/<id>
+        return jsonify({"status": "accepted", "launch_id": launch.id, "phase": launch.phase,
+                        "status_url": f"/launches/{launch.id}"}), 202
+    launch.future.result()
+    return jsonify(launch.result), launch.http_status
+
+def run_launch(launch: Launch) -> None:
+    """Exécute un lancement (thread de l'exécuteur) : pull partagé, port, création, démarrage."""
+    p = launch.params
+    container_name = p["name"]
+    # Nom (et bail de port) de l'essai en cours
+    name = container_name
+
+    def on_pull(state):
+        launch.pull = state
+        launch.set_phase("pulling")
+
     try:
-        rdp_port = pick_free_rdp_port(RDP_PORT_RANGE_START, RDP_PORT_RANGE_END)
-        if not rdp_port:
-            return jsonify({"status": "error", "error": "Aucun port RDP disponible"}), 503
-
-        container_name = f"rdp_{username}_{int(time.time())}"
-        script_path = os.path.join(os.path.dirname(__file__), "docker_launch.sh")
-
-        env = os.environ.copy()
-        env["AGENT_ID"] = AGENT_ID
-
-        args = [
-            script_path,
-            image,
-            container_name,
-            str(rdp_port),
-            str(cpu_limit),
-            str(memory_limit_mb),
-            "true" if (want_gpu and GPU_CAPABLE) else "false",
-            username,
-            password
-        ]
-
-        print(f"[EXEC] Lancement container: {args}")
-
-        proc = subprocess.run(
-            args,
-            capture_output=True,
-            text=True,
-            env=env,
-            timeout=120
-        )
-
-        if proc.returncode != 0:
-            print(f"[EXEC] Erreur script: {proc.stderr}")
-            return jsonify({
-                "status": "error",
-                "error": f"Echec lancement: {proc.stderr.strip() or proc.stdout.strip()}"
-            })
-
-        container_id = proc.stdout.strip().splitlines()[-1].strip()
-        host = PUBLIC_HOST or get_ip_candidate()
-
-        return jsonify({
+        try:
+            # Pull auto si image absente (plus de liste blanche), partagé entre lancements de la même image
+            pulls.ensure(p["image"], PULL_TIMEOUT_SECONDS, on_pull=on_pull)
+        except RuntimeError as e:
+            print(f"[EXEC] {e}")
+            launch.finish({"status": "error", "error": f"Echec lancement: {e}"})
+            return
+        if launch.cancelled:
+            launch.finish({"status": "error", "error": "Lancement annulé"})
+            return
+        with launches.start_slot(launch):
+            for attempt in range(PORT_ATTEMPTS):
+                if launch.cancelled:
+                    # Annulé (DELETE /launches/<id>) pendant le pull ou l'attente d'un créneau
+                    launch.finish({"status": "error", "error": "Lancement annulé"})
+                    return
+                # Nom propre à chaque essai : les événements tardifs du conteneur d'un essai raté
+                # (create, destroy) ne touchent pas au bail de l'essai suivant
+                name = container_name if attempt == 0 else f"{container_name}-{attempt}"
+                rdp_port = ports.allocate(name)
+                if not rdp_port:
+                    launch.finish({"status": "error", "error": "Aucun port RDP disponible"}, 503)
+                    return
+                print(f"[EXEC] Lancement container: {p['image']} {name} port={rdp_port} "
+                      f"cpu={p['cpu_limit']} mem={p['memory_limit_mb']}")
+                try:
+                    container_id = launch_container(
+                        p["image"], name, rdp_port, p["cpu_limit"], p["memory_limit_mb"],
+                        p["gpu"], p["username"], p["password"], AGENT_ID
+                    )
+                    break
+                except PortInUseError as e:
+                    # Pris par un process de l'hôte depuis la dernière synchro : exclu, port suivant
+                    print(f"[EXEC] {e}, nouvel essai")
+                    ports.block(rdp_port)
+                except (RuntimeError, DockerAPIError) as e:
+                    ports.release(name)
+                    print(f"[EXEC] Erreur lancement: {e}")
+                    launch.finish({"status": "error", "error": f"Echec lancement: {e}"})
+                    return
+            else:
+                launch.finish({"status": "error", "error": "Aucun port RDP disponible"}, 503)
+                return
+
+        if not launch.finish({
             "status": "ok",
-            "rdp_host": host,
+            "rdp_host": sampler.host,
             "rdp_port": rdp_port,
             "container_id": container_id
-        })
+        }):
+            # Annulé pendant la création : le conteneur n'est rendu à personne
+            print(f"[EXEC] Lancement {launch.id} annulé, suppression de {container_id[:12]}")
+            remove_container(container_id)
+            launch.finish({"status": "error", "error": "Lancement annulé"})
 
-    except subprocess.TimeoutExpired:
-        return jsonify({"status": "error", "error": "Timeout lancement conteneur"})
+    except socket.timeout:
+        ports.release(name)
+        launch.finish({"status": "error", "error": "Timeout lancement conteneur"})
     except Exception as e:
-        return jsonify({"status": "error", "error": f"Exception: {e}"}), 500
+        ports.release(name)
+        launch.finish({"status": "error", "error": f"Exception: {e}"}, 500)
+    finally:
+        # Lancé : le registre compte désormais la session ; sinon : capacité rendue
+        capacity.release(container_name)
+
+# Lancements : pulls partagés, créations/démarrages bornés à LAUNCH_CONCURRENCY
+launches = LaunchExecutor(run_launch, LAUNCH_CONCURRENCY, LAUNCH_MAX_ACTIVE, LAUNCH_TTL_SECONDS)
+
+@app.route("/launches")
+def list_launches():
+    """Lancements en cours et récents (terminés depuis moins de LAUNCH_TTL_SECONDS)."""
+    return jsonify({
+        "launches": [l.to_dict() for l in launches.all()],
+        "executor": launches.status(),
+        "pulls": pulls.status(),
+    })
+
+@app.route("/launches/<launch_id>")
+def get_launch(launch_id):
+    """Phase d'un lancement (`/execute?async=1`) : queued, pulling (progression), creating, started, failed."""
+    launch = launches.get(launch_id)
+    if launch is None:
+        return jsonify({"status": "error", "error": "Lancement inconnu"}), 404
+    return jsonify(launch.to_dict())
+
+@app.route("/launches/<launch_id>", methods=["DELETE"])
+def cancel_launch(launch_id):
+    """
+    Annule un lancement (client qui abandonne : délai dépassé, autre agent retenu).
+    En cours : arrêté au prochain point de contrôle ; déjà démarré : conteneur supprimé.
+    """
+    launch = launches.get(launch_id)
+    if launch is None:
+        return jsonify({"status": "error", "error": "Lancement inconnu"}), 404
+    container_id = launch.cancel()
+    if container_id:
+        try:
+            remove_container(container_id)
+        except Exception as e:
+            return jsonify({"status": "error", "error": f"Suppression de {container_id[:12]} impossible: {e}"}), 500
+    return jsonify(launch.to_dict())
 
 @app.route("/containers")
 def list_containers():
     try:
-        output = subprocess.check_output(
-            ["bash", "-c", "docker ps --format '{{.ID}} {{.Image}} {{.Names}}' --filter 'label=managed_by=rdp_agent'"],
-            text=True
-        )
-        lines = [l for l in output.splitlines() if l.strip()]
-        return jsonify({"containers": lines})
+        payload = {"containers": list_managed_containers()}
+        if request.args.get("details", type=int):
+            # Tous les conteneurs gérés (y compris arrêtés) : limites, port, propriétaire, horodatages
+            payload["details"] = get_all_managed_containers()
+            payload["registry"] = registry.status()
+            payload["ports"] = ports.status()
+            payload["activity"] = activity.table()
+            payload["freezer"] = freezer.status()
+        return jsonify(payload)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/containers/stats")
+def containers_stats():
+    """
+    Télémétrie cgroup v2 de tous les conteneurs en marche en un appel (CPU, mémoire, E/S, PIDs),
+    avec débits depuis le relevé précédent. `?ids=a,b` restreint aux conteneurs demandés.
+    """
+    try:
+        ids = request.args.get("ids")
+        payload = stats.collect(ids.split(",") if ids else None)
+        payload["agent_id"] = AGENT_ID
+        return jsonify(payload)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route("/containers/<container_id>", methods=["DELETE"])
+def delete_container(container_id):
+    """Supprime un conteneur géré par l'agent (ex : lancement perdant côté serveur)."""
+    if not is_managed_container(container_id):
+        return jsonify({"status": "error", "error": "Conteneur inconnu"}), 404
+    try:
+        remove_container(container_id)
+        return jsonify({"status": "ok"})
+    except Exception as e:
+        return jsonify({"status": "error", "error": str(e)}), 500
+
 
-def main():
+_background_started = False
+_background_lock = threading.Lock()
+
+def start_background():
+    """Démarre les threads de fond une seule fois (dev : main() ; prod : hook gunicorn)."""
+    global _background_started
+    with _background_lock:
+        if _background_started:
+            return
+        _background_started = True
+    # Registre d'abord : le premier échantillon compte déjà les sessions existantes
+    registry.start()
+    sampler.start()
+    activity.start()
+    freezer.start()
     # Thread nettoyage (optionnel)
     threading.Thread(target=cleanup_loop, daemon=True).start()
+    threading.Thread(target=port_sync_loop, daemon=True).start()
+
+def main():
+    # Serveur de développement ; en production : gunicorn -c gunicorn.conf.py agent:app
+    start_background()
     print(f"[AGENT] Démarrage agent {AGENT_ID} sur port {AGENT_PORT} (GPU_CAPABLE={GPU_CAPABLE})")
-    app.run(host="0.0.0.0", port=AGENT_PORT)
+    app.run(host="0.0.0.0", port=AGENT_PORT, threaded=True)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,73 @@
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+
+class CapacityLedger:
+    """
+    Capacité engagée de l'agent : somme des limites (`--cpus`, `--memory`) des
+    sessions ouvertes, plus les lancements en cours.
+
+    La capacité allouable est le total de l'hôte multiplié par un ratio de
+    surengagement par ressource. `reserve` vérifie et réserve sous un seul verrou :
+    deux /execute concurrents ne peuvent pas dépasser ensemble l'allouable.
+    Une réservation tient jusqu'à ce que le conteneur soit dans le registre
+    (`committed_fn` le compte alors) puis est libérée par `release`.
+    """
+
+    def __init__(self, total_cpu: float, total_mem_mb: int, cpu_ratio: float, mem_ratio: float,
+                 committed_fn: Callable[[], Tuple[float, int]]):
+        self.total_cpu = total_cpu
+        self.total_mem_mb = total_mem_mb
+        self.cpu_ratio = cpu_ratio
+        self.mem_ratio = mem_ratio
+        self._committed_fn = committed_fn
+        self._lock = threading.Lock()
+        # nom du conteneur -> (cpu, mem_mb) des lancements pas encore dans le registre
+        self._pending: Dict[str, Tuple[float, int]] = {}
+
+    @property
+    def allocatable_cpu(self) -> float:
+        return self.total_cpu * self.cpu_ratio
+
+    @property
+    def allocatable_mem_mb(self) -> int:
+        return int(self.total_mem_mb * self.mem_ratio)
+
+    def _pending_totals(self) -> Tuple[float, int]:
+        return sum(c for c, _ in self._pending.values()), sum(m for _, m in self._pending.values())
+
+    def reserve(self, name: str, cpu: float, mem_mb: int) -> Optional[str]:
+        """Réserve la capacité d'un lancement ; retourne None si accepté, sinon la raison du refus."""
+        with self._lock:
+            committed_cpu, committed_mem = self._committed_fn()
+            pending_cpu, pending_mem = self._pending_totals()
+            free_cpu = self.allocatable_cpu - committed_cpu - pending_cpu
+            free_mem = self.allocatable_mem_mb - committed_mem - pending_mem
+            if cpu > free_cpu:
+                return f"CPU insuffisant : {cpu} demandés, {max(free_cpu, 0):g} allouables"
+            if mem_mb > free_mem:
+                return f"Mémoire insuffisante : {mem_mb} Mo demandés, {max(free_mem, 0)} Mo allouables"
+            self._pending[name] = (cpu, mem_mb)
+            return None
+
+    def release(self, name: str) -> None:
+        with self._lock:
+            self._pending.pop(name, None)
+
+    def snapshot(self) -> Dict:
+        """Champs de /info : engagé (registre), en cours de lancement, allouable et disponible."""
+        with self._lock:
+            committed_cpu, committed_mem = self._committed_fn()
+            pending_cpu, pending_mem = self._pending_totals()
+        return {
+            "committed_cpu": committed_cpu,
+            "committed_mem_mb": committed_mem,
+            "pending_cpu": pending_cpu,
+            "pending_mem_mb": pending_mem,
+            "cpu_overcommit_ratio": self.cpu_ratio,
+            "mem_overcommit_ratio": self.mem_ratio,
+            "allocatable_cpu": round(self.allocatable_cpu, 2),
+            "allocatable_mem_mb": self.allocatable_mem_mb,
+            "available_cpu": round(self.allocatable_cpu - committed_cpu - pending_cpu, 2),
+            "available_mem_mb": self.allocatable_mem_mb - committed_mem - pending_mem,
+        }
@@ -15,6 +15,22 @@ PUBLIC_HOST = os.getenv("PUBLIC_HOST", "")
 # Plage de ports RDP à exposer
 RDP_PORT_RANGE_START = int(os.getenv("RDP_PORT_RANGE_START", "40000"))
 RDP_PORT_RANGE_END = int(os.getenv("RDP_PORT_RANGE_END", "45000"))
+# Bail d'un port attribué dont le conteneur n'est pas encore visible (pull + création)
+PORT_LEASE_SECONDS = float(os.getenv("PORT_LEASE_SECONDS", "300"))
+# Resynchronisation du bitmap de ports avec les sockets en écoute sur l'hôte
+PORT_SYNC_INTERVAL_SECONDS = float(os.getenv("PORT_SYNC_INTERVAL_SECONDS", "60"))
+
+# Lancements : créations/démarrages simultanés, lancements actifs max (pulls compris),
+# délai d'un pull et rétention des lancements terminés (GET /launches/<id>)
+LAUNCH_CONCURRENCY = int(os.getenv("LAUNCH_CONCURRENCY", "4"))
+LAUNCH_MAX_ACTIVE = int(os.getenv("LAUNCH_MAX_ACTIVE", "32"))
+PULL_TIMEOUT_SECONDS = float(os.getenv("PULL_TIMEOUT_SECONDS", "120"))
+LAUNCH_TTL_SECONDS = float(os.getenv("LAUNCH_TTL_SECONDS", "600"))
+
+# Surengagement : capacité allouable = total de l'hôte x ratio (somme des --cpus / --memory des sessions)
+# Les sessions de bureau sont surtout inactives : le CPU se partage, la RAM beaucoup moins
+CPU_OVERCOMMIT_RATIO = float(os.getenv("CPU_OVERCOMMIT_RATIO", "2.0"))
+MEM_OVERCOMMIT_RATIO = float(os.getenv("MEM_OVERCOMMIT_RATIO", "1.0"))
 
 # GPU activé ?
 GPU_ENABLED = os.getenv("GPU_ENABLED", "true").lower() in ("1", "true", "yes")
@@ -23,4 +39,30 @@ GPU_ENABLED = os.getenv("GPU_ENABLED", "true").lower() in ("1", "true", "yes")
 CLEANUP_INTERVAL_MINUTES = int(os.getenv("CLEANUP_INTERVAL_MINUTES", "15"))
 
 # Durée d'inactivité avant suppression (minutes)
-CONTAINER_IDLE_TIMEOUT_MINUTES = int(os.getenv("CONTAINER_IDLE_TIMEOUT_MINUTES", "120"))
\ No newline at end of file
+CONTAINER_IDLE_TIMEOUT_MINUTES = int(os.getenv("CONTAINER_IDLE_TIMEOUT_MINUTES", "120"))
+# Relevé des connexions RDP établies de tous les conteneurs (table d'activité)
+ACTIVITY_SWEEP_INTERVAL_SECONDS = float(os.getenv("ACTIVITY_SWEEP_INTERVAL_SECONDS", "30"))
+# Gel (docker pause) des sessions sans trafic réseau depuis N minutes (0 = désactivé)
+PAUSE_IDLE_MINUTES = float(os.getenv("PAUSE_IDLE_MINUTES", "20"))
+# Octets réseau entre deux relevés en dessous desquels une session est sans trafic (ou reste gelée)
+PAUSE_TRAFFIC_THRESHOLD_BYTES = int(os.getenv("PAUSE_TRAFFIC_THRESHOLD_BYTES", "4096"))
+# Fréquence de surveillance des sessions gelées (dégel à l'arrivée d'un client)
+PAUSE_WAKE_INTERVAL_SECONDS = float(os.getenv("PAUSE_WAKE_INTERVAL_SECONDS", "1"))
+# Échantillonnage des ressources en tâche de fond (/info répond depuis le dernier échantillon)
+SAMPLE_INTERVAL_SECONDS = float(os.getenv("SAMPLE_INTERVAL_SECONDS", "1"))
+# Sessions par utilisateur (lues dans le registre) : relues aussi à chaque changement du registre
+CONTAINER_SAMPLE_INTERVAL_SECONDS = float(os.getenv("CONTAINER_SAMPLE_INTERVAL_SECONDS", "5"))
+# Taille du tampon circulaire (échantillons) et fenêtres des moyennes glissantes
+SAMPLE_HISTORY = int(os.getenv("SAMPLE_HISTORY", "300"))
+SAMPLE_SHORT_WINDOW_SECONDS = float(os.getenv("SAMPLE_SHORT_WINDOW_SECONDS", "10"))
+SAMPLE_LONG_WINDOW_SECONDS = float(os.getenv("SAMPLE_LONG_WINDOW_SECONDS", "60"))
+
+# Télémétrie par conteneur (/containers/stats) : racine cgroup v2 et âge max d'un relevé réutilisé
+CGROUP_ROOT = os.getenv("CGROUP_ROOT", "/sys/fs/cgroup")
+STATS_MIN_INTERVAL_SECONDS = float(os.getenv("STATS_MIN_INTERVAL_SECONDS", "1"))
+
+# Socket du démon Docker (API Engine) ; DOCKER_HOST=unix:///... est aussi accepté
+DOCKER_SOCKET = os.getenv("DOCKER_SOCKET") or (
+    os.getenv("DOCKER_HOST", "")[len("unix://"):] if os.getenv("DOCKER_HOST", "").startswith("unix://")
+    else "/var/run/docker.sock"
+)
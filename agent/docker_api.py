@@ -0,0 +1,268 @@
+import json
+import time
+import queue
+import socket
+import struct
+import calendar
+import http.client
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote, urlencode
+
+DEFAULT_SOCKET = "/var/run/docker.sock"
+# Version d'API minimale visée (Docker 20.10+)
+API_VERSION = "v1.41"
+
+
+class DockerAPIError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(f"Docker API {status}: {message}")
+        self.status = status
+        self.message = message
+
+
+class NotFound(DockerAPIError):
+    pass
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path: str, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self._socket_path = socket_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self._socket_path)
+        self.sock = sock
+
+
+def parse_docker_time(value: str) -> float:
+    """Horodatage Docker (RFC 3339, UTC, nanosecondes) → timestamp Unix ; 0 si absent."""
+    if not value or value.startswith("0001-"):
+        return 0.0
+    return calendar.timegm(time.strptime(value.split(".")[0].rstrip("Z"), "%Y-%m-%dT%H:%M:%S"))
+
+
+def _demux(raw: bytes) -> Tuple[bytes, bytes]:
+    """Sépare stdout/stderr d'un flux multiplexé (exec/logs sans TTY : en-têtes de 8 octets)."""
+    out, err = [], []
+    pos = 0
+    while pos + 8 <= len(raw):
+        stream, size = struct.unpack(">BxxxL", raw[pos:pos + 8])
+        chunk = raw[pos + 8:pos + 8 + size]
+        (err if stream == 2 else out).append(chunk)
+        pos += 8 + size
+    return b"".join(out), b"".join(err)
+
+
+class DockerClient:
+    """
+    Client minimal de l'API Docker Engine sur le socket UNIX.
+
+    Connexions HTTP/1.1 persistantes (pool de `pool_size`) : plus de fork du CLI
+    `docker` ni de parsing de texte ; les réponses sont des dicts (JSON de l'API).
+    Le chemin du socket est paramétrable, ce qui permet de viser un faux démon.
+    """
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET, timeout: float = 30.0, pool_size: int = 4):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._pool: "queue.LifoQueue[_UnixHTTPConnection]" = queue.LifoQueue(maxsize=pool_size)
+
+    # ------------------------------
+    # Transport
+    # ------------------------------
+    def _acquire(self, timeout: float) -> _UnixHTTPConnection:
+        try:
+            conn = self._pool.get_nowait()
+            conn.timeout = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+            return conn
+        except queue.Empty:
+            return _UnixHTTPConnection(self.socket_path, timeout)
+
+    def _release(self, conn: _UnixHTTPConnection, reusable: bool) -> None:
+        if not reusable:
+            conn.close()
+            return
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def request(self, method: str, path: str, params: Optional[Dict[str, Any]] = None,
+                body: Any = None, timeout: Optional[float] = None) -> Tuple[int, bytes]:
+        """Requête brute ; retourne (statut, corps). Une connexion fermée par le démon est rouverte une fois."""
+        url = f"/{API_VERSION}{path}"
+        if params:
+            url += "?" + urlencode({k: v for k, v in params.items() if v is not None})
+        headers = {"Host": "docker"}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        for attempt in (1, 2):
+            conn = self._acquire(timeout or self.timeout)
+            reused = conn.sock is not None
+            try:
+                conn.request(method, url, body=payload, headers=headers)
+                resp = conn.getresponse()
+                data = resp.read()
+            except (ConnectionError, http.client.RemoteDisconnected, http.client.BadStatusLine):
+                conn.close()
+                # Connexion keep-alive expirée côté démon : on réessaie sur une neuve
+                if reused and attempt == 1:
+                    continue
+                raise
+            except Exception:
+                conn.close()
+                raise
+            self._release(conn, not resp.will_close)
+            return resp.status, data
+        raise ConnectionError("Docker injoignable")
+
+    def _call(self, method: str, path: str, params: Optional[Dict[str, Any]] = None,
+              body: Any = None, timeout: Optional[float] = None, expect_json: bool = True):
+        status, data = self.request(method, path, params, body, timeout)
+        if status >= 400:
+            try:
+                message = json.loads(data).get("message", "")
+            except ValueError:
+                message = data.decode(errors="replace")
+            raise (NotFound if status == 404 else DockerAPIError)(status, message)
+        if expect_json and data:
+            return json.loads(data)
+        return data
+
+    # ------------------------------
+    # Conteneurs
+    # ------------------------------
+    def ping(self) -> bool:
+        return self._call("GET", "/_ping", expect_json=False) == b"OK"
+
+    def list_containers(self, all: bool = False, labels: Optional[List[str]] = None) -> List[Dict]:
+        """Équivalent de `docker ps [-a] --filter label=...` (format de l'API : Id, Names, Labels, State, Created...)."""
+        filters = json.dumps({"label": labels}) if labels else None
+        return self._call("GET", "/containers/json", {"all": int(all), "filters": filters})
+
+    def inspect_container(self, container_id: str) -> Dict:
+        return self._call("GET", f"/containers/{quote(container_id, safe='')}/json")
+
+    def create_container(self, name: str, config: Dict) -> str:
+        result = self._call("POST", "/containers/create", {"name": name}, body=config)
+        return result["Id"]
+
+    def start_container(self, container_id: str) -> None:
+        self._call("POST", f"/containers/{quote(container_id, safe='')}/start", expect_json=False)
+
+    def stop_container(self, container_id: str, timeout: int = 10) -> None:
+        # 304 si déjà arrêté : pas une erreur
+        self._call("POST", f"/containers/{quote(container_id, safe='')}/stop",
+                   {"t": timeout}, timeout=self.timeout + timeout, expect_json=False)
+
+    def pause_container(self, container_id: str) -> None:
+        """`docker pause` : gèle tous les process du conteneur (freezer du cgroup)."""
+        self._call("POST", f"/containers/{quote(container_id, safe='')}/pause", expect_json=False)
+
+    def unpause_container(self, container_id: str) -> None:
+        self._call("POST", f"/containers/{quote(container_id, safe='')}/unpause", expect_json=False)
+
+    def remove_container(self, container_id: str, force: bool = False) -> None:
+        self._call("DELETE", f"/containers/{quote(container_id, safe='')}",
+                   {"force": int(force)}, timeout=self.timeout + 30, expect_json=False)
+
+    def prune_containers(self, labels: Optional[List[str]] = None, until: Optional[str] = None) -> Dict:
+        filters: Dict[str, List[str]] = {}
+        if labels:
+            filters["label"] = labels
+        if until:
+            filters["until"] = [until]
+        return self._call("POST", "/containers/prune", {"filters": json.dumps(filters) if filters else None})
+
+    def exec_run(self, container_id: str, cmd: List[str], timeout: Optional[float] = None) -> Tuple[int, str, str]:
+        """Équivalent de `docker exec` : retourne (code retour, stdout, stderr)."""
+        created = self._call("POST", f"/containers/{quote(container_id, safe='')}/exec", body={
+            "Cmd": cmd, "AttachStdout": True, "AttachStderr": True, "Tty": False
+        })
+        exec_id = created["Id"]
+        raw = self._call("POST", f"/exec/{exec_id}/start", body={"Detach": False, "Tty": False},
+                         timeout=timeout, expect_json=False)
+        out, err = _demux(raw)
+        info = self._call("GET", f"/exec/{exec_id}/json")
+        exit_code = info.get("ExitCode")
+        return (exit_code if exit_code is not None else -1), out.decode(errors="replace"), err.decode(errors="replace")
+
+    # ------------------------------
+    # Images
+    # ------------------------------
+    def image_exists(self, image: str) -> bool:
+        try:
+            self._call("GET", f"/images/{quote(image, safe='')}/json")
+            return True
+        except NotFound:
+            return False
+
+    def pull_image(self, image: str, timeout: Optional[float] = None,
+                   progress: Optional[Callable[[Dict], None]] = None) -> None:
+        """
+        `docker pull` : la réponse est un flux JSON de progression, lu au fil de l'eau
+        (`progress(événement)` pour chaque ligne) ; une entrée `error` = échec.
+        """
+        name, tag = image, None
+        if "@" not in image:
+            last = image.rsplit("/", 1)[-1]
+            if ":" in last:
+                name, tag = image.rsplit(":", 1)
+            else:
+                tag = "latest"
+        deadline = time.monotonic() + (timeout or self.timeout)
+        for event in self._stream("POST", "/images/create", {"fromImage": name, "tag": tag},
+                                  timeout=timeout or self.timeout):
+            if "error" in event:
+                raise DockerAPIError(500, event["error"])
+            if progress is not None:
+                progress(event)
+            if time.monotonic() > deadline:
+                raise socket.timeout(f"Pull de {image} : délai de {timeout or self.timeout:g}s dépassé")
+
+    # ------------------------------
+    # Événements
+    # ------------------------------
+    def _stream(self, method: str, path: str, params: Optional[Dict[str, Any]] = None,
+                timeout: Optional[float] = None) -> Iterator[Dict]:
+        """
+        Réponse en flux JSON (une entrée par ligne) sur une connexion dédiée, lue au fil de l'eau.
+        `timeout` borne chaque lecture (None = pas de limite une fois connecté).
+        """
+        url = f"/{API_VERSION}{path}"
+        if params:
+            url += "?" + urlencode({k: v for k, v in params.items() if v is not None})
+        conn = _UnixHTTPConnection(self.socket_path, self.timeout)
+        try:
+            conn.request(method, url, headers={"Host": "docker"})
+            resp = conn.getresponse()
+            if resp.status >= 400:
+                data = resp.read()
+                try:
+                    message = json.loads(data).get("message", "")
+                except ValueError:
+                    message = data.decode(errors="replace")
+                raise (NotFound if resp.status == 404 else DockerAPIError)(resp.status, message)
+            conn.sock.settimeout(timeout)
+            for line in resp:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+        finally:
+            conn.close()
+
+    def events(self, filters: Optional[Dict[str, List[str]]] = None, since: Optional[float] = None) -> Iterator[Dict]:
+        """
+        Flux `docker events` (un dict par événement), sans timeout de lecture : le flux
+        peut rester muet longtemps. Se termine (StopIteration) si le démon ferme le flux.
+        """
+        return self._stream("GET", "/events", {
+            "filters": json.dumps(filters) if filters else None,
+            "since": f"{since:.9f}" if since is not None else None,
+        }, timeout=None)
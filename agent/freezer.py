@@ -0,0 +1,132 @@
+import time
+import threading
+from typing import Dict, Optional, Set, Tuple
+
+from activity import ActivityTracker, TCP_ESTABLISHED, TCP_SYN_RECV, net_bytes, rdp_sockets
+from docker_api import DockerClient
+from registry import ContainerRegistry
+
+
+class SessionFreezer:
+    """
+    Gèle (`docker pause`) les sessions sans trafic réseau depuis `pause_after`
+    secondes et les dégèle dès qu'un client revient.
+
+    Un conteneur gelé garde sa pile réseau : le noyau accepte toujours les connexions
+    sur :3389 et compte les octets reçus. Toutes les `wake_interval` secondes, on
+    relit donc /proc/<pid>/net pour chaque session gelée : une connexion absente au
+    moment du gel (nouvelle connexion RDP) ou plus de `wake_bytes` octets reçus depuis
+    le relevé précédent (client resté ouvert qui se réveille) la dégèlent. Le compteur
+    de référence avance à chaque relevé : le bruit de fond (ARP, broadcast, keepalive)
+    ne s'accumule pas jusqu'au seuil.
+    """
+
+    def __init__(self, docker: DockerClient, registry: ContainerRegistry, activity: ActivityTracker,
+                 pause_after: float, wake_interval: float = 1.0, wake_bytes: int = 4096):
+        self._docker = docker
+        self._registry = registry
+        self._activity = activity
+        self._pause_after = pause_after
+        self._wake_interval = wake_interval
+        self._wake_bytes = wake_bytes
+        self._lock = threading.Lock()
+        # id -> (connexions :3389 au moment du gel, octets reçus au relevé précédent)
+        self._baselines: Dict[str, Tuple[Set[str], int]] = {}
+        self._thread: Optional[threading.Thread] = None
+        self.paused_total = 0
+        self.resumed_total = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._pause_after > 0
+
+    def start(self) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="session-freezer", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"[FREEZER] Erreur: {e}")
+            time.sleep(self._wake_interval)
+
+    def tick(self) -> None:
+        for record in self._registry.running():
+            if record.paused:
+                if self._should_wake(record.id, record.pid):
+                    self.resume(record.id)
+            else:
+                idle = self._activity.traffic_idle_seconds(record.id)
+                if idle is not None and idle > self._pause_after:
+                    self.pause(record.id, record.pid)
+
+    def _snapshot(self, pid: int) -> Tuple[Set[str], int]:
+        peers = {remote for remote, state in rdp_sockets(pid) if state in (TCP_ESTABLISHED, TCP_SYN_RECV)}
+        return peers, net_bytes(pid, received_only=True)
+
+    def _should_wake(self, container_id: str, pid: int) -> bool:
+        with self._lock:
+            baseline = self._baselines.get(container_id)
+        try:
+            peers, total = self._snapshot(pid)
+        except OSError:
+            # /proc illisible : impossible de voir un client arriver, on ne laisse pas la session gelée
+            return True
+        if baseline is None:
+            # Gelée hors de l'agent ou avant son redémarrage : l'état actuel sert de référence
+            with self._lock:
+                self._baselines[container_id] = (peers, total)
+            return False
+        # Connexions : comparées au moment du gel ; octets : depuis le relevé précédent
+        with self._lock:
+            self._baselines[container_id] = (baseline[0], total)
+        return bool(peers - baseline[0]) or total - baseline[1] > self._wake_bytes
+
+    def pause(self, container_id: str, pid: int) -> bool:
+        try:
+            # Référence prise avant le gel : rien ne doit échapper entre les deux
+            baseline = self._snapshot(pid)
+        except OSError as e:
+            print(f"[FREEZER] {container_id[:12]} : /proc illisible ({e}), pas de gel")
+            return False
+        try:
+            self._docker.pause_container(container_id)
+        except Exception as e:
+            print(f"[FREEZER] Gel de {container_id[:12]} impossible: {e}")
+            return False
+        with self._lock:
+            self._baselines[container_id] = baseline
+        self.paused_total += 1
+        print(f"[FREEZER] Session {container_id[:12]} gelée (pas de trafic depuis {int(self._pause_after // 60)} min)")
+        self._registry.track(container_id)
+        return True
+
+    def resume(self, container_id: str) -> bool:
+        try:
+            self._docker.unpause_container(container_id)
+        except Exception as e:
+            print(f"[FREEZER] Dégel de {container_id[:12]} impossible: {e}")
+            return False
+        with self._lock:
+            self._baselines.pop(container_id, None)
+        self._activity.touch(container_id)
+        self.resumed_total += 1
+        print(f"[FREEZER] Session {container_id[:12]} dégelée (client de retour)")
+        self._registry.track(container_id)
+        return True
+
+    def status(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "pause_after": self._pause_after,
+            "paused": len(self._registry.paused()),
+            "paused_total": self.paused_total,
+            "resumed_total": self.resumed_total,
+        }
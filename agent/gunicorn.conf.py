@@ -0,0 +1,34 @@
+# Configuration gunicorn de l'agent (mode production)
+# Lancement : gunicorn -c gunicorn.conf.py agent:app
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+bind = f"0.0.0.0:{os.getenv('AGENT_PORT', '5001')}"
+
+# Un seul processus : le thread de nettoyage et l'état de l'agent ne doivent
+# exister qu'une fois par machine. La concurrence passe par les threads.
+workers = 1
+worker_class = "gthread"
+# Un /execute peut bloquer jusqu'à ~2 min (docker pull) : prévoir assez de threads
+threads = int(os.getenv("AGENT_THREADS", "32"))
+
+preload_app = False
+
+# Arrêt propre : SIGTERM → les lancements en cours ont graceful_timeout secondes pour finir
+graceful_timeout = int(os.getenv("AGENT_GRACEFUL_TIMEOUT", "150"))
+timeout = 180
+keepalive = 30  # le serveur garde ses connexions vers l'agent ouvertes
+
+# Recyclage du worker après N requêtes (0 = désactivé)
+max_requests = int(os.getenv("AGENT_MAX_REQUESTS", "0"))
+max_requests_jitter = max(max_requests // 10, 0)
+
+errorlog = "-"
+
+
+def post_worker_init(worker):
+    from agent import start_background
+    start_background()
@@ -0,0 +1,256 @@
+import time
+import secrets
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from docker_api import DockerClient
+
+class PullState:
+    """
+    Un `docker pull` en cours, partagé par tous les lancements qui attendent cette image.
+    La progression vient du flux de /images/create : une entrée par couche (`id`).
+    """
+
+    def __init__(self, image: str):
+        self.image = image
+        self.started_at = time.time()
+        self.done = threading.Event()
+        self.error: Optional[str] = None
+        self.waiters = 1
+        # couche -> (octets téléchargés, taille), et couches terminées
+        self._layers: Dict[str, Tuple[int, int]] = {}
+        self._complete: set = set()
+
+    def update(self, event: Dict) -> None:
+        layer = event.get("id")
+        status = event.get("status", "")
+        # Lignes globales (`Pulling from`, `Digest`, `Status`) : pas de couche
+        if not layer or status.startswith("Pulling from"):
+            return
+        current, total = self._layers.get(layer, (0, 0))
+        detail = event.get("progressDetail") or {}
+        if status == "Downloading":
+            current, total = detail.get("current", current), detail.get("total", total)
+        elif status in ("Download complete", "Verifying Checksum"):
+            current = total
+        elif status in ("Pull complete", "Already exists"):
+            current = total
+            self._complete.add(layer)
+        self._layers[layer] = (current, total)
+
+    def progress(self) -> Dict[str, Any]:
+        layers = list(self._layers.values())
+        return {
+            "image": self.image,
+            "layers_done": len(self._complete),
+            "layers_total": len(layers),
+            "bytes_done": sum(c for c, _ in layers),
+            "bytes_total": sum(t for _, t in layers),
+            "waiters": self.waiters,
+            "elapsed": round(time.time() - self.started_at, 1),
+        }
+
+
+class PullTable:
+    """
+    Pulls « single-flight » : un seul `docker pull` par image à la fois, les lancements
+    concurrents de la même image attendent ce pull au lieu d'en démarrer un chacun.
+    Le premier demandeur exécute le pull dans son thread ; un échec est rendu à tous
+    les demandeurs en attente (pas de nouvelle rafale de pulls sur la même erreur).
+    """
+
+    def __init__(self, docker: DockerClient):
+        self._docker = docker
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, PullState] = {}
+        self.pulls_total = 0
+        self.joined_total = 0
+
+    def ensure(self, image: str, timeout: float, on_pull: Optional[Callable[[PullState], None]] = None) -> None:
+        """
+        Retourne quand `image` est présente. `on_pull(état)` est appelé si un pull est
+        nécessaire (lancé ou rejoint). Lève RuntimeError si le pull échoue ou dépasse `timeout`.
+        """
+        if self._docker.image_exists(image):
+            return
+        with self._lock:
+            state = self._inflight.get(image)
+            leader = state is None
+            if leader:
+                state = self._inflight[image] = PullState(image)
+                self.pulls_total += 1
+            else:
+                state.waiters += 1
+                self.joined_total += 1
+        if on_pull is not None:
+            on_pull(state)
+        if leader:
+            try:
+                print(f"[PULL] {image}")
+                self._docker.pull_image(image, timeout=timeout, progress=state.update)
+            except Exception as e:
+                state.error = str(e) or e.__class__.__name__
+            finally:
+                with self._lock:
+                    self._inflight.pop(image, None)
+                state.done.set()
+        elif not state.done.wait(timeout):
+            raise RuntimeError(f"Pull de {image} : délai de {timeout:g}s dépassé")
+        if state.error:
+            raise RuntimeError(f"Pull de {image} impossible: {state.error}")
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            inflight = [s.progress() for s in self._inflight.values()]
+        return {"inflight": inflight, "pulls_total": self.pulls_total, "joined_total": self.joined_total}
+
+
+class Launch:
+    """
+    Un lancement de conteneur suivi de la soumission jusqu'à son résultat.
+    Phases : queued -> pulling (image absente) -> queued (créneau) -> creating -> started,
+    ou failed à n'importe quelle étape. `cancel` (DELETE /launches/<id>) arrête un
+    lancement en cours au prochain point de contrôle, ou désigne le conteneur à
+    supprimer s'il a déjà démarré.
+    """
+
+    def __init__(self, params: Dict[str, Any]):
+        self.id = secrets.token_hex(8)
+        self.params = params
+        self.phase = "queued"
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        # phase -> horodatage d'entrée
+        self.history: Dict[str, float] = {"queued": self.created_at}
+        self.pull: Optional[PullState] = None
+        # Réponse de /execute et son code HTTP, posés en fin de lancement
+        self.result: Optional[Dict[str, Any]] = None
+        self.http_status = 200
+        self.future: Optional[Future] = None
+        self.cancelled = False
+        self._lock = threading.Lock()
+
+    def set_phase(self, phase: str) -> None:
+        self.phase = phase
+        self.history[phase] = time.time()
+
+    def finish(self, result: Dict[str, Any], http_status: int = 200) -> bool:
+        """
+        Pose le résultat. Retourne False (résultat non posé) pour un succès arrivé
+        après une annulation : l'appelant supprime alors le conteneur.
+        """
+        with self._lock:
+            if self.cancelled and result.get("status") == "ok":
+                return False
+            self._set_result(result, http_status)
+            return True
+
+    def _set_result(self, result: Dict[str, Any], http_status: int) -> None:
+        self.result, self.http_status = result, http_status
+        self.finished_at = time.time()
+        self.set_phase("started" if result.get("status") == "ok" else "failed")
+
+    def cancel(self) -> Optional[str]:
+        """
+        Annule le lancement. Retourne l'ID du conteneur à supprimer s'il avait déjà
+        démarré (le lancement passe alors en failed), None sinon.
+        """
+        with self._lock:
+            self.cancelled = True
+            if not self.finished or self.result.get("status") != "ok":
+                return None
+            container_id = self.result.get("container_id")
+            self._set_result({"status": "error", "error": "Lancement annulé"}, 200)
+            return container_id
+
+    @property
+    def finished(self) -> bool:
+        return self.finished_at is not None
+
+    def to_dict(self) -> Dict[str, Any]:
+        payload = {
+            "launch_id": self.id,
+            "phase": self.phase,
+            "image": self.params.get("image"),
+            "name": self.params.get("name"),
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "cancelled": self.cancelled,
+            "history": {p: round(t, 3) for p, t in self.history.items()},
+        }
+        if self.pull is not None:
+            payload["pull"] = self.pull.progress()
+        if self.result is not None:
+            payload["result"] = self.result
+        return payload
+
+
+class LaunchExecutor:
+    """
+    Exécuteur des lancements de l'agent.
+
+    Chaque lancement tourne dans un pool de `max_active` threads ; les pulls passent par
+    la table single-flight et ne sont pas bornés par `concurrency`, seule la création et
+    le démarrage des conteneurs le sont (`start_slot`) : un pull lent ne bloque pas les
+    lancements d'images déjà présentes. Les lancements terminés restent consultables
+    `ttl` secondes (GET /launches/<id>).
+    """
+
+    def __init__(self, run_fn: Callable[[Launch], None], concurrency: int = 4, max_active: int = 32,
+                 ttl: float = 600):
+        self._run_fn = run_fn
+        self._slots = threading.BoundedSemaphore(max(1, concurrency))
+        self._pool = ThreadPoolExecutor(max_workers=max(1, max_active), thread_name_prefix="launch")
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._launches: Dict[str, Launch] = {}
+        self.concurrency = max(1, concurrency)
+        self.max_active = max(1, max_active)
+
+    def submit(self, params: Dict[str, Any]) -> Launch:
+        launch = Launch(params)
+        with self._lock:
+            self._prune()
+            self._launches[launch.id] = launch
+        launch.future = self._pool.submit(self._run, launch)
+        return launch
+
+    def _run(self, launch: Launch) -> None:
+        try:
+            self._run_fn(launch)
+        except Exception as e:
+            launch.finish({"status": "error", "error": f"Exception: {e}"}, 500)
+        if not launch.finished:
+            launch.finish({"status": "error", "error": "Lancement interrompu"}, 500)
+
+    @contextmanager
+    def start_slot(self, launch: Launch) -> Iterator[None]:
+        """Créneau de création/démarrage (phase `creating` tant qu'il est tenu)."""
+        launch.set_phase("queued")
+        with self._slots:
+            launch.set_phase("creating")
+            yield
+
+    def get(self, launch_id: str) -> Optional[Launch]:
+        with self._lock:
+            return self._launches.get(launch_id)
+
+    def all(self) -> List[Launch]:
+        with self._lock:
+            self._prune()
+            return list(self._launches.values())
+
+    def _prune(self) -> None:
+        now = time.time()
+        expired = [i for i, l in self._launches.items() if l.finished and now - l.finished_at > self._ttl]
+        for launch_id in expired:
+            del self._launches[launch_id]
+
+    def status(self) -> Dict[str, Any]:
+        launches = self.all()
+        by_phase: Dict[str, int] = {}
+        for launch in launches:
+            by_phase[launch.phase] = by_phase.get(launch.phase, 0) + 1
+        return {"concurrency": self.concurrency, "max_active": self.max_active, "by_phase": by_phase}
@@ -0,0 +1,144 @@
+import time
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+import psutil
+
+
+def host_listening_ports(start: int, end: int) -> set:
+    """Ports TCP en écoute sur l'hôte dans [start, end] (hors conteneurs connus ou non)."""
+    ports = set()
+    try:
+        for conn in psutil.net_connections(kind="tcp"):
+            if conn.status == psutil.CONN_LISTEN and conn.laddr and start <= conn.laddr.port <= end:
+                ports.add(conn.laddr.port)
+    except (psutil.AccessDenied, OSError) as e:
+        print(f"[PORTS] Lecture des sockets en écoute impossible: {e}")
+    return ports
+
+
+class PortAllocator:
+    """
+    Attribution des ports RDP par bitmap sur la plage [start, end].
+
+    Bit i à 1 = port start+i pris (session connue, bail en cours ou socket de l'hôte).
+    `allocate` cherche le premier bit libre après le dernier port donné (next-fit,
+    pour ne pas réutiliser tout de suite un port qui vient d'être libéré) avec des
+    opérations sur entiers : quelques microsecondes, sous verrou, donc sans doublon
+    entre deux /execute concurrents. Chaque port est un bail lié au nom du conteneur.
+    """
+
+    def __init__(self, start: int, end: int, lease_seconds: float = 300.0):
+        self.start = start
+        self.end = end
+        self._size = end - start + 1
+        self._mask = (1 << self._size) - 1
+        self._lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+        self._used = 0
+        self._cursor = 0
+        # port -> (nom du conteneur, date du bail) ; les ports de l'hôte sont dans _host
+        self._leases: Dict[int, Tuple[str, float]] = {}
+        self._by_name: Dict[str, int] = {}
+        self._host: set = set()
+
+    def _bit(self, port: int) -> int:
+        return 1 << (port - self.start)
+
+    def _in_range(self, port: Optional[int]) -> bool:
+        return port is not None and self.start <= port <= self.end
+
+    def allocate(self, name: str) -> Optional[int]:
+        """Réserve un port libre pour `name` (le même si `name` a déjà un bail) ; None si la plage est pleine."""
+        with self._lock:
+            if name in self._by_name:
+                return self._by_name[name]
+            free = ~self._used & self._mask
+            if not free:
+                return None
+            after = free >> self._cursor << self._cursor
+            candidates = after or free
+            index = (candidates & -candidates).bit_length() - 1
+            port = self.start + index
+            self._used |= 1 << index
+            self._cursor = (index + 1) % self._size
+            self._leases[port] = (name, time.time())
+            self._by_name[name] = port
+            return port
+
+    def reserve(self, port: Optional[int], name: str) -> None:
+        """Marque `port` comme tenu par `name` (session existante, événement start)."""
+        if not self._in_range(port):
+            return
+        with self._lock:
+            previous = self._by_name.get(name)
+            if previous is not None and previous != port:
+                self._drop(previous)
+            self._used |= self._bit(port)
+            self._leases[port] = (name, time.time())
+            self._by_name[name] = port
+
+    def release(self, name: str, port: Optional[int] = None) -> None:
+        """
+        Libère le bail de `name` (lancement échoué, conteneur arrêté ou supprimé).
+        `port` : port du conteneur de l'événement ; ignoré s'il ne correspond pas au bail
+        (événement tardif d'un conteneur remplacé depuis).
+        """
+        with self._lock:
+            leased = self._by_name.get(name)
+            if leased is None or (port is not None and port != leased):
+                return
+            self._drop(leased)
+
+    def block(self, port: int) -> None:
+        """Port trouvé occupé par un process de l'hôte : exclu jusqu'à la prochaine synchro."""
+        if not self._in_range(port):
+            return
+        with self._lock:
+            lease = self._leases.pop(port, None)
+            if lease is not None:
+                self._by_name.pop(lease[0], None)
+            self._host.add(port)
+            self._used |= self._bit(port)
+
+    def _drop(self, port: int) -> None:
+        """Libère un port (appelé sous verrou) ; reste pris s'il est aussi en écoute sur l'hôte."""
+        lease = self._leases.pop(port, None)
+        if lease is not None:
+            self._by_name.pop(lease[0], None)
+        if port not in self._host:
+            self._used &= ~self._bit(port)
+
+    def sync(self, sessions: Iterable[Tuple[str, Optional[int]]], host_ports: Iterable[int]) -> None:
+        """
+        Reconstruit le bitmap depuis les sessions connues `(nom, port)` et les ports en
+        écoute sur l'hôte. Les baux récents sans conteneur (lancement en cours) sont gardés.
+        """
+        now = time.time()
+        leases: Dict[int, Tuple[str, float]] = {}
+        for name, port in sessions:
+            if self._in_range(port):
+                leases[port] = (name, now)
+        host = {p for p in host_ports if self._in_range(p)}
+        with self._lock:
+            known = {name for name, _ in leases.values()}
+            for port, (name, since) in self._leases.items():
+                if name not in known and port not in leases and now - since < self._lease_seconds:
+                    leases[port] = (name, since)
+            used = 0
+            for port in set(leases) | host:
+                used |= self._bit(port)
+            self._leases = leases
+            self._by_name = {name: port for port, (name, _) in leases.items()}
+            self._host = host
+            self._used = used
+
+    def status(self) -> Dict:
+        with self._lock:
+            used = bin(self._used).count("1")
+            return {
+                "range": [self.start, self.end],
+                "free": self._size - used,
+                "leased": len(self._leases),
+                "host": len(self._host),
+            }
@@ -0,0 +1,320 @@
+import time
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from docker_api import DockerClient, NotFound, parse_docker_time
+
+# Événements conteneur suivis (les autres : exec, attach, stop, kill... sont ignorés ; `die` suit stop/kill)
+TRACKED_ACTIONS = ("create", "start", "restart", "pause", "unpause", "die", "oom", "destroy")
+
+
+class ContainerRecord:
+    def __init__(self, container_id: str):
+        self.id = container_id
+        self.name = ""
+        self.image = ""
+        self.owner = ""
+        self.state = "created"
+        self.cpu_limit = 0.0
+        self.memory_limit_mb = 0
+        self.rdp_port: Optional[int] = None
+        # PID (hôte) du process init du conteneur, 0 s'il ne tourne pas
+        self.pid = 0
+        self.created_at = 0.0
+        self.started_at = 0.0
+        self.finished_at = 0.0
+        self.exit_code: Optional[int] = None
+        self.oom_killed = False
+
+    @property
+    def running(self) -> bool:
+        """Session ouverte : en marche ou gelée (`docker pause`)."""
+        return self.state in ("running", "paused")
+
+    @property
+    def paused(self) -> bool:
+        return self.state == "paused"
+
+    def to_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "image": self.image,
+            "owner": self.owner,
+            "state": self.state,
+            "cpu_limit": self.cpu_limit,
+            "memory_limit_mb": self.memory_limit_mb,
+            "rdp_port": self.rdp_port,
+            "pid": self.pid,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "exit_code": self.exit_code,
+            "oom_killed": self.oom_killed,
+        }
+
+
+def record_from_inspect(data: Dict, owner_fn: Callable[[str, str], str]) -> ContainerRecord:
+    """Construit un enregistrement depuis `GET /containers/<id>/json`."""
+    record = ContainerRecord(data["Id"])
+    config = data.get("Config") or {}
+    host_config = data.get("HostConfig") or {}
+    state = data.get("State") or {}
+    labels = config.get("Labels") or {}
+    record.name = data.get("Name", "").lstrip("/")
+    record.image = config.get("Image", "")
+    record.owner = owner_fn(record.name, labels.get("owner", ""))
+    record.state = state.get("Status", "created")
+    record.cpu_limit = (host_config.get("NanoCpus") or 0) / 1e9
+    record.memory_limit_mb = (host_config.get("Memory") or 0) // (1024 * 1024)
+    bindings = (host_config.get("PortBindings") or {}).get("3389/tcp") or []
+    if bindings and bindings[0].get("HostPort"):
+        record.rdp_port = int(bindings[0]["HostPort"])
+    record.pid = state.get("Pid") or 0
+    record.created_at = parse_docker_time(data.get("Created", ""))
+    record.started_at = parse_docker_time(state.get("StartedAt", ""))
+    record.finished_at = parse_docker_time(state.get("FinishedAt", ""))
+    record.exit_code = state.get("ExitCode") if record.state == "exited" else None
+    record.oom_killed = bool(state.get("OOMKilled"))
+    return record
+
+
+class ContainerRegistry:
+    """
+    Registre en mémoire des conteneurs gérés (label `label`).
+
+    Amorcé une fois par une liste complète, puis tenu à jour par le flux
+    `docker events`. Si le flux tombe (redémarrage du démon...), le thread
+    ré-amorce le registre puis se réabonne. Les lectures (`sessions_by_user`,
+    `running`, `get`) ne font aucun appel à Docker.
+    """
+
+    def __init__(self, docker: DockerClient, label: str, owner_fn: Callable[[str, str], str],
+                 on_change: Optional[Callable[[], None]] = None, resync_delay: float = 2.0):
+        self._docker = docker
+        self._label = label
+        self._owner_fn = owner_fn
+        # Appelé (hors verrou) après chaque modification du registre
+        self.on_change = on_change
+        # Appelés (hors verrou) : on_record(enregistrement, présent) à chaque mise à jour ou retrait
+        # d'un conteneur, on_seed(enregistrements) après chaque amorçage complet
+        self.on_record: Optional[Callable[[ContainerRecord, bool], None]] = None
+        self.on_seed: Optional[Callable[[List[ContainerRecord]], None]] = None
+        self._resync_delay = resync_delay
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._records: Dict[str, ContainerRecord] = {}
+        # Sessions en marche par utilisateur et somme de leurs limites, maintenus à chaque transition
+        self._sessions: Dict[str, int] = {}
+        self._committed_cpu = 0.0
+        self._committed_mem_mb = 0
+        self._thread: Optional[threading.Thread] = None
+        # Début du dernier amorçage : point de reprise du flux d'événements
+        self._since = 0.0
+        self.seeded_at = 0.0
+        self.resyncs = 0
+        self.events = 0
+        self.version = 0
+
+    # ------------------------------
+    # Cycle de vie
+    # ------------------------------
+    def start(self) -> None:
+        """Amorce le registre (synchrone, pour que le premier /info soit juste) puis lance le thread d'événements."""
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            if not self.seeded_at:
+                try:
+                    self.seed()
+                except Exception as e:
+                    print(f"[REGISTRY] Amorçage impossible ({e}), nouvel essai en tâche de fond")
+            self._thread = threading.Thread(target=self._run, name="container-registry", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        fresh = bool(self.seeded_at)
+        while True:
+            try:
+                if not fresh:
+                    self.seed()
+                fresh = False
+                # Les événements depuis le début de l'amorçage sont rejoués : rien n'est perdu entre la liste et l'abonnement
+                for event in self._docker.events({"type": ["container"], "label": [self._label]}, since=self._since):
+                    self.apply_event(event)
+                print("[REGISTRY] Flux d'événements Docker fermé, resynchronisation")
+            except Exception as e:
+                print(f"[REGISTRY] Erreur ({e}), resynchronisation dans {self._resync_delay}s")
+            self.resyncs += 1
+            time.sleep(self._resync_delay)
+
+    def seed(self) -> None:
+        """Relit tous les conteneurs gérés (liste + inspect) et remplace le registre."""
+        since = time.time()
+        records = {}
+        for c in self._docker.list_containers(all=True, labels=[self._label]):
+            try:
+                records[c["Id"]] = record_from_inspect(self._docker.inspect_container(c["Id"]), self._owner_fn)
+            except NotFound:
+                continue
+        with self._lock:
+            self._records = records
+            self._sessions = {}
+            self._committed_cpu = 0.0
+            self._committed_mem_mb = 0
+            for r in records.values():
+                self._count(r, 1)
+            self._since = since
+            self.seeded_at = time.time()
+            self.version += 1
+        if self.on_seed is not None:
+            try:
+                self.on_seed(list(records.values()))
+            except Exception as e:
+                print(f"[REGISTRY] Erreur on_seed: {e}")
+        self._changed()
+
+    # ------------------------------
+    # Mises à jour
+    # ------------------------------
+    def _changed(self, record: Optional[ContainerRecord] = None, present: bool = True) -> None:
+        if record is not None and self.on_record is not None:
+            try:
+                self.on_record(record, present)
+            except Exception as e:
+                print(f"[REGISTRY] Erreur on_record: {e}")
+        if self.on_change is not None:
+            try:
+                self.on_change()
+            except Exception as e:
+                print(f"[REGISTRY] Erreur on_change: {e}")
+
+    def _put(self, record: ContainerRecord) -> None:
+        """Remplace un enregistrement en ajustant les décomptes (appelé sous verrou)."""
+        old = self._records.get(record.id)
+        if old is not None:
+            self._count(old, -1)
+        self._records[record.id] = record
+        self._count(record, 1)
+        self.version += 1
+
+    def _count(self, record: ContainerRecord, sign: int) -> None:
+        """Ajoute (+1) ou retire (-1) une session des sessions par utilisateur et de la capacité engagée."""
+        if not record.running:
+            return
+        remaining = self._sessions.get(record.owner, 0) + sign
+        if remaining > 0:
+            self._sessions[record.owner] = remaining
+        else:
+            self._sessions.pop(record.owner, None)
+        self._committed_cpu += sign * record.cpu_limit
+        self._committed_mem_mb += sign * record.memory_limit_mb
+
+    def track(self, container_id: str) -> Optional[ContainerRecord]:
+        """(Re)lit un conteneur tout de suite (après un lancement), sans attendre son événement."""
+        try:
+            record = record_from_inspect(self._docker.inspect_container(container_id), self._owner_fn)
+        except NotFound:
+            self.forget(container_id)
+            return None
+        with self._lock:
+            self._put(record)
+        self._changed(record)
+        return record
+
+    def forget(self, container_id: str) -> None:
+        with self._lock:
+            record = self._records.pop(container_id, None)
+            if record is None:
+                return
+            self._count(record, -1)
+            self.version += 1
+        self._changed(record, present=False)
+
+    def apply_event(self, event: Dict) -> None:
+        action = (event.get("Action") or event.get("status") or "").split(":")[0]
+        if action not in TRACKED_ACTIONS:
+            return
+        container_id = event.get("id") or (event.get("Actor") or {}).get("ID")
+        if not container_id:
+            return
+        self.events += 1
+        attributes = (event.get("Actor") or {}).get("Attributes") or {}
+        if action == "destroy":
+            self.forget(container_id)
+            return
+        with self._lock:
+            known = self._records.get(container_id)
+        if known is None or action in ("create", "start", "restart", "pause", "unpause"):
+            # Nouveau conteneur, (re)démarrage ou gel : limites, port, état et horodatages à jour via inspect
+            self.track(container_id)
+            return
+        with self._lock:
+            record = self._records.get(container_id)
+            if record is None:
+                return
+            if action == "oom":
+                record.oom_killed = True
+            elif action == "die":
+                # Copie : qui tient déjà l'ancien enregistrement ne le voit pas changer
+                updated = ContainerRecord(record.id)
+                updated.__dict__.update(record.__dict__)
+                updated.state = "exited"
+                updated.pid = 0
+                updated.finished_at = event.get("timeNano", 0) / 1e9 or time.time()
+                if attributes.get("exitCode", "").lstrip("-").isdigit():
+                    updated.exit_code = int(attributes["exitCode"])
+                self._put(updated)
+                record = updated
+            self.version += 1
+        self._changed(record)
+
+    # ------------------------------
+    # Lectures (aucun appel Docker)
+    # ------------------------------
+    def sessions_by_user(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._sessions)
+
+    def committed(self) -> Tuple[float, int]:
+        """Somme des limites CPU (vCPU) et mémoire (Mo) des sessions ouvertes (gelées comprises)."""
+        with self._lock:
+            # Arrondi : les additions/soustractions successives de flottants dérivent
+            return round(self._committed_cpu, 3), self._committed_mem_mb
+
+    def running_count(self) -> int:
+        with self._lock:
+            return sum(self._sessions.values())
+
+    def running(self) -> List[ContainerRecord]:
+        with self._lock:
+            return [r for r in self._records.values() if r.running]
+
+    def paused(self) -> List[ContainerRecord]:
+        with self._lock:
+            return [r for r in self._records.values() if r.paused]
+
+    def all(self) -> List[ContainerRecord]:
+        with self._lock:
+            return list(self._records.values())
+
+    def get(self, container_id: str) -> Optional[ContainerRecord]:
+        """Par ID complet, préfixe d'ID ou nom (comme le CLI docker)."""
+        with self._lock:
+            record = self._records.get(container_id)
+            if record is not None:
+                return record
+            for r in self._records.values():
+                if r.name == container_id or (len(container_id) >= 12 and r.id.startswith(container_id)):
+                    return r
+        return None
+
+    def status(self) -> Dict:
+        return {
+            "containers": len(self._records),
+            "running": self.running_count(),
+            "seeded_at": self.seeded_at,
+            "events": self.events,
+            "resyncs": self.resyncs,
+            "version": self.version,
+        }
@@ -0,0 +1,133 @@
+import time
+import threading
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+import psutil
+
+
+class ResourceSampler:
+    """
+    Échantillonne CPU, mémoire et conteneurs en tâche de fond.
+
+    `/info` lit le dernier échantillon au lieu de mesurer à chaque appel
+    (100 ms de `cpu_percent` + un fork de `docker ps`). Les échantillons sont
+    conservés dans un tampon circulaire (`history` entrées) ; chaque échantillon
+    porte les moyennes glissantes sur `short_window` et `long_window` secondes.
+    """
+
+    def __init__(self, interval: float, container_interval: float, history: int,
+                 short_window: float, long_window: float,
+                 sessions_fn: Callable[[], Dict[str, int]], host_fn: Callable[[], str],
+                 host_interval: float = 60.0):
+        self._interval = interval
+        self._container_interval = container_interval
+        self._short_window = short_window
+        self._long_window = long_window
+        self._sessions_fn = sessions_fn
+        self._host_fn = host_fn
+        self._host_interval = host_interval
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._samples = deque(maxlen=max(history, 1))
+        self._sessions: Dict[str, int] = {}
+        self._sessions_at = 0.0
+        self._host = ""
+        self._host_at = 0.0
+        self._thread: Optional[threading.Thread] = None
+        self.total_cpu = psutil.cpu_count()
+        # Premier appel non bloquant : référence pour le delta suivant
+        psutil.cpu_percent(interval=None)
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="resource-sampler", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.sample()
+            except Exception as e:
+                print(f"[SAMPLER] Erreur: {e}")
+            self._wakeup.wait(timeout=self._interval)
+            self._wakeup.clear()
+
+    def refresh_containers(self) -> None:
+        """Relit les conteneurs tout de suite (après un lancement ou une suppression)."""
+        sessions = self._sessions_fn()
+        with self._lock:
+            self._sessions = sessions
+            self._sessions_at = time.time()
+            if self._samples:
+                # Le dernier échantillon reflète immédiatement le nouveau compte
+                self._samples[-1] = {**self._samples[-1], "running_containers": sum(sessions.values()),
+                                     "sessions_by_user": sessions}
+
+    def sample(self) -> Dict:
+        now = time.time()
+        # cpu_percent(None) : moyenne depuis l'appel précédent, sans attente
+        used_cpu = psutil.cpu_percent(interval=None) / 100.0 * self.total_cpu
+        vm = psutil.virtual_memory()
+        if now - self._sessions_at >= self._container_interval:
+            self.refresh_containers()
+        if now - self._host_at >= self._host_interval:
+            self._host = self._host_fn()
+            self._host_at = now
+        with self._lock:
+            sessions = self._sessions
+            sample = {
+                "ts": now,
+                "used_cpu": used_cpu,
+                "total_mem_mb": int(vm.total / 1024 / 1024),
+                "used_mem_mb": int((vm.total - vm.available) / 1024 / 1024),
+                "running_containers": sum(sessions.values()),
+                "sessions_by_user": sessions,
+            }
+            self._samples.append(sample)
+            sample.update(self._averages(now))
+        return sample
+
+    def _averages(self, now: float) -> Dict:
+        """Moyennes glissantes CPU/RAM sur les fenêtres courte et longue (appelé sous verrou)."""
+        averages = {}
+        for label, window in (("short", self._short_window), ("long", self._long_window)):
+            cpu = mem = 0.0
+            n = 0
+            for s in reversed(self._samples):
+                if now - s["ts"] > window:
+                    break
+                cpu += s["used_cpu"]
+                mem += s["used_mem_mb"]
+                n += 1
+            averages[f"cpu_avg_{label}"] = cpu / n if n else 0.0
+            averages[f"mem_avg_{label}_mb"] = int(mem / n) if n else 0
+        return averages
+
+    def latest(self) -> Dict:
+        """Dernier échantillon (mesuré sur-le-champ si le sampler n'a pas encore tourné)."""
+        self.start()
+        with self._lock:
+            sample = self._samples[-1] if self._samples else None
+        if sample is None:
+            sample = self.sample()
+        return {**sample, "age": round(time.time() - sample["ts"], 3)}
+
+    def history(self, limit: int) -> List[Dict]:
+        """Les `limit` derniers échantillons (ts, CPU, RAM, conteneurs), du plus ancien au plus récent."""
+        with self._lock:
+            samples = list(self._samples)[-limit:] if limit > 0 else []
+        return [
+            {"ts": round(s["ts"], 3), "used_cpu": round(s["used_cpu"], 2),
+             "used_mem_mb": s["used_mem_mb"], "running_containers": s["running_containers"]}
+            for s in samples
+        ]
+
+    @property
+    def host(self) -> str:
+        if not self._host:
+            self._host = self._host_fn()
+            self._host_at = time.time()
+        return self._host
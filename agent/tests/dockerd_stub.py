@@ -0,0 +1,281 @@
+"""
+Faux démon Docker pour les tests : serveur HTTP/1.1 sur un socket UNIX temporaire,
+avec juste ce qu'il faut de l'API Engine pour `DockerClient` (conteneurs, images,
+exec, pull en flux chunked, flux d'événements).
+
+    with DockerStub() as stub:
+        client = DockerClient(stub.socket_path)
+        ...
+        stub.emit("start", "abc")       # événement pour les abonnés de /events
+        stub.connections                # connexions acceptées (réutilisation keep-alive)
+"""
+import os
+import json
+import queue
+import struct
+import shutil
+import socket
+import tempfile
+import threading
+import socketserver
+from http.server import BaseHTTPRequestHandler
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, unquote, urlparse
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    stub: "DockerStub"
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        self.stub._track(self.connection)
+
+    # --- réponses ---
+    def _reply(self, status: int, body=b"", content_type: str = "application/json") -> None:
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _start_chunked(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _chunk(self, data: bytes) -> None:
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def _route(self):
+        url = urlparse(self.path)
+        # /v1.41/containers/json -> containers/json
+        path = url.path.split("/", 2)[2] if url.path.count("/") >= 2 else ""
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        self.stub.requests.append((self.command, path, query))
+        return path, query
+
+    def _body(self) -> Dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length)) if length else {}
+
+    # --- méthodes ---
+    def do_GET(self):
+        path, query = self._route()
+        stub = self.stub
+        if path == "_ping":
+            return self._reply(200, b"OK", "text/plain")
+        if path == "containers/json":
+            return self._reply(200, list(stub.containers.values()))
+        if path.startswith("containers/") and path.endswith("/json"):
+            container = stub.containers.get(unquote(path.split("/")[1]))
+            if container is None:
+                return self._reply(404, {"message": "No such container"})
+            return self._reply(200, container)
+        if path.startswith("images/") and path.endswith("/json"):
+            image = unquote(path[len("images/"):-len("/json")])
+            if image not in stub.images:
+                return self._reply(404, {"message": f"No such image: {image}"})
+            return self._reply(200, {"Id": "sha256:" + image})
+        if path.startswith("exec/") and path.endswith("/json"):
+            return self._reply(200, {"ExitCode": stub.exec_exit_code})
+        if path == "events":
+            return self._events()
+        self._reply(404, {"message": "page not found"})
+
+    def do_POST(self):
+        path, query = self._route()
+        body = self._body()
+        stub = self.stub
+        if path == "containers/create":
+            name = "/" + query["name"]
+            if any(c["Name"] == name for c in stub.containers.values()):
+                return self._reply(409, {"message": f'Conflict. The container name "{name}" is already in use'})
+            stub.created += 1
+            container_id = "%064x" % stub.created
+            stub.containers[container_id] = {"Id": container_id, "Name": name, "Config": body,
+                                             "HostConfig": body.get("HostConfig") or {},
+                                             "State": {"Status": "created"}}
+            return self._reply(201, {"Id": container_id, "Warnings": []})
+        if path.startswith("containers/") and path.endswith("/exec"):
+            return self._reply(201, {"Id": "exec1"})
+        if path.startswith("containers/"):
+            container_id = unquote(path.split("/")[1])
+            if container_id not in stub.containers:
+                return self._reply(404, {"message": "No such container"})
+            if path.endswith("/start"):
+                if stub.start_failures:
+                    status, message = stub.start_failures.pop(0)
+                    return self._reply(status, {"message": message})
+                stub.containers[container_id]["State"] = {"Status": "running"}
+            return self._reply(204)
+        if path.startswith("exec/") and path.endswith("/start"):
+            raw = b"".join(struct.pack(">BxxxL", stream, len(data)) + data for stream, data in stub.exec_output)
+            return self._reply(200, raw, "application/vnd.docker.raw-stream")
+        if path == "images/create":
+            return self._pull(query)
+        self._reply(404, {"message": "page not found"})
+
+    def do_DELETE(self):
+        path, _ = self._route()
+        container_id = unquote(path.split("/")[1])
+        if container_id not in self.stub.containers:
+            return self._reply(404, {"message": "No such container"})
+        if self.stub.lingering_removals:
+            # Suppression asynchrone côté démon : le nom reste pris un moment
+            self.stub.lingering_removals -= 1
+            self.stub.containers[container_id]["State"] = {"Status": "removing"}
+        else:
+            del self.stub.containers[container_id]
+        self._reply(204)
+
+    # --- flux ---
+    def _pull(self, query: Dict[str, str]) -> None:
+        stub = self.stub
+        image = f"{query['fromImage']}:{query.get('tag', 'latest')}"
+        if image in stub.missing_images:
+            return self._reply(404, {"message": f"pull access denied for {query['fromImage']}"})
+        self._start_chunked()
+        for event in stub.pull_events:
+            # Une ligne JSON découpée sur deux chunks : le client doit la recoller
+            line = json.dumps(event).encode() + b"\n"
+            self._chunk(line[:len(line) // 2])
+            self._chunk(line[len(line) // 2:])
+            if stub.pull_delay:
+                stub.closing.wait(stub.pull_delay)
+        self._chunk(b"")
+        if not any("error" in e for e in stub.pull_events):
+            stub.images.add(image)
+
+    def _events(self) -> None:
+        subscriber: "queue.Queue[Optional[Dict]]" = queue.Queue()
+        self.stub._subscribe(subscriber)
+        self._start_chunked()
+        try:
+            while True:
+                event = subscriber.get()
+                if event is None:
+                    break
+                self._chunk(json.dumps(event).encode() + b"\n")
+            self._chunk(b"")
+        finally:
+            self.stub._unsubscribe(subscriber)
+        self.close_connection = True
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        # BaseHTTPRequestHandler attend une adresse (hôte, port)
+        return request, ("docker", 0)
+
+
+class DockerStub:
+    """
+    Faux démon démarré dans un thread. État modifiable par les tests : `containers`
+    (ID -> inspect ; noms uniques, 409 sinon), `start_failures` ([(statut, message)],
+    consommés par les prochains /start), `lingering_removals` (prochains DELETE qui
+    laissent le conteneur en `removing`, nom encore pris), `images`, `missing_images` (pull en 404),
+    `pull_events` (flux de /images/create, `pull_delay` secondes entre deux lignes),
+    `exec_output` ([(1|2, octets)]) et `exec_exit_code`. `requests` garde
+    (méthode, chemin, query).
+    """
+
+    def __init__(self):
+        self._dir = tempfile.mkdtemp(prefix="dockerd-stub-")
+        self.socket_path = os.path.join(self._dir, "docker.sock")
+        self.containers: Dict[str, Dict] = {}
+        self.created = 0
+        self.start_failures: List = []
+        self.lingering_removals = 0
+        self.images = set()
+        self.missing_images = set()
+        self.pull_events: List[Dict] = []
+        self.pull_delay = 0.0
+        self.exec_output = [(1, b"")]
+        self.exec_exit_code = 0
+        self.requests: List = []
+        self.closing = threading.Event()
+        self._lock = threading.Lock()
+        self._sockets: List[socket.socket] = []
+        self._subscribers: List[queue.Queue] = []
+        self.subscribed = threading.Condition(self._lock)
+        handler = type("Handler", (_Handler,), {"stub": self})
+        self._server = _Server(self.socket_path, handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+
+    def __enter__(self) -> "DockerStub":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.closing.set()
+        self.close_events()
+        self._server.shutdown()
+        self._server.server_close()
+        self.drop_connections()
+        shutil.rmtree(self._dir, ignore_errors=True)
+
+    # --- connexions ---
+    def _track(self, sock: socket.socket) -> None:
+        with self._lock:
+            self._sockets.append(sock)
+
+    @property
+    def connections(self) -> int:
+        """Connexions acceptées depuis le démarrage."""
+        with self._lock:
+            return len(self._sockets)
+
+    def drop_connections(self) -> None:
+        """Ferme côté démon toutes les connexions ouvertes (keep-alive expiré)."""
+        with self._lock:
+            sockets = list(self._sockets)
+        for sock in sockets:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    # --- événements ---
+    def _subscribe(self, subscriber: queue.Queue) -> None:
+        with self.subscribed:
+            self._subscribers.append(subscriber)
+            self.subscribed.notify_all()
+
+    def _unsubscribe(self, subscriber: queue.Queue) -> None:
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+    def wait_subscribers(self, count: int = 1, timeout: float = 5.0) -> bool:
+        with self.subscribed:
+            return self.subscribed.wait_for(lambda: len(self._subscribers) >= count, timeout)
+
+    def emit(self, action: str, container_id: str, **attributes) -> None:
+        event = {"Type": "container", "Action": action, "status": action, "id": container_id,
+                 "Actor": {"ID": container_id, "Attributes": attributes}, "time": 1700000000,
+                 "timeNano": 1700000000000000000}
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.put(event)
+
+    def close_events(self) -> None:
+        """Termine les flux /events ouverts (redémarrage du démon)."""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.put(None)
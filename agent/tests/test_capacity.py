@@ -0,0 +1,62 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from capacity import CapacityLedger  # noqa: E402
+
+
+class CapacityLedgerTest(unittest.TestCase):
+    def setUp(self):
+        # Sessions déjà dans le registre : 2 CPU, 2048 Mo
+        self.committed = (2.0, 2048)
+        self.ledger = CapacityLedger(4, 8192, cpu_ratio=2.0, mem_ratio=1.0,
+                                     committed_fn=lambda: self.committed)
+
+    def test_overcommit_ratio_scales_the_allocatable_cpu(self):
+        self.assertEqual(self.ledger.allocatable_cpu, 8)
+        # 8 allouables - 2 engagés : 6 au-delà du total physique de l'hôte
+        self.assertIsNone(self.ledger.reserve("a", 4, 512))
+        self.assertIsNone(self.ledger.reserve("b", 2, 512))
+
+    def test_refused_at_the_allocatable_limit(self):
+        self.assertIsNone(self.ledger.reserve("a", 5, 512))
+        reason = self.ledger.reserve("b", 2, 512)
+        self.assertEqual(reason, "CPU insuffisant : 2 demandés, 1 allouables")
+        self.assertIsNone(self.ledger.reserve("c", 1, 512))
+        self.assertEqual(self.ledger.snapshot()["available_cpu"], 0)
+
+    def test_memory_is_not_overcommitted(self):
+        reason = self.ledger.reserve("a", 1, 6145)
+        self.assertEqual(reason, "Mémoire insuffisante : 6145 Mo demandés, 6144 Mo allouables")
+        self.assertIsNone(self.ledger.reserve("a", 1, 6144))
+
+    def test_refusal_reserves_nothing(self):
+        self.assertIsNotNone(self.ledger.reserve("a", 7, 512))
+        snapshot = self.ledger.snapshot()
+        self.assertEqual((snapshot["pending_cpu"], snapshot["pending_mem_mb"]), (0, 0))
+
+    def test_release_returns_the_capacity(self):
+        self.assertIsNone(self.ledger.reserve("a", 6, 512))
+        self.assertIsNotNone(self.ledger.reserve("b", 1, 512))
+        self.ledger.release("a")
+        self.assertIsNone(self.ledger.reserve("b", 1, 512))
+
+    def test_release_of_an_unknown_name_is_a_no_op(self):
+        self.assertIsNone(self.ledger.reserve("a", 3, 1024))
+        self.ledger.release("absent")
+        self.ledger.release("absent")
+        snapshot = self.ledger.snapshot()
+        self.assertEqual((snapshot["pending_cpu"], snapshot["pending_mem_mb"]), (3, 1024))
+        self.assertEqual((snapshot["available_cpu"], snapshot["available_mem_mb"]), (3, 5120))
+
+    def test_registry_counts_once_the_container_is_in_it(self):
+        self.assertIsNone(self.ledger.reserve("a", 3, 1024))
+        # Le conteneur apparaît dans le registre puis sa réservation est libérée
+        self.committed = (5.0, 3072)
+        self.ledger.release("a")
+        self.assertEqual(self.ledger.snapshot()["available_cpu"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,214 @@
+import os
+import sys
+import socket
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from docker_api import DockerAPIError, DockerClient, NotFound, parse_docker_time  # noqa: E402
+from dockerd_stub import DockerStub  # noqa: E402
+
+
+class DockerClientTestCase(unittest.TestCase):
+    def setUp(self):
+        self.stub = DockerStub().__enter__()
+        self.addCleanup(self.stub.close)
+        self.client = DockerClient(self.stub.socket_path, timeout=5)
+
+
+class ConnectionReuseTest(DockerClientTestCase):
+    def test_sequential_requests_share_one_connection(self):
+        for _ in range(10):
+            self.assertTrue(self.client.ping())
+        self.assertEqual(self.stub.connections, 1)
+
+    def test_error_responses_keep_the_connection(self):
+        with self.assertRaises(NotFound):
+            self.client.inspect_container("absent")
+        self.assertFalse(self.client.image_exists("ubuntu:22.04"))
+        self.assertTrue(self.client.ping())
+        self.assertEqual(self.stub.connections, 1)
+
+    def test_reconnects_once_when_the_daemon_closed_the_connection(self):
+        self.assertTrue(self.client.ping())
+        self.stub.drop_connections()
+        self.assertTrue(self.client.ping())
+        self.assertEqual(self.stub.connections, 2)
+
+    def test_pool_is_bounded(self):
+        client = DockerClient(self.stub.socket_path, timeout=5, pool_size=2)
+        barrier = threading.Barrier(4)
+
+        def worker():
+            barrier.wait()
+            for _ in range(5):
+                client.ping()
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertLessEqual(client._pool.qsize(), 2)
+
+    def test_daemon_unreachable(self):
+        client = DockerClient(self.stub.socket_path + ".absent", timeout=1)
+        with self.assertRaises(OSError):
+            client.ping()
+
+
+class ContainerTest(DockerClientTestCase):
+    def test_create_inspect_remove(self):
+        container_id = self.client.create_container("rdp-alice", {"Image": "ubuntu:22.04", "Labels": {"a": "b"}})
+        info = self.client.inspect_container(container_id)
+        self.assertEqual(info["Name"], "/rdp-alice")
+        self.assertEqual(info["Config"]["Labels"], {"a": "b"})
+        self.client.start_container(container_id)
+        self.client.remove_container(container_id, force=True)
+        self.assertIn(("DELETE", f"containers/{container_id}", {"force": "1"}), self.stub.requests)
+        with self.assertRaises(NotFound) as ctx:
+            self.client.remove_container(container_id)
+        self.assertEqual(ctx.exception.status, 404)
+        self.assertEqual(ctx.exception.message, "No such container")
+
+    def test_list_filters_are_json_encoded(self):
+        self.client.list_containers(all=True, labels=["managed-by=rdp-agent"])
+        _, path, query = self.stub.requests[-1]
+        self.assertEqual(path, "containers/json")
+        self.assertEqual(query, {"all": "1", "filters": '{"label": ["managed-by=rdp-agent"]}'})
+
+    def test_exec_run_demultiplexes_output(self):
+        self.stub.exec_output = [(1, b"ESTAB "), (2, b"warning\n"), (1, b"0 0\n")]
+        self.stub.exec_exit_code = 3
+        container_id = self.client.create_container("rdp-bob", {"Image": "x"})
+        self.assertEqual(self.client.exec_run(container_id, ["ss", "-tn"]), (3, "ESTAB 0 0\n", "warning\n"))
+
+
+class PullTest(DockerClientTestCase):
+    LAYERS = ("aaa", "bbb")
+
+    def setUp(self):
+        super().setUp()
+        self.stub.pull_events = [{"status": "Pulling from library/ubuntu", "id": "22.04"}]
+        for current in (100, 500, 1000):
+            for layer in self.LAYERS:
+                self.stub.pull_events.append({"status": "Downloading", "id": layer,
+                                              "progressDetail": {"current": current, "total": 1000}})
+        self.stub.pull_events += [{"status": "Pull complete", "id": layer} for layer in self.LAYERS]
+        self.stub.pull_events.append({"status": "Status: Downloaded newer image for ubuntu:22.04"})
+
+    def test_chunked_progress_is_read_line_by_line(self):
+        events = []
+        self.client.pull_image("ubuntu:22.04", progress=events.append)
+        self.assertEqual(events, self.stub.pull_events)
+        self.assertTrue(self.client.image_exists("ubuntu:22.04"))
+        self.assertIn(("POST", "images/create", {"fromImage": "ubuntu", "tag": "22.04"}), self.stub.requests)
+
+    def test_tag_defaults_to_latest_and_registry_port_is_kept(self):
+        self.client.pull_image("registry.local:5000/rdp/xfce")
+        self.assertEqual(self.stub.requests[-1][2], {"fromImage": "registry.local:5000/rdp/xfce", "tag": "latest"})
+
+    def test_progress_arrives_before_the_pull_ends(self):
+        self.stub.pull_delay = 0.05
+        first = threading.Event()
+        pull = threading.Thread(target=self.client.pull_image, args=("ubuntu:22.04",),
+                                kwargs={"progress": lambda e: first.set()})
+        pull.start()
+        self.assertTrue(first.wait(2))
+        self.assertFalse(self.client.image_exists("ubuntu:22.04"))
+        pull.join()
+        self.assertTrue(self.client.image_exists("ubuntu:22.04"))
+
+    def test_error_entry_in_stream_raises(self):
+        self.stub.pull_events = self.stub.pull_events[:2] + [{"error": "manifest unknown"}]
+        with self.assertRaises(DockerAPIError) as ctx:
+            self.client.pull_image("ubuntu:22.04")
+        self.assertEqual(ctx.exception.message, "manifest unknown")
+        self.assertFalse(self.client.image_exists("ubuntu:22.04"))
+
+    def test_http_error_raises_not_found(self):
+        self.stub.missing_images.add("private/app:1")
+        with self.assertRaises(NotFound):
+            self.client.pull_image("private/app:1")
+
+    def test_stalled_stream_times_out(self):
+        self.stub.pull_delay = 1.0
+        with self.assertRaises(socket.timeout):
+            self.client.pull_image("ubuntu:22.04", timeout=0.2)
+
+    def test_pull_uses_its_own_connection(self):
+        self.client.ping()
+        self.client.pull_image("ubuntu:22.04")
+        self.client.ping()
+        # Le flux de pull ne passe pas par le pool : la connexion keep-alive reste utilisable
+        self.assertEqual(self.stub.connections, 2)
+
+
+class EventsTest(DockerClientTestCase):
+    def test_stream_yields_events_as_they_happen(self):
+        stream = self.client.events(filters={"type": ["container"]}, since=1700000000.5)
+        received = []
+
+        def consume():
+            for event in stream:
+                received.append(event)
+                if len(received) == 2:
+                    break
+
+        reader = threading.Thread(target=consume)
+        reader.start()
+        self.assertTrue(self.stub.wait_subscribers())
+        self.stub.emit("start", "c1")
+        self.stub.emit("die", "c1", exitCode="137")
+        reader.join(5)
+        self.assertFalse(reader.is_alive())
+        self.assertEqual([(e["Action"], e["id"]) for e in received], [("start", "c1"), ("die", "c1")])
+        self.assertEqual(received[1]["Actor"]["Attributes"], {"exitCode": "137"})
+        _, path, query = self.stub.requests[0]
+        self.assertEqual(path, "events")
+        self.assertEqual(query, {"filters": '{"type": ["container"]}', "since": "1700000000.500000000"})
+
+    def test_quiet_stream_does_not_time_out(self):
+        client = DockerClient(self.stub.socket_path, timeout=0.2)
+        received = []
+        reader = threading.Thread(target=lambda: received.extend(client.events()))
+        reader.start()
+        self.assertTrue(self.stub.wait_subscribers())
+        # Plus long que le timeout des requêtes : le flux d'événements n'en a pas
+        reader.join(0.5)
+        self.assertTrue(reader.is_alive())
+        self.stub.emit("destroy", "c2")
+        self.stub.close_events()
+        reader.join(5)
+        self.assertEqual([e["Action"] for e in received], ["destroy"])
+
+    def test_stream_ends_when_the_daemon_closes_it(self):
+        stream = self.client.events()
+        result = []
+        reader = threading.Thread(target=lambda: result.append(list(stream)))
+        reader.start()
+        self.assertTrue(self.stub.wait_subscribers())
+        self.stub.close_events()
+        reader.join(5)
+        self.assertEqual(result, [[]])
+
+    def test_requests_still_work_while_streaming(self):
+        reader = threading.Thread(target=lambda: list(self.client.events()))
+        reader.start()
+        self.assertTrue(self.stub.wait_subscribers())
+        self.assertTrue(self.client.ping())
+        self.stub.close_events()
+        reader.join(5)
+
+
+class ParseDockerTimeTest(unittest.TestCase):
+    def test_parses_nanosecond_timestamps(self):
+        self.assertEqual(parse_docker_time("2024-01-02T03:04:05.123456789Z"), 1704164645)
+
+    def test_zero_value_is_zero(self):
+        self.assertEqual(parse_docker_time("0001-01-01T00:00:00Z"), 0.0)
+        self.assertEqual(parse_docker_time(""), 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
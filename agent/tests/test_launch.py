@@ -0,0 +1,80 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dockerd_stub import DockerStub  # noqa: E402
+
+PORT_IN_USE = "driver failed programming external connectivity: Bind for 0.0.0.0:{port} failed: port is already allocated"
+stub = None
+agent = None
+
+
+def setUpModule():
+    global stub, agent
+    stub = DockerStub().__enter__()
+    os.environ.update(DOCKER_SOCKET=stub.socket_path, RDP_PORT_RANGE_START="47100", RDP_PORT_RANGE_END="47109")
+    import agent as agent_module
+    agent = agent_module
+
+
+def tearDownModule():
+    stub.close()
+
+
+class RunLaunchTest(unittest.TestCase):
+    image = "rdp/xfce:1"
+
+    def setUp(self):
+        stub.images.add(self.image)
+        stub.start_failures.clear()
+        stub.lingering_removals = 0
+        stub.containers.clear()
+        agent.ports.sync([], host_ports=[])
+
+    def launch(self, name):
+        launch = agent.Launch({
+            "name": name, "image": self.image, "cpu_limit": 1, "memory_limit_mb": 512, "gpu": False,
+            "username": "alice", "password": "secret",
+        })
+        agent.run_launch(launch)
+        return launch
+
+    def container_names(self):
+        return sorted(c["Name"] for c in stub.containers.values())
+
+    def test_retry_after_port_conflict_uses_a_new_name_and_lease(self):
+        stub.start_failures.append((500, PORT_IN_USE.format(port=47100)))
+        # Le conteneur du premier essai est encore en cours de suppression : son nom est pris
+        stub.lingering_removals = 1
+        launch = self.launch("rdp_alice_1")
+
+        self.assertEqual(launch.result["status"], "ok", launch.result)
+        self.assertEqual(self.container_names(), ["/rdp_alice_1", "/rdp_alice_1-1"])
+        first_port = agent.ports.status()["range"][0]
+        port = launch.result["rdp_port"]
+        self.assertNotEqual(port, first_port)
+        self.assertEqual(agent.ports.allocate("rdp_alice_1-1"), port)
+        # Événements tardifs du conteneur du premier essai : le bail du second n'est pas touché
+        agent.ports.release("rdp_alice_1", first_port)
+        agent.ports.release("rdp_alice_1")
+        self.assertEqual(agent.ports.allocate("rdp_alice_1-1"), port)
+        self.assertNotEqual(agent.ports.allocate("rdp_other_1"), port)
+
+    def test_failed_launch_returns_its_lease(self):
+        stub.start_failures.append((500, "OCI runtime create failed"))
+        launch = self.launch("rdp_alice_2")
+        self.assertEqual(launch.result["status"], "error")
+        self.assertEqual(agent.ports.status()["leased"], 0)
+        self.assertEqual(stub.containers, {})
+
+    def test_gives_up_after_port_attempts(self):
+        stub.start_failures.extend([(500, PORT_IN_USE.format(port=0))] * agent.PORT_ATTEMPTS)
+        launch = self.launch("rdp_alice_3")
+        self.assertEqual(launch.result["status"], "error")
+        self.assertEqual(launch.http_status, 503)
+        self.assertEqual(stub.containers, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
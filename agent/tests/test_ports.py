@@ -0,0 +1,68 @@
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ports import PortAllocator  # noqa: E402
+
+
+class PortAllocatorTest(unittest.TestCase):
+    def setUp(self):
+        self.ports = PortAllocator(40000, 40003, lease_seconds=300)
+
+    def test_same_name_keeps_its_lease(self):
+        port = self.ports.allocate("rdp_alice_1")
+        self.assertEqual(self.ports.allocate("rdp_alice_1"), port)
+        self.assertNotEqual(self.ports.allocate("rdp_bob_1"), port)
+
+    def test_released_port_is_not_reused_immediately(self):
+        first = self.ports.allocate("a")
+        self.ports.release("a")
+        # next-fit : le port libéré ne revient qu'après un tour de plage
+        self.assertEqual([self.ports.allocate(n) for n in "bcd"], [40001, 40002, 40003])
+        self.assertEqual(self.ports.allocate("e"), first)
+        self.assertIsNone(self.ports.allocate("f"))
+
+    def test_release_ignores_a_stale_port(self):
+        port = self.ports.allocate("rdp_alice_1")
+        # Événement tardif d'un conteneur remplacé depuis : autre port, bail conservé
+        self.ports.release("rdp_alice_1", port + 1)
+        self.assertEqual(self.ports.status()["leased"], 1)
+        self.ports.release("rdp_alice_1", port)
+        self.assertEqual(self.ports.status()["leased"], 0)
+
+    def test_sync_keeps_recent_leases_without_container(self):
+        port = self.ports.allocate("launching")
+        self.ports.sync([("running", 40002)], host_ports=[40003])
+        status = self.ports.status()
+        self.assertEqual((status["leased"], status["host"], status["free"]), (2, 1, 1))
+        self.assertEqual(self.ports.allocate("launching"), port)
+
+    def test_sync_expires_old_leases_and_reuses_their_port(self):
+        ports = PortAllocator(40000, 40000, lease_seconds=0.05)
+        port = ports.allocate("abandoned")
+        self.assertIsNone(ports.allocate("other"))
+        time.sleep(0.1)
+        # Aucun conteneur n'a repris le bail : il expire à la synchro et le port se réutilise
+        ports.sync([], host_ports=[])
+        self.assertEqual(ports.allocate("other"), port)
+
+    def test_reserve_moves_the_lease_of_a_name(self):
+        self.ports.allocate("rdp_alice_1")
+        self.ports.reserve(40003, "rdp_alice_1")
+        self.assertEqual(self.ports.allocate("rdp_alice_1"), 40003)
+        self.assertEqual(self.ports.status()["free"], 3)
+
+    def test_blocked_port_stays_taken_until_sync(self):
+        port = self.ports.allocate("a")
+        self.ports.block(port)
+        self.ports.release("a")
+        self.assertNotEqual(self.ports.allocate("a"), port)
+        self.assertEqual(self.ports.status()["host"], 1)
+        self.ports.sync([], host_ports=[])
+        self.assertEqual(self.ports.status()["host"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
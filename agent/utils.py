@@ -1,13 +1,25 @@
 import os
+import re
 import shutil
 import socket
-import psutil
-import subprocess
-import random
-import time
-import json
 from typing import List, Dict, Any
 
+from config import (
+    DOCKER_SOCKET, RDP_PORT_RANGE_START, RDP_PORT_RANGE_END, PORT_LEASE_SECONDS,
+    ACTIVITY_SWEEP_INTERVAL_SECONDS, PAUSE_IDLE_MINUTES, PAUSE_TRAFFIC_THRESHOLD_BYTES,
+    PAUSE_WAKE_INTERVAL_SECONDS, CGROUP_ROOT, STATS_MIN_INTERVAL_SECONDS
+)
+from activity import ActivityTracker
+from cgroups import ContainerStats
+from docker_api import DockerAPIError, DockerClient
+from freezer import SessionFreezer
+from launcher import PullTable
+from ports import PortAllocator, host_listening_ports
+from registry import ContainerRecord, ContainerRegistry
+
+# Client Docker Engine partagé (connexions persistantes sur le socket UNIX)
+docker = DockerClient(DOCKER_SOCKET, pool_size=8)
+
 def load_allowed_images(path: str):
     if not os.path.exists(path):
         return []
@@ -19,54 +31,65 @@ def load_allowed_images(path: str):
                 images.append(line)
     return images
 
+# Référence d'image Docker : [registre[:port]/]repo[:tag][@digest]
+IMAGE_REF_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._/:@-]{0,254}$")
+
+def sanitize_image(image: str) -> str:
+    """
+    Valide une référence d'image (toutes les images sont autorisées,
+    mais on refuse ce qui ne peut pas être une référence Docker valide).
+    """
+    image = image.strip()
+    if not IMAGE_REF_RE.match(image):
+        raise ValueError(f"Image invalide: {image!r}")
+    return image
+
 def detect_gpu_capability():
     # Simple: présence de nvidia-smi => GPU utilisable
     return shutil.which("nvidia-smi") is not None
 
-def pick_free_rdp_port(start: int, end: int, attempts: int = 50):
-    """
-    Cherche un port libre dans la plage.
-    On prend une approche random pour répartir.
-    """
-    tried = set()
-    for _ in range(attempts):
-        port = random.randint(start, end)
-        if port in tried:
-            continue
-        tried.add(port)
-        if is_port_free(port):
-            return port
-    # fallback scan linéaire
-    for port in range(start, end + 1):
-        if is_port_free(port):
-            return port
-    return None
-
-def is_port_free(port: int):
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-        s.settimeout(0.2)
-        return s.connect_ex(("127.0.0.1", port)) != 0
+def container_owner(name: str, owner_label: str = "") -> str:
+    """Propriétaire d'une session : label owner, sinon déduit du nom rdp_<user>_<timestamp>."""
+    if owner_label:
+        return owner_label
+    name = name.lstrip("/")
+    if name.startswith("rdp_"):
+        return name[len("rdp_"):].rsplit("_", 1)[0]
+    return ""
 
-def compute_used_cpu():
-    # Mesure CPU% global instantané
-    # psutil.cpu_percent(interval=0.1) => % usage
-    cpu_percent = psutil.cpu_percent(interval=0.1)
-    total_cpu = psutil.cpu_count()
-    # convertit en "nombre de vCPU utilisés"
-    return (cpu_percent / 100.0) * total_cpu
+MANAGED_LABEL = "managed_by=rdp_agent"
 
-def get_running_managed_containers_count():
-    try:
-        # Version sans `bash -c`
-        output = subprocess.check_output(
-            ["docker", "ps", "--filter", "label=managed_by=rdp_agent", "--format", "{{.ID}}"],
-            text=True
-        ).strip()
-        if not output:
-            return 0
-        return len(output.splitlines())
-    except Exception:
-        return 0
+# Conteneurs gérés, tenus à jour par le flux docker events (démarré par start_background)
+registry = ContainerRegistry(docker, MANAGED_LABEL, container_owner)
+
+# Ports RDP : bitmap alimenté par le registre (baux par nom de conteneur) et les sockets de l'hôte
+ports = PortAllocator(RDP_PORT_RANGE_START, RDP_PORT_RANGE_END, PORT_LEASE_SECONDS)
+
+def _holds_port(record: ContainerRecord) -> bool:
+    # Un conteneur créé mais pas encore démarré garde son port (lancement en cours)
+    return record.state not in ("exited", "dead")
+
+def _on_record(record: ContainerRecord, present: bool) -> None:
+    if present and _holds_port(record):
+        ports.reserve(record.rdp_port, record.name)
+    else:
+        ports.release(record.name, record.rdp_port)
+
+def sync_ports(records: List[ContainerRecord] = None) -> None:
+    """Reconstruit le bitmap des ports depuis le registre et les sockets en écoute sur l'hôte."""
+    if records is None:
+        records = registry.all()
+    ports.sync(
+        [(r.name, r.rdp_port) for r in records if _holds_port(r)],
+        host_listening_ports(RDP_PORT_RANGE_START, RDP_PORT_RANGE_END)
+    )
+
+registry.on_record = _on_record
+registry.on_seed = sync_ports
+
+def get_sessions_by_user() -> Dict[str, int]:
+    """Nombre de conteneurs gérés en marche, par utilisateur (lu dans le registre)."""
+    return registry.sessions_by_user()
 
 def get_ip_candidate():
     """
@@ -82,31 +105,105 @@ def get_ip_candidate():
     except Exception:
         return "127.0.0.1"
 
+def is_managed_container(container_id: str) -> bool:
+    """Vrai si le conteneur (ID, préfixe d'ID ou nom) est connu du registre."""
+    return registry.get(container_id) is not None
+
+def remove_container(container_id: str) -> None:
+    """Arrête et supprime un conteneur (équivalent de docker rm -f)."""
+    record = registry.get(container_id)
+    docker.remove_container(record.id if record else container_id, force=True)
+    if record:
+        # Sans attendre l'événement destroy
+        registry.forget(record.id)
+
+def list_managed_containers() -> List[str]:
+    """Conteneurs gérés en marche, au format `ID IMAGE NOM` (endpoint /containers)."""
+    return [f"{r.id[:12]} {r.image} {r.name}" for r in registry.running()]
+
+# Pulls single-flight : un seul `docker pull` par image, partagé par les lancements concurrents
+pulls = PullTable(docker)
+
+class PortInUseError(RuntimeError):
+    """Le port attribué est pris par un process inconnu de l'agent."""
+
+def launch_container(image: str, name: str, rdp_port: int, cpu_limit: int, memory_limit_mb: int,
+                     gpu: bool, username: str, password: str, agent_id: str) -> str:
+    """
+    Lance une session RDP (équivalent de l'ancien docker_launch.sh) et retourne l'ID du conteneur.
+    L'image doit être présente (`pulls.ensure`). Pas de sonde préalable du port : le bitmap
+    (`ports.py`) l'a attribué, et s'il est pris par ailleurs le bind de Docker échoue au démarrage.
+    Lève PortInUseError dans ce cas, RuntimeError ou DockerAPIError sinon.
+    """
+    host_config: Dict[str, Any] = {
+        "NanoCpus": int(cpu_limit * 1e9),
+        "Memory": memory_limit_mb * 1024 * 1024,
+        "PortBindings": {"3389/tcp": [{"HostPort": str(rdp_port)}]},
+    }
+    if gpu and detect_gpu_capability():
+        host_config["DeviceRequests"] = [{"Driver": "nvidia", "Count": 1, "Capabilities": [["gpu"]]}]
+    container_id = docker.create_container(name, {
+        "Image": image,
+        "Labels": {"managed_by": "rdp_agent", "agent_id": agent_id or "unknown", "owner": username},
+        "Env": [f"RDP_USER={username}", f"RDP_PASSWORD={password}"],
+        "ExposedPorts": {"3389/tcp": {}},
+        "HostConfig": host_config,
+    })
+    try:
+        docker.start_container(container_id)
+    except DockerAPIError as e:
+        # Démarrage impossible (port pris entre-temps...) : pas de conteneur orphelin
+        docker.remove_container(container_id, force=True)
+        if "already allocated" in e.message or "address already in use" in e.message:
+            raise PortInUseError(f"Port {rdp_port} déjà utilisé") from e
+        raise
+    # Visible tout de suite dans /info et /containers, sans attendre l'événement start
+    registry.track(container_id)
+    return container_id
+
 def get_all_managed_containers() -> List[Dict[str, Any]]:
     """
-    Récupère les infos sur tous les conteneurs gérés par l'agent.
+    Récupère les infos sur tous les conteneurs gérés par l'agent (depuis le registre).
+    """
+    return [r.to_dict() for r in registry.all()]
+
+def exec_rdp_connections(container_id: str):
+    """
+    Repli quand /proc n'est pas lisible : `ss -t -n` dans le conteneur.
+    Retourne le nombre de connexions établies sur :3389, None si indéterminable (pas de `ss`...).
     """
     try:
-        # Version sans `bash -c`
-        output = subprocess.check_output(
-            [
-                "docker", "ps", "-a", 
-                "--filter", "label=managed_by=rdp_agent", 
-                "--format", '{"id":"{{.ID}}","status":"{{.Status}}","created":"{{.CreatedAt}}","names":"{{.Names}}"}'
-            ],
-            text=True
-        )
-        containers = []
-        for line in output.strip().split("\n"):
-            if line.strip():
-                try:
-                    containers.append(json.loads(line.strip()))
-                except json.JSONDecodeError:
-                    print(f"Impossible de parser la ligne de conteneur: {line}")
-        return containers
+        exit_code, stdout, _ = docker.exec_run(container_id, ["ss", "-t", "-n"], timeout=10)
     except Exception as e:
-        print(f"Erreur lors de la récupération des conteneurs: {e}")
-        return []
+        print(f"Erreur vérification activité conteneur {container_id}: {e}")
+        return None
+    if exit_code != 0:
+        return None
+    return sum(1 for line in stdout.splitlines() if line.startswith("ESTAB") and ":3389 " in line)
+
+# Table d'activité RDP (dernière connexion établie vue par conteneur), démarrée par start_background
+activity = ActivityTracker(registry.running, ACTIVITY_SWEEP_INTERVAL_SECONDS, fallback_fn=exec_rdp_connections,
+                           traffic_threshold=PAUSE_TRAFFIC_THRESHOLD_BYTES)
+
+# Gel des sessions sans trafic, dégel à l'arrivée d'un client ; démarré par start_background
+freezer = SessionFreezer(docker, registry, activity, PAUSE_IDLE_MINUTES * 60,
+                         PAUSE_WAKE_INTERVAL_SECONDS, PAUSE_TRAFFIC_THRESHOLD_BYTES)
+
+# Télémétrie cgroup v2 par conteneur (/containers/stats)
+stats = ContainerStats(registry.running, CGROUP_ROOT, STATS_MIN_INTERVAL_SECONDS)
+
+def paused_summary() -> Dict[str, Any]:
+    """Sessions gelées (/info) : leur CPU est récupérable tant qu'elles le restent."""
+    paused = registry.paused()
+    by_user: Dict[str, int] = {}
+    for r in paused:
+        by_user[r.owner] = by_user.get(r.owner, 0) + 1
+    return {
+        "paused_containers": len(paused),
+        "paused_cpu": sum(r.cpu_limit for r in paused),
+        "paused_mem_mb": sum(r.memory_limit_mb for r in paused),
+        "paused_by_user": by_user,
+    }
 
 def cleanup_inactive_containers(idle_minutes: int = 120) -> int:
     """
@@ -115,90 +212,27 @@ def cleanup_inactive_containers(idle_minutes: int = 120) -> int:
     """
     try:
         # 1. Supprimer les conteneurs arrêtés depuis plus d'1h pour laisser le temps de débugger
-        subprocess.run(
-            ["docker", "container", "prune", "-f", "--filter", "label=managed_by=rdp_agent", "--filter", "until=1h"],
-            check=True, capture_output=True, text=True
-        )
-        
-        # 2. Identifier et supprimer les conteneurs en marche mais inactifs
-        containers = get_all_managed_containers()
+        docker.prune_containers(labels=[MANAGED_LABEL], until="1h")
+
+        # 2. Supprimer les conteneurs en marche sans connexion RDP depuis idle_minutes (table d'activité)
         cleaned = 0
-        
-        for container in containers:
-            if not container.get("status", "").startswith("Up"):
-                continue
-                
-            container_id = container.get("id")
-            if not container_id:
+
+        for record in registry.running():
+            container_id = record.id
+            idle = activity.idle_seconds(container_id)
+            # Pas encore relevé (lancé depuis le dernier passage) : on attend
+            if idle is None or idle <= idle_minutes * 60:
                 continue
-                
             try:
-                # Vérifie la dernière activité RDP via les connexions TCP
-                last_activity_minutes = check_container_rdp_activity(container_id)
-                
-                if last_activity_minutes > idle_minutes:
-                    print(f"Conteneur {container_id} inactif (pas de connexion RDP détectée), suppression...")
-                    subprocess.run(["docker", "stop", container_id], check=True, capture_output=True, timeout=60)
-                    # La suppression se fera au prochain prune si besoin, mais on peut forcer
-                    subprocess.run(["docker", "rm", container_id], check=True, capture_output=True, timeout=60)
-                    cleaned += 1
+                print(f"Conteneur {container_id} inactif depuis {int(idle // 60)} min (pas de connexion RDP), suppression...")
+                docker.stop_container(container_id)
+                docker.remove_container(container_id)
+                registry.forget(container_id)
+                cleaned += 1
             except Exception as e:
                 print(f"Erreur lors du nettoyage du conteneur {container_id}: {e}")
-                
+
         return cleaned
     except Exception as e:
         print(f"Erreur lors du nettoyage des conteneurs: {e}")
         return 0
-
-def check_container_rdp_activity(container_id: str) -> float:
-    """
-    Vérifie l'activité RDP d'un conteneur en cherchant des connexions TCP établies.
-    Retourne 0 si une connexion est active, sinon retourne l'âge du conteneur en minutes.
-    """
-    try:
-        # On vérifie les connexions établies sur le port RDP interne (3389)
-        # `ss -t -n` liste les sockets TCP. On cherche "ESTAB" et ":3389"
-        result = subprocess.run(
-            ["docker", "exec", container_id, "ss", "-t", "-n"],
-            capture_output=True, text=True, timeout=10
-        )
-        
-        # Si la commande ss n'existe pas, on se rabat sur un comportement sûr (considérer actif)
-        if result.returncode != 0:
-             print(f"Commande 'ss' non trouvée dans {container_id} ou erreur. Conteneur considéré actif par sécurité.")
-             return 0
-
-        if "ESTAB" in result.stdout and ":3389" in result.stdout:
-            # Une connexion RDP est probablement active
-            return 0
-            
-        # Pas de connexion active. On considère le conteneur inactif depuis son démarrage.
-        # On récupère l'heure de démarrage pour calculer la durée d'inactivité.
-        inspect_out = subprocess.check_output(
-            ["docker", "inspect", container_id], text=True
-        )
-        inspect_data = json.loads(inspect_out)
-        
-        if inspect_data and isinstance(inspect_data, list):
-            started_at_str = inspect_data[0].get("State", {}).get("StartedAt", "")
-            if started_at_str:
-                # Format: 2023-09-25T14:53:58.123456789Z
-                start_time = time.mktime(time.strptime(
-                    started_at_str.split('.')[0], 
-                    "%Y-%m-%dT%H:%M:%S"
-                ))
-                # On ajoute le décalage du fuseau horaire local
-                start_time -= time.timezone
-                
-                minutes_since_start = (time.time() - start_time) / 60
-                return minutes_since_start
-
-    except subprocess.TimeoutExpired:
-        print(f"Timeout lors de la vérification d'activité de {container_id}. Conteneur considéré actif.")
-        return 0 # Sécurité: on considère actif en cas de timeout
-    except Exception as e:
-        print(f"Erreur vérification activité conteneur {container_id}: {e}. Conteneur considéré actif par sécurité.")
-        return 0 # Sécurité: en cas d'erreur, on suppose qu'il est actif
-
-    # Fallback si on ne peut pas déterminer l'âge
-    return float('inf')
\ No newline at end of file
@@ -0,0 +1,276 @@
+"""
+Flotte d'agents factices pour les benchmarks du serveur.
+
+Chaque agent écoute sur son propre port et imite l'API de l'agent réel
+(`/ping`, `/info`, `/execute` et `?async=1`, `/launches/<id>`, `/containers`,
+`DELETE /containers/<id>`)
+sans Docker : les "conteneurs" sont des réservations en mémoire qui
+expirent après `--session-seconds`.
+
+    python bench/fake_agent.py --count 50 --base-port 6000 --agents-file /tmp/agents.txt
+
+Tous les agents tournent dans un seul processus (un thread d'écoute par agent,
+HTTP/1.1 keep-alive comme gunicorn en production).
+"""
+import sys
+import json
+import time
+import uuid
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeAgent:
+    def __init__(self, agent_id: str, port: int, args):
+        self.agent_id = agent_id
+        self.port = port
+        self.total_cpu = args.cpu
+        self.total_mem_mb = args.mem_mb
+        self.gpu_capable = args.gpu
+        self.info_latency = args.info_latency
+        self.execute_latency = args.execute_latency
+        self.jitter = args.jitter
+        self.failure_rate = args.failure_rate
+        self.session_seconds = args.session_seconds
+        self._lock = threading.Lock()
+        # container_id -> {"owner", "cpu", "mem_mb", "expires_at"}
+        self._containers = {}
+        # launch_id -> {"phase", "result", "cancelled", "created_at"} (mode asynchrone)
+        self._launches = {}
+
+    def _sleep(self, base: float) -> None:
+        if base > 0:
+            time.sleep(max(0.0, random.gauss(base, base * self.jitter)))
+
+    def _prune(self) -> None:
+        now = time.time()
+        for cid in [cid for cid, c in self._containers.items() if c["expires_at"] < now]:
+            del self._containers[cid]
+
+    def info(self):
+        self._sleep(self.info_latency)
+        with self._lock:
+            self._prune()
+            containers = list(self._containers.values())
+        sessions_by_user = {}
+        for c in containers:
+            sessions_by_user[c["owner"]] = sessions_by_user.get(c["owner"], 0) + 1
+        return 200, {
+            "agent_id": self.agent_id,
+            "url": f"http://127.0.0.1:{self.port}",
+            "total_cpu": self.total_cpu,
+            # Base système + conteneurs ; les conteneurs factices consomment leur quota
+            "used_cpu": round(0.1 * self.total_cpu + sum(c["cpu"] for c in containers), 1),
+            "total_mem_mb": self.total_mem_mb,
+            "used_mem_mb": int(0.1 * self.total_mem_mb) + sum(c["mem_mb"] for c in containers),
+            "running_containers": len(containers),
+            "sessions_by_user": sessions_by_user,
+            "gpu_capable": self.gpu_capable,
+            "ts": int(time.time())
+        }
+
+    def _fits(self, cpu: int, mem_mb: int) -> bool:
+        """Sous verrou : la demande tient-elle à côté des conteneurs factices ?"""
+        used_cpu = 0.1 * self.total_cpu + sum(c["cpu"] for c in self._containers.values())
+        used_mem = 0.1 * self.total_mem_mb + sum(c["mem_mb"] for c in self._containers.values())
+        return used_cpu + cpu <= self.total_cpu and used_mem + mem_mb <= self.total_mem_mb
+
+    def execute_async(self, data):
+        """`/execute?async=1` : refus immédiat si plein, sinon 202 et lancement en tâche de fond."""
+        with self._lock:
+            self._prune()
+            if not self._fits(int(data.get("cpu_limit", 1)), int(data.get("memory_limit_mb", 1024))):
+                return 409, {"status": "error", "error": "Capacité insuffisante"}
+            now = time.time()
+            for lid in [lid for lid, l in self._launches.items() if now - l["created_at"] > 600]:
+                del self._launches[lid]
+            launch_id = uuid.uuid4().hex[:16]
+            self._launches[launch_id] = {"phase": "creating", "result": None, "cancelled": False, "created_at": now}
+        threading.Thread(target=self._run_launch, args=(launch_id, data), daemon=True).start()
+        return 202, {"status": "accepted", "launch_id": launch_id, "phase": "creating",
+                     "status_url": f"/launches/{launch_id}"}
+
+    def _run_launch(self, launch_id: str, data) -> None:
+        _, result = self.execute(data)
+        with self._lock:
+            launch = self._launches[launch_id]
+            if launch["cancelled"] and result.get("status") == "ok":
+                # Annulé pendant la création : conteneur supprimé, comme l'agent réel
+                self._containers.pop(result["container_id"], None)
+                result = {"status": "error", "error": "Lancement annulé"}
+            launch["result"] = result
+            launch["phase"] = "started" if result.get("status") == "ok" else "failed"
+
+    def launch(self, launch_id: str):
+        with self._lock:
+            launch = self._launches.get(launch_id)
+            if launch is None:
+                return 404, {"status": "error", "error": "Lancement inconnu"}
+            return 200, {"launch_id": launch_id, **launch}
+
+    def cancel_launch(self, launch_id: str):
+        with self._lock:
+            launch = self._launches.get(launch_id)
+            if launch is None:
+                return 404, {"status": "error", "error": "Lancement inconnu"}
+            launch["cancelled"] = True
+            result = launch["result"]
+            if result is not None and result.get("status") == "ok":
+                self._containers.pop(result["container_id"], None)
+                launch["result"] = {"status": "error", "error": "Lancement annulé"}
+                launch["phase"] = "failed"
+            return 200, {"launch_id": launch_id, **launch}
+
+    def execute(self, data):
+        self._sleep(self.execute_latency)
+        if random.random() < self.failure_rate:
+            return 200, {"status": "error", "error": "Echec lancement: panne simulée"}
+        cpu = int(data.get("cpu_limit", 1))
+        mem_mb = int(data.get("memory_limit_mb", 1024))
+        with self._lock:
+            self._prune()
+            if not self._fits(cpu, mem_mb):
+                # Comme l'agent réel : refus atomique en 409 (pas une panne pour le disjoncteur du serveur)
+                return 409, {"status": "error", "error": "Capacité insuffisante"}
+            cid = uuid.uuid4().hex[:12]
+            self._containers[cid] = {
+                "owner": data.get("username", ""),
+                "cpu": cpu,
+                "mem_mb": mem_mb,
+                "expires_at": time.time() + self.session_seconds,
+            }
+            rdp_port = 40000 + len(self._containers)
+        return 200, {
+            "status": "ok",
+            "rdp_host": "127.0.0.1",
+            "rdp_port": rdp_port,
+            "container_id": cid
+        }
+
+    def containers(self):
+        with self._lock:
+            self._prune()
+            lines = [f"{cid} fake rdp_{c['owner']}" for cid, c in self._containers.items()]
+        return 200, {"containers": lines}
+
+    def stats(self):
+        """Télémétrie factice au format de /containers/stats (chaque session consomme son quota)."""
+        self._sleep(self.info_latency)
+        with self._lock:
+            self._prune()
+            containers = [
+                {"id": cid, "name": f"rdp_{c['owner']}", "owner": c["owner"], "state": "running",
+                 "cpu_limit": c["cpu"], "memory_limit_mb": c["mem_mb"],
+                 "cpu_rate": float(c["cpu"]), "cpu_of_limit": 1.0, "cpu_throttled_ratio": 0.0,
+                 "memory_current": c["mem_mb"] * 1024 * 1024, "io_read_bps": 0, "io_write_bps": 0,
+                 "pids_current": 1}
+                for cid, c in self._containers.items()
+            ]
+        return 200, {"ts": time.time(), "age": 0.0, "collect_ms": 0.0, "containers": containers,
+                     "agent_id": self.agent_id}
+
+    def delete(self, cid: str):
+        with self._lock:
+            if self._containers.pop(cid, None) is None:
+                return 404, {"status": "error", "error": "Conteneur inconnu"}
+        return 200, {"status": "ok"}
+
+
+def make_handler(agent: FakeAgent):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _reply(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.startswith("/launches/"):
+                self._reply(*agent.launch(self.path.rsplit("/", 1)[-1]))
+            elif self.path == "/ping":
+                self._reply(200, {"status": "ok", "agent_id": agent.agent_id})
+            elif self.path == "/info":
+                self._reply(*agent.info())
+            elif self.path == "/containers":
+                self._reply(*agent.containers())
+            elif self.path == "/containers/stats":
+                self._reply(*agent.stats())
+            else:
+                self._reply(404, {"error": "not found"})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                data = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                data = {}
+            path, _, query = self.path.partition("?")
+            if path == "/execute":
+                self._reply(*(agent.execute_async(data) if "async=1" in query else agent.execute(data)))
+            else:
+                self._reply(404, {"error": "not found"})
+
+        def do_DELETE(self):
+            if self.path.startswith("/containers/"):
+                self._reply(*agent.delete(self.path.rsplit("/", 1)[-1]))
+            elif self.path.startswith("/launches/"):
+                self._reply(*agent.cancel_launch(self.path.rsplit("/", 1)[-1]))
+            else:
+                self._reply(404, {"error": "not found"})
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def start_fleet(args):
+    servers = []
+    for i in range(args.count):
+        agent = FakeAgent(f"fake-{i:03d}", args.base_port + i, args)
+        server = ThreadingHTTPServer(("127.0.0.1", agent.port), make_handler(agent))
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name=agent.agent_id, daemon=True).start()
+        servers.append((agent, server))
+    return servers
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Flotte d'agents factices")
+    p.add_argument("--count", type=int, default=5, help="nombre d'agents")
+    p.add_argument("--base-port", type=int, default=6000, help="port du premier agent (les suivants : +1)")
+    p.add_argument("--agents-file", help="écrit un agents.txt pointant vers la flotte")
+    p.add_argument("--cpu", type=int, default=16, help="CPU par agent")
+    p.add_argument("--mem-mb", type=int, default=65536, help="RAM par agent (Mo)")
+    p.add_argument("--gpu", action="store_true", help="agents GPU-capables")
+    p.add_argument("--info-latency", type=float, default=0.01, help="latence moyenne de /info (s)")
+    p.add_argument("--execute-latency", type=float, default=0.5, help="latence moyenne de /execute (s)")
+    p.add_argument("--jitter", type=float, default=0.2, help="écart-type relatif des latences")
+    p.add_argument("--failure-rate", type=float, default=0.0, help="proportion de /execute en échec (0-1)")
+    p.add_argument("--session-seconds", type=float, default=30, help="durée de vie d'un conteneur factice")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    fleet = start_fleet(args)
+    if args.agents_file:
+        with open(args.agents_file, "w", encoding="utf-8") as f:
+            for agent, _ in fleet:
+                f.write(f"{agent.agent_id} http://127.0.0.1:{agent.port}\n")
+    print(f"[FAKE] {len(fleet)} agents sur les ports {args.base_port}-{args.base_port + len(fleet) - 1}", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,366 @@
+"""
+Banc de charge du serveur : flotte d'agents factices + utilisateurs concurrents.
+
+    # 50 agents, 200 utilisateurs, 60 s ; serveur lancé sous gunicorn
+    python bench/loadtest.py run --agents 50 --users 200 --duration 60
+
+    # Comparer deux exécutions (code retour 1 si régression au-delà du seuil)
+    python bench/loadtest.py compare bench/results/avant.json bench/results/apres.json
+
+Chaque utilisateur virtuel se connecte (`/login`), puis boucle : `GET /api/agents`,
+et avec la probabilité `--launch-ratio` un `POST /launch?wait=1`, entrecoupés de
+`--think-time`. Les résultats (débit, percentiles de latence, codes HTTP) sont
+écrits en JSON dans `bench/results/`.
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import socket
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+from typing import Dict, List, Optional
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+SERVER_DIR = os.path.join(REPO_DIR, "server")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+sys.path.insert(0, SERVER_DIR)
+from users import format_users, hash_password  # noqa: E402
+
+BENCH_PASSWORD = "bench"
+BENCH_IMAGE = "bench/fake-rdp:latest"
+PERCENTILES = (50, 90, 95, 99)
+# Métriques comparées par `compare` (plus grand = pire, sauf le débit)
+COMPARED = ("p50_ms", "p95_ms", "p99_ms", "rps", "error_rate")
+
+
+# ==============================
+# Mesures
+# ==============================
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples: Dict[str, List[float]] = {}
+        self._statuses: Dict[str, Dict[str, int]] = {}
+        self._errors: Dict[str, int] = {}
+
+    def record(self, op: str, seconds: float, status: Optional[int]) -> None:
+        with self._lock:
+            self._samples.setdefault(op, []).append(seconds)
+            codes = self._statuses.setdefault(op, {})
+            key = str(status) if status is not None else "exception"
+            codes[key] = codes.get(key, 0) + 1
+            if status is None or status >= 500:
+                self._errors[op] = self._errors.get(op, 0) + 1
+
+    def summary(self, elapsed: float) -> Dict[str, Dict]:
+        with self._lock:
+            ops = {op: sorted(s) for op, s in self._samples.items()}
+            statuses = {op: dict(c) for op, c in self._statuses.items()}
+            errors = dict(self._errors)
+        result = {}
+        for op, samples in ops.items():
+            count = len(samples)
+            stats = {
+                "count": count,
+                "rps": round(count / elapsed, 2) if elapsed else 0,
+                "mean_ms": round(1000 * sum(samples) / count, 2),
+                "max_ms": round(1000 * samples[-1], 2),
+                "errors": errors.get(op, 0),
+                "error_rate": round(errors.get(op, 0) / count, 4),
+                "status": statuses.get(op, {}),
+            }
+            for p in PERCENTILES:
+                stats[f"p{p}_ms"] = round(1000 * percentile(samples, p), 2)
+            result[op] = stats
+        return result
+
+
+def percentile(sorted_samples: List[float], p: float) -> float:
+    """Percentile par interpolation linéaire (échantillons déjà triés)."""
+    if not sorted_samples:
+        return 0.0
+    k = (len(sorted_samples) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_samples) - 1)
+    return sorted_samples[lo] + (sorted_samples[hi] - sorted_samples[lo]) * (k - lo)
+
+
+def timed(recorder: Recorder, op: str, fn, *args, **kwargs):
+    started = time.perf_counter()
+    try:
+        resp = fn(*args, **kwargs)
+    except requests.RequestException:
+        recorder.record(op, time.perf_counter() - started, None)
+        return None
+    recorder.record(op, time.perf_counter() - started, resp.status_code)
+    return resp
+
+
+# ==============================
+# Utilisateurs virtuels
+# ==============================
+def virtual_user(index: int, args, recorder: Recorder, stop_at: float) -> None:
+    base = args.server_url.rstrip("/")
+    http = requests.Session()
+    rng = random.Random(args.seed + index)
+    username = args.username_format.format(i=index)
+    resp = timed(recorder, "login", http.post, f"{base}/login",
+                 data={"username": username, "password": args.password},
+                 allow_redirects=False, timeout=args.timeout)
+    if resp is None or resp.status_code != 302:
+        return
+    # Démarrages étalés : évite que tous les utilisateurs frappent au même instant
+    time.sleep(rng.uniform(0, args.think_time))
+    while time.time() < stop_at:
+        timed(recorder, "agents", http.get, f"{base}/api/agents", timeout=args.timeout)
+        if rng.random() < args.launch_ratio:
+            timed(recorder, "launch", http.post, f"{base}/launch?wait=1",
+                  json={"image": BENCH_IMAGE, "cpu_limit": args.launch_cpu, "memory_limit_gb": args.launch_mem_gb},
+                  timeout=args.launch_timeout)
+        time.sleep(rng.expovariate(1 / args.think_time) if args.think_time > 0 else 0)
+
+
+# ==============================
+# Environnement (agents factices + serveur)
+# ==============================
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until(check, timeout: float, what: str) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if check():
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Délai dépassé en attendant {what}")
+
+
+def start_fake_agents(args, workdir: str):
+    agents_file = os.path.join(workdir, "agents.txt")
+    cmd = [
+        sys.executable, os.path.join(BENCH_DIR, "fake_agent.py"),
+        "--count", str(args.agents), "--base-port", str(args.agent_base_port),
+        "--agents-file", agents_file,
+        "--cpu", str(args.agent_cpu), "--mem-mb", str(args.agent_mem_mb),
+        "--info-latency", str(args.info_latency), "--execute-latency", str(args.execute_latency),
+        "--failure-rate", str(args.failure_rate), "--session-seconds", str(args.session_seconds),
+    ]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+    # La flotte écrit agents.txt puis annonce ses ports
+    proc.stdout.readline()
+    return proc, agents_file
+
+
+def start_server(args, workdir: str, agents_file: str):
+    users = {
+        args.username_format.format(i=i): {
+            "password_hash": hash_password(args.password), "first_login": False, "role": args.role
+        }
+        for i in range(args.users)
+    }
+    with open(os.path.join(workdir, "users.txt"), "w", encoding="utf-8") as f:
+        f.write(format_users(users))
+    images_file = os.path.join(workdir, "images.txt")
+    with open(images_file, "w", encoding="utf-8") as f:
+        f.write(BENCH_IMAGE + "\n")
+
+    port = free_port()
+    env = dict(os.environ,
+               AGENTS_FILE=agents_file, IMAGES_FILE=images_file, SERVER_PORT=str(port),
+               SECRET_KEY="bench", USERS_BACKEND="file",
+               # Un thread par utilisateur connecté + marge pour les jobs
+               SERVER_THREADS=str(max(128, args.users + 32)))
+    # Même mode de service qu'en production (gunicorn, cf. gunicorn.conf.py)
+    cmd = [sys.executable, "-m", "gunicorn", "-c", os.path.join(SERVER_DIR, "gunicorn.conf.py"),
+           "--pythonpath", SERVER_DIR, "app:app"]
+    log = open(os.path.join(workdir, "server.log"), "w")
+    proc = subprocess.Popen(cmd, cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+    return proc, f"http://127.0.0.1:{port}"
+
+
+def wait_for_fleet(args, expected_agents: int) -> None:
+    base = args.server_url.rstrip("/")
+    http = requests.Session()
+    wait_until(lambda: http.get(f"{base}/login", timeout=2).status_code == 200, 30, "le serveur")
+    http.post(f"{base}/login", data={"username": args.username_format.format(i=0), "password": args.password},
+              timeout=5)
+
+    def all_online():
+        agents = http.get(f"{base}/api/agents?refresh=1", timeout=10).json()["agents"]
+        return agents and sum(a["online"] for a in agents) >= expected_agents
+    wait_until(all_online, 60, "les agents en ligne")
+
+
+def scrape_metrics(base: str) -> Optional[str]:
+    try:
+        r = requests.get(f"{base.rstrip('/')}/metrics", timeout=5)
+        return r.text if r.status_code == 200 else None
+    except requests.RequestException:
+        return None
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ==============================
+# Commandes
+# ==============================
+def cmd_run(args) -> int:
+    workdir = tempfile.mkdtemp(prefix="rdp-bench-")
+    procs = []
+    expected_agents = 1
+    try:
+        if not args.server_url:
+            expected_agents = args.agents
+            fleet, agents_file = start_fake_agents(args, workdir)
+            procs.append(fleet)
+            server, args.server_url = start_server(args, workdir, agents_file)
+            procs.append(server)
+        wait_for_fleet(args, expected_agents)
+
+        recorder = Recorder()
+        started = time.time()
+        stop_at = started + args.duration
+        threads = [
+            threading.Thread(target=virtual_user, args=(i, args, recorder, stop_at), daemon=True)
+            for i in range(args.users)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(timeout=max(0.0, stop_at - time.time()) + args.launch_timeout)
+        elapsed = time.time() - started
+
+        results = recorder.summary(elapsed)
+        report = {
+            "meta": {
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "git_commit": git_commit(),
+                "python": platform.python_version(),
+                "elapsed_seconds": round(elapsed, 2),
+                "config": {k: v for k, v in vars(args).items() if k != "func"},
+            },
+            "results": results,
+        }
+        metrics_text = scrape_metrics(args.server_url)
+        if metrics_text is not None:
+            report["server_metrics"] = metrics_text
+
+        output = args.output or os.path.join(RESULTS_DIR, f"bench-{time.strftime('%Y%m%d-%H%M%S')}.json")
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print_results(results)
+        print(f"\nRésultats : {output}")
+        return 0
+    finally:
+        for proc in reversed(procs):
+            proc.terminate()
+            try:
+                proc.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        if args.keep_workdir:
+            print(f"Répertoire de travail : {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def print_results(results: Dict[str, Dict]) -> None:
+    header = f"{'op':<8} {'count':>7} {'rps':>8} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9} {'err':>6}  status"
+    print(header)
+    print("-" * len(header))
+    for op, s in results.items():
+        print(f"{op:<8} {s['count']:>7} {s['rps']:>8} {s['p50_ms']:>8}m {s['p90_ms']:>8}m "
+              f"{s['p99_ms']:>8}m {s['max_ms']:>8}m {s['errors']:>6}  {s['status']}")
+
+
+def cmd_compare(args) -> int:
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    with open(args.candidate, encoding="utf-8") as f:
+        candidate = json.load(f)["results"]
+
+    regressions = []
+    print(f"{'op':<8} {'métrique':<11} {'avant':>10} {'après':>10} {'écart':>8}")
+    for op in sorted(set(baseline) & set(candidate)):
+        for metric in COMPARED:
+            before, after = baseline[op][metric], candidate[op][metric]
+            delta = (after - before) / before if before else 0.0
+            worse = -delta if metric == "rps" else delta
+            flag = ""
+            if metric != "error_rate" and worse > args.threshold:
+                flag = "  ← régression"
+                regressions.append((op, metric))
+            elif metric == "error_rate" and after > before + args.threshold / 100:
+                flag = "  ← régression"
+                regressions.append((op, metric))
+            print(f"{op:<8} {metric:<11} {before:>10} {after:>10} {delta:>+8.1%}{flag}")
+    return 1 if regressions else 0
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Banc de charge du serveur RDP")
+    sub = p.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="lance un benchmark")
+    run.add_argument("--agents", type=int, default=5, help="nombre d'agents factices")
+    run.add_argument("--users", type=int, default=10, help="utilisateurs concurrents")
+    run.add_argument("--duration", type=float, default=30, help="durée de la charge (s)")
+    run.add_argument("--think-time", type=float, default=1.0, help="pause moyenne entre deux actions (s)")
+    run.add_argument("--launch-ratio", type=float, default=0.1, help="probabilité d'un /launch par itération")
+    run.add_argument("--launch-cpu", type=int, default=1)
+    run.add_argument("--launch-mem-gb", type=int, default=1)
+    run.add_argument("--role", default="power", choices=("standard", "power"), help="rôle des comptes de test")
+    run.add_argument("--timeout", type=float, default=30, help="timeout HTTP (s)")
+    run.add_argument("--launch-timeout", type=float, default=180, help="timeout d'un /launch?wait=1 (s)")
+    run.add_argument("--seed", type=int, default=1)
+    run.add_argument("--server-url", help="serveur existant (sinon : agents factices + serveur lancés localement)")
+    run.add_argument("--username-format", default="bench-{i:04d}")
+    run.add_argument("--password", default=BENCH_PASSWORD)
+    run.add_argument("--agent-base-port", type=int, default=6000)
+    run.add_argument("--agent-cpu", type=int, default=16)
+    run.add_argument("--agent-mem-mb", type=int, default=65536)
+    run.add_argument("--info-latency", type=float, default=0.01, help="latence moyenne /info des agents (s)")
+    run.add_argument("--execute-latency", type=float, default=0.5, help="latence moyenne /execute des agents (s)")
+    run.add_argument("--failure-rate", type=float, default=0.0, help="proportion de /execute en échec")
+    run.add_argument("--session-seconds", type=float, default=20, help="durée de vie d'une session factice (s)")
+    run.add_argument("--output", help="fichier JSON de résultats (défaut : bench/results/bench-<date>.json)")
+    run.add_argument("--keep-workdir", action="store_true", help="conserve users.txt, agents.txt et server.log")
+    run.set_defaults(func=cmd_run)
+
+    compare = sub.add_parser("compare", help="compare deux fichiers de résultats")
+    compare.add_argument("baseline")
+    compare.add_argument("candidate")
+    compare.add_argument("--threshold", type=float, default=0.2, help="écart relatif toléré (0.2 = 20 %%)")
+    compare.set_defaults(func=cmd_compare)
+    return p.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,529 @@
+"""
+Simulateur à événements discrets du placement des sessions.
+
+Rejoue une trace de lancements contre la logique de placement du serveur
+(`server/scheduler.py`, `server/admission.py`, `server/roles.py`) en temps
+simulé, sans réseau ni Docker :
+
+    # Trace synthétique de 1000 jours, 300 utilisateurs
+    python bench/simulate.py generate --days 1000 --users 300 --output /tmp/trace.csv
+
+    # Rejoue la trace sur une flotte, pour plusieurs politiques
+    python bench/simulate.py run --trace /tmp/trace.csv --fleet bench/fleet.example.txt \\
+        --policy best-fit,spread,dominant-resource
+
+Flotte : format `agents.txt` (`agent_id URL`), complété par la capacité de chaque
+agent en `clé=valeur` (`cpu=32 mem_gb=128 gpu=1`, et optionnellement `cpu_ratio=2`
+`mem_ratio=1`), ignorée par le serveur.
+
+Comme en production, le scheduler compare la capacité engagée (somme des limites des
+sessions) à l'allouable (total × ratio de surengagement), et chaque agent vérifie le
+lancement avec son `CapacityLedger` (`agent/capacity.py`) : un refus (409) fait passer
+au candidat suivant.
+
+Trace (CSV avec en-tête, ou JSONL) : `t` (secondes depuis le début), `user`, `role`,
+`image`, `cpu`, `ram_gb`, `gpu`, `duration` (secondes).
+"""
+import os
+import sys
+import csv
+import json
+import math
+import heapq
+import random
+import argparse
+import time as _time
+from typing import Dict, Iterable, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), "server"))
+sys.path.append(os.path.join(os.path.dirname(BENCH_DIR), "agent"))
+from scheduler import Scheduler, free_resources, get_policy  # noqa: E402
+from admission import QueueEntry, fair_order  # noqa: E402
+from roles import ROLE_LIMITS  # noqa: E402
+from capacity import CapacityLedger  # noqa: E402
+
+# Types d'événements (ordre de traitement à instant égal : départs d'abord)
+DEPARTURE, EXPIRY, ARRIVAL = 0, 1, 2
+DAY = 86400
+
+
+# ==============================
+# Entrées
+# ==============================
+def parse_fleet(path: str, cpu_ratio: float = 2.0, mem_ratio: float = 1.0) -> List[Dict]:
+    """
+    agents.txt + capacité : `agent_id URL cpu=16 mem_gb=64 gpu=0`. Les ratios de
+    surengagement par défaut (CPU_OVERCOMMIT_RATIO / MEM_OVERCOMMIT_RATIO de l'agent)
+    peuvent être surchargés par agent (`cpu_ratio=`, `mem_ratio=`).
+    """
+    fleet = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            parts = line.split()
+            if len(parts) < 2:
+                continue
+            opts = dict(p.split("=", 1) for p in parts[2:] if "=" in p)
+            fleet.append({
+                "agent_id": parts[0],
+                "url": parts[1],
+                "total_cpu": int(opts.get("cpu", 16)),
+                "total_mem_mb": int(float(opts.get("mem_gb", 64)) * 1024),
+                "gpu_capable": opts.get("gpu", "0").lower() in ("1", "true", "yes"),
+                "cpu_ratio": float(opts.get("cpu_ratio", cpu_ratio)),
+                "mem_ratio": float(opts.get("mem_ratio", mem_ratio)),
+            })
+    if not fleet:
+        raise ValueError(f"Flotte vide : {path}")
+    return fleet
+
+
+def _request(row: Dict) -> Dict:
+    return {
+        "t": float(row["t"]),
+        "username": row["user"],
+        "role": row.get("role") or "standard",
+        "image": row.get("image") or "",
+        "cpu_limit": int(row["cpu"]),
+        "memory_limit_mb": int(float(row["ram_gb"]) * 1024),
+        "gpu": str(row.get("gpu", "")).lower() in ("1", "true", "yes"),
+        "duration": float(row["duration"]),
+    }
+
+
+def read_trace(path: str) -> List[Dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            rows = list(csv.DictReader(f))
+    trace = [_request(r) for r in rows]
+    trace.sort(key=lambda r: r["t"])
+    return trace
+
+
+# ==============================
+# Simulation
+# ==============================
+class SimAgent(dict):
+    """
+    État d'un agent au format de /info, lu par le Scheduler (mis à jour en place) :
+    capacité engagée face à l'allouable, et usage mesuré de l'hôte (base de l'OS plus
+    la part `usage_ratio` des quotas CPU réellement consommée). Le `CapacityLedger`
+    de l'agent valide chaque lancement ; les intégrales servent aux moyennes du rapport.
+    """
+
+    def __init__(self, spec: Dict, base_usage: float, usage_ratio: float):
+        super().__init__(spec)
+        self.usage_ratio = usage_ratio
+        self.base_cpu = base_usage * spec["total_cpu"]
+        self.base_mem = base_usage * spec["total_mem_mb"]
+        self.ledger = CapacityLedger(spec["total_cpu"], spec["total_mem_mb"], spec["cpu_ratio"], spec["mem_ratio"],
+                                     lambda: (self["committed_cpu"], self["committed_mem_mb"]))
+        self.update(online=True, used_cpu=self.base_cpu, used_mem_mb=self.base_mem, running_containers=0,
+                    committed_cpu=0, committed_mem_mb=0,
+                    allocatable_cpu=self.ledger.allocatable_cpu, allocatable_mem_mb=self.ledger.allocatable_mem_mb)
+        self.last_change = 0.0
+        self.cpu_seconds = 0.0
+        self.mem_seconds = 0.0
+        self.committed_seconds = 0.0
+        self.peak_cpu = self.base_cpu
+        self.peak_mem = self.base_mem
+        self.peak_committed = 0.0
+        self.placed = 0
+        self.refused = 0
+        self._seq = 0
+
+    def _accumulate(self, now: float) -> None:
+        dt = now - self.last_change
+        self.cpu_seconds += dt * (self["used_cpu"] - self.base_cpu)
+        self.mem_seconds += dt * (self["used_mem_mb"] - self.base_mem)
+        self.committed_seconds += dt * self["committed_cpu"]
+        self.last_change = now
+
+    def launch(self, now: float, cpu: float, mem: int) -> Optional[str]:
+        """Comme /execute : réserve sur le ledger (None si accepté, sinon la raison du 409)."""
+        self._seq += 1
+        name = f"sim-{self._seq}"
+        reason = self.ledger.reserve(name, cpu, mem)
+        if reason:
+            self.refused += 1
+            return reason
+        self._accumulate(now)
+        self["committed_cpu"] += cpu
+        self["committed_mem_mb"] += mem
+        self["used_cpu"] += cpu * self.usage_ratio
+        self["used_mem_mb"] += mem
+        self["running_containers"] += 1
+        # Le conteneur est dans le registre : la réservation est libérée
+        self.ledger.release(name)
+        self.peak_cpu = max(self.peak_cpu, self["used_cpu"])
+        self.peak_mem = max(self.peak_mem, self["used_mem_mb"])
+        self.peak_committed = max(self.peak_committed, self["committed_cpu"])
+        self.placed += 1
+        return None
+
+    def release(self, now: float, cpu: float, mem: int) -> None:
+        self._accumulate(now)
+        self["committed_cpu"] -= cpu
+        self["committed_mem_mb"] -= mem
+        self["used_cpu"] -= cpu * self.usage_ratio
+        self["used_mem_mb"] -= mem
+        self["running_containers"] -= 1
+
+
+class Simulation:
+    def __init__(self, fleet: List[Dict], policy: str, max_wait: float, usage_ratio: float, base_usage: float):
+        self.agents = [SimAgent(spec, base_usage, usage_ratio) for spec in fleet]
+        self.scheduler = Scheduler(get_policy(policy))
+        self.policy = self.scheduler.policy.name
+        self.max_wait = max_wait
+        self.now = 0.0
+        self.events = []
+        self._seq = 0
+        self.sessions: Dict[str, int] = {}
+        self.queue: List[QueueEntry] = []
+        # Compteurs
+        self.requests = 0
+        self.placed_direct = 0
+        self.placed_after_queue = 0
+        self.rejected: Dict[str, int] = {}
+        self.refused = 0
+        self.queue_delays: List[float] = []
+        self.fragmentation_blocked = 0
+        self.frag_integral = 0.0
+        self.frag_last = 0.0
+        self.peak_queue = 0
+
+    # --- file d'événements ---
+    def _push(self, t: float, kind: int, payload) -> None:
+        self._seq += 1
+        heapq.heappush(self.events, (t, kind, self._seq, payload))
+
+    # --- métriques globales ---
+    def _fragmentation(self) -> float:
+        """1 - (plus grand bloc CPU libre / CPU libre total) : 0 = tout le libre sur un agent."""
+        free = [free_resources(a)[0] for a in self.agents]
+        total = sum(f for f in free if f > 0)
+        return 1 - max(free) / total if total > 0 else 0.0
+
+    def _tick_fragmentation(self) -> None:
+        self.frag_integral += (self.now - self.frag_last) * self._fragmentation()
+        self.frag_last = self.now
+
+    def _fits_aggregate(self, req: Dict) -> bool:
+        """La demande tiendrait si la capacité libre n'était pas éparpillée."""
+        free = [free_resources(a) for a in self.agents if a["gpu_capable"] or not req["gpu"]]
+        free_cpu = sum(max(c, 0) for c, _ in free)
+        free_mem = sum(max(m, 0) for _, m in free)
+        return free_cpu >= req["cpu_limit"] and free_mem >= req["memory_limit_mb"]
+
+    def _fits_empty_fleet(self, req: Dict) -> bool:
+        return any(
+            (a["gpu_capable"] or not req["gpu"])
+            and a["allocatable_cpu"] >= req["cpu_limit"]
+            and a["allocatable_mem_mb"] >= req["memory_limit_mb"]
+            for a in self.agents
+        )
+
+    def _reject(self, reason: str) -> None:
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+
+    # --- placement ---
+    def _try_place(self, req: Dict) -> bool:
+        # Comme run_placement : candidats dans l'ordre du scheduler, un refus de
+        # l'agent (409) passe au suivant
+        decision = self.scheduler.place(self.agents, req)
+        cpu, mem = req["cpu_limit"], req["memory_limit_mb"]
+        for agent in decision.candidates:
+            if agent.launch(self.now, cpu, mem) is not None:
+                self.refused += 1
+                continue
+            self.sessions[req["username"]] = self.sessions.get(req["username"], 0) + 1
+            self._push(self.now + req["duration"], DEPARTURE, (agent, cpu, mem, req["username"]))
+            return True
+        return False
+
+    def _admit_queue(self) -> None:
+        """Comme AdmissionQueue.admit_pending : ordre équitable, petites demandes en backfill."""
+        if not self.queue:
+            return
+        ordered = fair_order(self.queue, lambda u: self.sessions.get(u, 0))
+        admitted = []
+        for entry in ordered:
+            limits = ROLE_LIMITS.get(entry.req["role"], ROLE_LIMITS["standard"])
+            if self.sessions.get(entry.req["username"], 0) >= limits["max_sessions"]:
+                continue
+            if self._try_place(entry.req):
+                admitted.append(entry)
+                self.placed_after_queue += 1
+                self.queue_delays.append(self.now - entry.enqueued_at)
+        if admitted:
+            ids = {id(e) for e in admitted}
+            self.queue = [e for e in self.queue if id(e) not in ids]
+
+    def _arrival(self, req: Dict) -> None:
+        self.requests += 1
+        limits = ROLE_LIMITS.get(req["role"], ROLE_LIMITS["standard"])
+        if req["cpu_limit"] > limits["max_cpu"] or req["memory_limit_mb"] > limits["max_ram_gb"] * 1024:
+            self._reject("role_limit")
+            return
+        if any(e.req["username"] == req["username"] for e in self.queue):
+            self._reject("already_queued")
+            return
+        if self.sessions.get(req["username"], 0) >= limits["max_sessions"]:
+            self._reject("session_cap")
+            return
+        if self._try_place(req):
+            self.placed_direct += 1
+            self.queue_delays.append(0.0)
+            return
+        if not self._fits_empty_fleet(req):
+            self._reject("never_fits")
+            return
+        if self._fits_aggregate(req):
+            self.fragmentation_blocked += 1
+        entry = QueueEntry(None, req, limits["queue_weight"])
+        entry.enqueued_at = self.now
+        self.queue.append(entry)
+        self.peak_queue = max(self.peak_queue, len(self.queue))
+        self._push(self.now + self.max_wait, EXPIRY, entry)
+
+    def _departure(self, payload) -> None:
+        agent, cpu, mem, username = payload
+        agent.release(self.now, cpu, mem)
+        self.sessions[username] -= 1
+        self._admit_queue()
+
+    def _expiry(self, entry: QueueEntry) -> None:
+        if entry in self.queue:
+            self.queue.remove(entry)
+            self._reject("queue_timeout")
+
+    def run(self, trace: Iterable[Dict]) -> Dict:
+        for req in trace:
+            self._push(req["t"], ARRIVAL, req)
+        handlers = {ARRIVAL: self._arrival, DEPARTURE: self._departure, EXPIRY: self._expiry}
+        while self.events:
+            t, kind, _, payload = heapq.heappop(self.events)
+            self.now = t
+            self._tick_fragmentation()
+            handlers[kind](payload)
+        return self.report()
+
+    def report(self) -> Dict:
+        horizon = self.now or 1.0
+        for agent in self.agents:
+            agent._accumulate(horizon)
+        placed = self.placed_direct + self.placed_after_queue
+        delays = sorted(self.queue_delays)
+        waited = [d for d in delays if d > 0]
+        total_cpu = sum(a["total_cpu"] for a in self.agents)
+        total_mem = sum(a["total_mem_mb"] for a in self.agents)
+        allocatable_cpu = sum(a["allocatable_cpu"] for a in self.agents)
+        return {
+            "policy": self.policy,
+            "simulated_days": round(horizon / DAY, 2),
+            "requests": self.requests,
+            "placed": placed,
+            "placed_after_queue": self.placed_after_queue,
+            "acceptance_rate": round(placed / self.requests, 4) if self.requests else 0,
+            "rejected": dict(sorted(self.rejected.items())),
+            "refused": self.refused,
+            "queue": {
+                "queued_share": round(len(waited) / len(delays), 4) if delays else 0,
+                "peak_length": self.peak_queue,
+                "mean_delay_s": round(sum(delays) / len(delays), 1) if delays else 0,
+                "p50_delay_s": round(_percentile(delays, 50), 1),
+                "p95_delay_s": round(_percentile(delays, 95), 1),
+                "p99_delay_s": round(_percentile(delays, 99), 1),
+                "max_delay_s": round(delays[-1], 1) if delays else 0,
+            },
+            "fragmentation": {
+                "blocked_by_fragmentation": self.fragmentation_blocked,
+                "mean_index": round(self.frag_integral / horizon, 4),
+            },
+            "utilization": {
+                "cpu": round(sum(a.cpu_seconds for a in self.agents) / (horizon * total_cpu), 4),
+                "mem": round(sum(a.mem_seconds for a in self.agents) / (horizon * total_mem), 4),
+                "cpu_committed": round(sum(a.committed_seconds for a in self.agents) / (horizon * allocatable_cpu), 4),
+            },
+            "agents": [
+                {
+                    "agent_id": a["agent_id"],
+                    "placed": a.placed,
+                    "refused": a.refused,
+                    "cpu_util": round(a.cpu_seconds / (horizon * a["total_cpu"]), 4),
+                    "mem_util": round(a.mem_seconds / (horizon * a["total_mem_mb"]), 4),
+                    "peak_cpu": round(a.peak_cpu / a["total_cpu"], 3),
+                    "peak_mem": round(a.peak_mem / a["total_mem_mb"], 3),
+                    "peak_committed": round(a.peak_committed / a["allocatable_cpu"], 3),
+                }
+                for a in self.agents
+            ],
+        }
+
+
+def _percentile(sorted_values: List[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+# ==============================
+# Trace synthétique
+# ==============================
+def generate_trace(days: int, users: int, launches_per_day: float, power_share: float,
+                   gpu_share: float, mean_hours: float, seed: int) -> Iterable[Dict]:
+    """
+    Lancements en heures ouvrées (pic vers 10 h et 14 h), durées log-normales,
+    tailles tirées dans les limites du rôle de l'utilisateur.
+    """
+    rng = random.Random(seed)
+    roles = {f"user{i:04d}": ("power" if rng.random() < power_share else "standard") for i in range(users)}
+    names = list(roles)
+    sigma = 0.8
+    mu = math.log(mean_hours * 3600) - sigma ** 2 / 2
+    for day in range(days):
+        if day % 7 >= 5:  # week-end : activité réduite
+            count = int(rng.gauss(launches_per_day * 0.1, 1) if launches_per_day else 0)
+        else:
+            count = int(rng.gauss(launches_per_day, math.sqrt(launches_per_day)))
+        times = sorted(
+            day * DAY + min(max(rng.gauss(rng.choice((10, 14)), 1.5), 0), 23.99) * 3600
+            for _ in range(max(count, 0))
+        )
+        for t in times:
+            user = rng.choice(names)
+            role = roles[user]
+            limits = ROLE_LIMITS[role]
+            yield {
+                "t": round(t, 1),
+                "user": user,
+                "role": role,
+                "image": "ubuntu-xfce:latest",
+                "cpu": rng.choice([c for c in (1, 2, 4, 8) if c <= limits["max_cpu"]]),
+                "ram_gb": rng.choice([m for m in (2, 4, 8, 16, 32) if m <= limits["max_ram_gb"]]),
+                "gpu": int(role == "power" and rng.random() < gpu_share),
+                "duration": round(min(rng.lognormvariate(mu, sigma), 12 * 3600), 1),
+            }
+
+
+TRACE_FIELDS = ("t", "user", "role", "image", "cpu", "ram_gb", "gpu", "duration")
+
+
+# ==============================
+# Commandes
+# ==============================
+def cmd_generate(args) -> int:
+    rows = generate_trace(args.days, args.users, args.launches_per_day, args.power_share,
+                          args.gpu_share, args.mean_hours, args.seed)
+    with open(args.output, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=TRACE_FIELDS)
+        writer.writeheader()
+        n = 0
+        for row in rows:
+            writer.writerow(row)
+            n += 1
+    print(f"{n} lancements sur {args.days} jours → {args.output}")
+    return 0
+
+
+def cmd_run(args) -> int:
+    fleet = parse_fleet(args.fleet, args.cpu_overcommit, args.mem_overcommit)
+    trace = read_trace(args.trace)
+    reports = []
+    for policy in args.policy.split(","):
+        started = _time.perf_counter()
+        sim = Simulation(fleet, policy.strip(), args.max_wait, args.usage_ratio, args.base_usage)
+        report = sim.run(trace)
+        report["wall_seconds"] = round(_time.perf_counter() - started, 2)
+        reports.append(report)
+    print_reports(reports, show_agents=args.agents)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"fleet": args.fleet, "trace": args.trace, "config": {
+                "max_wait": args.max_wait, "usage_ratio": args.usage_ratio, "base_usage": args.base_usage,
+                "cpu_overcommit": args.cpu_overcommit, "mem_overcommit": args.mem_overcommit,
+            }, "reports": reports}, f, indent=2)
+        print(f"\nRésultats : {args.output}")
+    return 0
+
+
+def print_reports(reports: List[Dict], show_agents: bool = False) -> None:
+    rows = [
+        ("jours simulés", lambda r: r["simulated_days"]),
+        ("demandes", lambda r: r["requests"]),
+        ("acceptées", lambda r: f"{r['acceptance_rate']:.2%}"),
+        ("après attente", lambda r: r["placed_after_queue"]),
+        ("refus agent (409)", lambda r: r["refused"]),
+    ] + [
+        (f"rejet {reason}", lambda r, reason=reason: r["rejected"].get(reason, 0))
+        for reason in sorted({k for r in reports for k in r["rejected"]})
+    ] + [
+        ("attente p50 (s)", lambda r: r["queue"]["p50_delay_s"]),
+        ("attente p95 (s)", lambda r: r["queue"]["p95_delay_s"]),
+        ("attente max (s)", lambda r: r["queue"]["max_delay_s"]),
+        ("file max", lambda r: r["queue"]["peak_length"]),
+        ("bloqués (frag.)", lambda r: r["fragmentation"]["blocked_by_fragmentation"]),
+        ("indice frag.", lambda r: r["fragmentation"]["mean_index"]),
+        ("util. CPU", lambda r: f"{r['utilization']['cpu']:.2%}"),
+        ("util. RAM", lambda r: f"{r['utilization']['mem']:.2%}"),
+        ("CPU engagé", lambda r: f"{r['utilization']['cpu_committed']:.2%}"),
+        ("durée (s)", lambda r: r["wall_seconds"]),
+    ]
+    width = max(18, *(len(r["policy"]) + 2 for r in reports))
+    print(f"{'':<18}" + "".join(f"{r['policy']:>{width}}" for r in reports))
+    for label, get in rows:
+        print(f"{label:<18}" + "".join(f"{str(get(r)):>{width}}" for r in reports))
+    if show_agents:
+        for r in reports:
+            print(f"\n[{r['policy']}] agent  placés  refus  CPU moy  RAM moy  CPU max  RAM max  engagé max")
+            for a in r["agents"]:
+                print(f"  {a['agent_id']:<12} {a['placed']:>6} {a['refused']:>6} {a['cpu_util']:>8.1%} {a['mem_util']:>8.1%} "
+                      f"{a['peak_cpu']:>8.0%} {a['peak_mem']:>8.0%} {a['peak_committed']:>11.0%}")
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Simulateur de placement des sessions RDP")
+    sub = p.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="rejoue une trace")
+    run.add_argument("--trace", required=True, help="trace CSV (en-tête) ou JSONL")
+    run.add_argument("--fleet", required=True, help="agents.txt annoté : `id URL cpu=16 mem_gb=64 gpu=0`")
+    run.add_argument("--policy", default="spread", help="politique(s) séparées par des virgules")
+    run.add_argument("--max-wait", type=float, default=1800, help="attente max en file (QUEUE_MAX_WAIT_SECONDS)")
+    run.add_argument("--usage-ratio", type=float, default=1.0, help="part du quota CPU réellement consommée (usage mesuré)")
+    run.add_argument("--cpu-overcommit", type=float, default=2.0, help="CPU_OVERCOMMIT_RATIO des agents")
+    run.add_argument("--mem-overcommit", type=float, default=1.0, help="MEM_OVERCOMMIT_RATIO des agents")
+    run.add_argument("--base-usage", type=float, default=0.05, help="occupation de base des agents (OS)")
+    run.add_argument("--agents", action="store_true", help="détail par agent")
+    run.add_argument("--output", help="écrit les rapports en JSON")
+    run.set_defaults(func=cmd_run)
+
+    gen = sub.add_parser("generate", help="génère une trace synthétique (CSV)")
+    gen.add_argument("--days", type=int, default=30)
+    gen.add_argument("--users", type=int, default=200)
+    gen.add_argument("--launches-per-day", type=float, default=150, help="lancements par jour ouvré")
+    gen.add_argument("--power-share", type=float, default=0.2, help="part d'utilisateurs `power`")
+    gen.add_argument("--gpu-share", type=float, default=0.1, help="part des lancements `power` avec GPU")
+    gen.add_argument("--mean-hours", type=float, default=3, help="durée moyenne d'une session (h)")
+    gen.add_argument("--seed", type=int, default=1)
+    gen.add_argument("--output", required=True)
+    gen.set_defaults(func=cmd_generate)
+    return p.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+import time
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
+
+
+class QueueEntry:
+    def __init__(self, job, req: Dict, weight: float):
+        self.job = job
+        self.req = req
+        self.weight = weight
+        self.enqueued_at = time.time()
+        self.position = 0
+
+
+def fair_order(entries: List[QueueEntry], usage: Callable[[str], float]) -> List[QueueEntry]:
+    """
+    Ordre d'admission équitable : d'abord les utilisateurs qui consomment le moins
+    (sessions actives pondérées par le poids du rôle), puis le plus ancien.
+    """
+    return sorted(entries, key=lambda e: (usage(e.req["username"]) / e.weight, e.enqueued_at))
+
+
+class AdmissionQueue:
+    """
+    File d'attente des lancements qui ne peuvent pas être placés tout de suite.
+
+    Un thread tente périodiquement (et à chaque `notify`) d'admettre les entrées
+    dans l'ordre `fair_order` ; `try_admit(entry)` retourne True si l'entrée a pu
+    être placée (elle quitte alors la file). Les entrées trop anciennes expirent.
+    `usage(usernames)` retourne l'usage de chaque utilisateur en file ({nom: sessions}) ;
+    il est appelé une fois par réordonnancement, hors du verrou.
+    L'entrée est retirée de la file (sous verrou) avant `try_admit` et remise en file
+    si elle ne peut pas être placée : une annulation concurrente (`remove`) ne peut
+    donc pas viser un job dont le lancement a déjà commencé.
+    """
+
+    def __init__(self, try_admit: Callable[[QueueEntry], bool], usage: Callable[[Iterable[str]], Dict[str, float]],
+                 on_position: Callable[[QueueEntry], None], on_expire: Callable[[QueueEntry], None],
+                 tick_seconds: float, max_wait_seconds: float):
+        self._try_admit = try_admit
+        self._usage = usage
+        self._on_position = on_position
+        self._on_expire = on_expire
+        self._tick_seconds = tick_seconds
+        self._max_wait_seconds = max_wait_seconds
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._entries: List[QueueEntry] = []
+        # Entrées réclamées par le thread d'admission, en cours de placement
+        self._claimed: List[QueueEntry] = []
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="admission", daemon=True)
+            self._thread.start()
+
+    def enqueue(self, job, req: Dict, weight: float) -> QueueEntry:
+        entry = QueueEntry(job, req, weight)
+        with self._lock:
+            self._entries.append(entry)
+        self.start()
+        self._reorder()
+        return entry
+
+    def remove(self, job_id: str) -> Optional[QueueEntry]:
+        with self._lock:
+            for entry in self._entries:
+                if entry.job.id == job_id:
+                    self._entries.remove(entry)
+                    break
+            else:
+                return None
+        self._reorder()
+        return entry
+
+    def _claim(self, entry: QueueEntry) -> bool:
+        """Retire `entry` de la file avant de tenter son admission ; faux si déjà retirée (annulée)."""
+        with self._lock:
+            if entry not in self._entries:
+                return False
+            self._entries.remove(entry)
+            self._claimed.append(entry)
+            return True
+
+    def _release_claim(self, entry: QueueEntry, put_back: bool) -> None:
+        """Fin de tentative : l'entrée quitte la file, ou y revient (ordre recalculé au tour suivant)."""
+        with self._lock:
+            self._claimed.remove(entry)
+            if put_back:
+                self._entries.append(entry)
+
+    def queued_for(self, username: str) -> List[QueueEntry]:
+        """Demandes en file de `username`, y compris celle en cours d'admission."""
+        with self._lock:
+            return [e for e in self._entries + self._claimed if e.req["username"] == username]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def notify(self) -> None:
+        """Réveille le thread d'admission (capacité libérée, snapshot rafraîchi...)."""
+        with self._wakeup:
+            self._wakeup.notify()
+
+    def _reorder(self) -> List[QueueEntry]:
+        """Recalcule l'ordre équitable et publie les positions qui ont changé."""
+        with self._lock:
+            entries = list(self._entries)
+        # Usage et tri hors verrou : /launch, l'annulation et /metrics ne l'attendent pas
+        usage = self._usage({e.req["username"] for e in entries}) if entries else {}
+        ordered = fair_order(entries, lambda username: usage.get(username, 0))
+        with self._lock:
+            # Entrées retirées pendant le tri : écartées ; arrivées entre-temps : en fin de file
+            current = set(self._entries)
+            ordered = [e for e in ordered if e in current]
+            sorted_entries = set(ordered)
+            ordered += [e for e in self._entries if e not in sorted_entries]
+            self._entries = ordered
+            moved = []
+            for position, entry in enumerate(ordered, start=1):
+                if entry.position != position:
+                    entry.position = position
+                    moved.append(entry)
+        for entry in moved:
+            self._on_position(entry)
+        # Copie : admit_pending parcourt cet ordre pendant que _claim modifie la file
+        return list(ordered)
+
+    def _run(self) -> None:
+        while True:
+            with self._wakeup:
+                self._wakeup.wait(timeout=self._tick_seconds)
+            try:
+                self.admit_pending()
+            except Exception as e:
+                print(f"[ADMISSION] Erreur: {e}")
+
+    def admit_pending(self) -> None:
+        now = time.time()
+        for entry in self._reorder():
+            if now - entry.enqueued_at > self._max_wait_seconds:
+                if self.remove(entry.job.id):
+                    self._on_expire(entry)
+                continue
+            # Réclamée avant le lancement : annulée entre-temps, on passe
+            if not self._claim(entry):
+                continue
+            # Une petite demande peut passer devant une grosse qui ne tient pas encore
+            admitted = False
+            try:
+                admitted = self._try_admit(entry)
+            finally:
+                self._release_claim(entry, put_back=not admitted)
+            if admitted:
+                self._reorder()
@@ -0,0 +1,134 @@
+import time
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Champs qui ne décrivent pas l'état de l'agent (ignorés pour détecter un changement)
+VOLATILE_FIELDS = ("updated_at", "probed_at", "age")
+
+def _state(agent: Dict) -> Dict:
+    return {k: v for k, v in agent.items() if k not in VOLATILE_FIELDS}
+
+
+class AgentCache:
+    """
+    Snapshot partagé de l'état des agents, rafraîchi en tâche de fond.
+
+    Un seul thread interroge les agents toutes les `interval` secondes ;
+    les requêtes HTTP (/api/agents, /launch) lisent le snapshot en mémoire.
+    La charge sur les agents ne dépend donc plus du nombre d'utilisateurs connectés.
+
+    Chaque changement d'état d'un agent incrémente un numéro de version global ;
+    les abonnés (flux SSE) attendent une nouvelle version et ne reçoivent que
+    les agents modifiés depuis la version qu'ils connaissent.
+    """
+
+    def __init__(self, fetch_all: Callable[[], List[Dict]], interval: float, min_refresh_interval: float = 1.0):
+        self._fetch_all = fetch_all
+        self._interval = interval
+        self._min_refresh_interval = min_refresh_interval
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._agents: List[Dict] = []
+        self._refreshed_at = 0.0
+        self._thread: Optional[threading.Thread] = None
+        self._changed = threading.Condition(self._lock)
+        self._version = 0
+        self._agent_versions: Dict[str, int] = {}
+        self._removed: Dict[str, int] = {}
+
+    def start(self) -> None:
+        """Démarre le thread de polling (idempotent, appelé paresseusement)."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="agent-cache", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"[AGENTS] Erreur rafraîchissement: {e}")
+            time.sleep(self._interval)
+
+    def refresh(self, force: bool = False) -> None:
+        """
+        Ré-interroge tous les agents.
+        Les appels concurrents sont fusionnés : un thread qui attend le verrou
+        réutilise le résultat obtenu pendant son attente.
+        """
+        requested_at = time.time()
+        with self._refresh_lock:
+            if self._refreshed_at >= requested_at:
+                return
+            if force and requested_at - self._refreshed_at < self._min_refresh_interval:
+                return
+            results = self._fetch_all()
+            now = time.time()
+            agents = [{**a, "updated_at": now} for a in results]
+            with self._lock:
+                previous = {a["agent_id"]: _state(a) for a in self._agents}
+                current_ids = {a["agent_id"] for a in agents}
+                changed = [a["agent_id"] for a in agents if previous.get(a["agent_id"]) != _state(a)]
+                removed = [agent_id for agent_id in previous if agent_id not in current_ids]
+                if changed or removed:
+                    self._version += 1
+                    for agent_id in changed:
+                        self._agent_versions[agent_id] = self._version
+                        self._removed.pop(agent_id, None)
+                    for agent_id in removed:
+                        self._agent_versions.pop(agent_id, None)
+                        self._removed[agent_id] = self._version
+                    self._changed.notify_all()
+                self._agents = agents
+                self._refreshed_at = now
+
+    def mark_changed(self, agent_id: str) -> None:
+        """
+        État dérivé d'un agent modifié hors polling (réservation, disjoncteur) :
+        nouvelle version pour cet agent, les abonnés le reçoivent dans un `update`.
+        """
+        with self._lock:
+            self._version += 1
+            self._agent_versions[agent_id] = self._version
+            self._changed.notify_all()
+
+    def snapshot(self, max_age: Optional[float] = None, force: bool = False) -> List[Dict]:
+        """
+        Retourne une copie du snapshot avec l'âge (secondes) de chaque entrée.
+        `max_age` : rafraîchit de façon synchrone si le snapshot est plus vieux.
+        `force` : rafraîchit immédiatement (limité à un par `min_refresh_interval`).
+        """
+        return self.versioned_snapshot(max_age=max_age, force=force)[1]
+
+    def versioned_snapshot(self, max_age: Optional[float] = None, force: bool = False) -> Tuple[int, List[Dict]]:
+        """Comme `snapshot`, mais retourne aussi la version correspondante (ETag)."""
+        self.start()
+        age = time.time() - self._refreshed_at
+        if force or not self._refreshed_at or (max_age is not None and age > max_age):
+            self.refresh(force=force)
+        now = time.time()
+        with self._lock:
+            version, agents = self._version, self._agents
+        return version, [{**a, "age": round(now - a["updated_at"], 2)} for a in agents]
+
+    def wait_for_changes(self, since: int, timeout: float) -> Optional[Tuple[int, List[Dict], List[str]]]:
+        """
+        Bloque jusqu'à ce que la version dépasse `since` (ou `timeout`).
+        Retourne (version, agents modifiés, ids supprimés) ou None si rien n'a changé.
+        """
+        self.start()
+        with self._changed:
+            if not self._changed.wait_for(lambda: self._version > since, timeout=timeout):
+                return None
+            version = self._version
+            changed_ids = {agent_id for agent_id, v in self._agent_versions.items() if v > since}
+            removed = [agent_id for agent_id, v in self._removed.items() if v > since]
+            agents = [a for a in self._agents if a["agent_id"] in changed_ids]
+        now = time.time()
+        return version, [{**a, "age": round(now - a["updated_at"], 2)} for a in agents], removed
+
+    @property
+    def refreshed_at(self) -> float:
+        return self._refreshed_at
@@ -0,0 +1,140 @@
+import time
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+
+class ConnectionStats:
+    """Compteurs de connexions d'un client (réutilisation keep-alive, temps de connexion)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+        self.connect_errors = 0
+        self.connect_time_total = 0.0
+
+    def record_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def record_connect(self, duration: float, ok: bool = True) -> None:
+        with self._lock:
+            if ok:
+                self.new_connections += 1
+                self.connect_time_total += duration
+            else:
+                self.connect_errors += 1
+
+    def as_dict(self) -> Dict:
+        with self._lock:
+            reused = max(self.requests - self.new_connections, 0)
+            return {
+                "requests": self.requests,
+                "new_connections": self.new_connections,
+                "connect_errors": self.connect_errors,
+                "reuse_ratio": round(reused / self.requests, 3) if self.requests else 0.0,
+                "avg_connect_ms": round(1000 * self.connect_time_total / self.new_connections, 2) if self.new_connections else 0.0,
+            }
+
+
+def _timed_connection(conn_cls, stats: ConnectionStats):
+    """Sous-classe de connexion urllib3 qui mesure chaque établissement de connexion."""
+    class TimedConnection(conn_cls):
+        def connect(self):
+            t0 = time.perf_counter()
+            try:
+                super().connect()
+            except Exception:
+                stats.record_connect(time.perf_counter() - t0, ok=False)
+                raise
+            stats.record_connect(time.perf_counter() - t0)
+    return TimedConnection
+
+
+class _StatsAdapter(HTTPAdapter):
+    def __init__(self, stats: ConnectionStats, **kwargs):
+        self._stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        http_pool = type("TimedHTTPConnectionPool", (HTTPConnectionPool,), {
+            "ConnectionCls": _timed_connection(HTTPConnection, self._stats)
+        })
+        https_pool = type("TimedHTTPSConnectionPool", (HTTPSConnectionPool,), {
+            "ConnectionCls": _timed_connection(HTTPSConnection, self._stats)
+        })
+        self.poolmanager.pool_classes_by_scheme = {"http": http_pool, "https": https_pool}
+
+
+class AgentClient:
+    """
+    Client HTTP d'un agent : session keep-alive avec pool de connexions dédié.
+    Les timeouts sont séparés (connexion / lecture).
+    """
+
+    def __init__(self, base_url: str, pool_size: int, connect_timeout: float, read_timeout: float):
+        self.base_url = base_url
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.stats = ConnectionStats()
+        self.session = requests.Session()
+        adapter = _StatsAdapter(self.stats, pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _timeout(self, read_timeout: Optional[float]) -> Tuple[float, float]:
+        return (self.connect_timeout, read_timeout if read_timeout is not None else self.read_timeout)
+
+    def get(self, path: str, read_timeout: Optional[float] = None, **kwargs) -> requests.Response:
+        self.stats.record_request()
+        return self.session.get(self.base_url + path, timeout=self._timeout(read_timeout), **kwargs)
+
+    def post(self, path: str, read_timeout: Optional[float] = None, **kwargs) -> requests.Response:
+        self.stats.record_request()
+        return self.session.post(self.base_url + path, timeout=self._timeout(read_timeout), **kwargs)
+
+    def delete(self, path: str, read_timeout: Optional[float] = None, **kwargs) -> requests.Response:
+        self.stats.record_request()
+        return self.session.delete(self.base_url + path, timeout=self._timeout(read_timeout), **kwargs)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class AgentClientPool:
+    """Un `AgentClient` par URL d'agent, créé à la demande."""
+
+    def __init__(self, pool_size: int, connect_timeout: float, read_timeout: float):
+        self._pool_size = pool_size
+        self._connect_timeout = connect_timeout
+        self._read_timeout = read_timeout
+        self._lock = threading.Lock()
+        self._clients: Dict[str, AgentClient] = {}
+
+    def get(self, base_url: str) -> AgentClient:
+        with self._lock:
+            client = self._clients.get(base_url)
+            if client is None:
+                client = AgentClient(base_url, self._pool_size, self._connect_timeout, self._read_timeout)
+                self._clients[base_url] = client
+            return client
+
+    def prune(self, base_urls: Iterable[str]) -> None:
+        """Ferme les clients des agents qui ne sont plus listés."""
+        keep = set(base_urls)
+        with self._lock:
+            removed = [url for url in self._clients if url not in keep]
+            clients = [self._clients.pop(url) for url in removed]
+        for client in clients:
+            client.close()
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            clients = dict(self._clients)
+        return {url: client.stats.as_dict() for url, client in clients.items()}
@@ -1,91 +1,108 @@
 import os
+import json
 import time
+import threading
 import requests
-from flask import Flask, request, render_template_string, jsonify, redirect, url_for, session
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from flask import Flask, Response, abort, request, jsonify, redirect, url_for, session
 from dotenv import load_dotenv
 from users import verify_user, get_user_role, change_password
+from agent_cache import AgentCache
+from agent_client import AgentClientPool
+from jobs import JobStore, PHASE_QUEUED, PHASE_SCHEDULING, PHASE_STARTING
+from scheduler import Scheduler, get_policy
+from reservations import ReservationLedger
+from circuit import CircuitBreakerRegistry
+from admission import AdmissionQueue
+from config_cache import ConfigFile, parse_agents, parse_images
+from assets import AssetRegistry, ASSET_MAX_AGE_SECONDS
+from metrics import Registry
+from roles import ROLE_LIMITS
 
 load_dotenv()
 
-app = Flask(__name__)
+# Les fichiers statiques sont servis par /assets (URLs hashées), pas par /static
+app = Flask(__name__, static_folder=None)
 app.secret_key = os.getenv("SECRET_KEY", os.urandom(24))
 
-AGENTS_FILE = "agents.txt"
-IMAGES_FILE = "images.txt"
-REQUEST_TIMEOUT_SECONDS = 6
-FALLBACK_RETRY_DELAY = 0.8
+AGENTS_FILE = os.getenv("AGENTS_FILE", "agents.txt")
+IMAGES_FILE = os.getenv("IMAGES_FILE", "images.txt")
+# Intervalle min entre deux vérifications (stat) des fichiers de config
+CONFIG_CHECK_INTERVAL_SECONDS = float(os.getenv("CONFIG_CHECK_INTERVAL_SECONDS", "1"))
+REQUEST_TIMEOUT_SECONDS = float(os.getenv("REQUEST_TIMEOUT_SECONDS", "6"))
 
-# Limites par rôle
-ROLE_LIMITS = {
-    "standard": {"max_cpu": 4, "max_ram_gb": 4},
-    "power": {"max_cpu": 10, "max_ram_gb": 32}
-}
+# Connexions keep-alive vers les agents (un pool par agent)
+AGENT_POOL_SIZE = int(os.getenv("AGENT_POOL_SIZE", "10"))
+AGENT_CONNECT_TIMEOUT_SECONDS = float(os.getenv("AGENT_CONNECT_TIMEOUT_SECONDS", "2"))
+# /execute est appelé en mode asynchrone (202 + suivi de GET /launches/<id>) ; un agent
+# sans ce mode répond de façon synchrone et peut inclure un docker pull (120 s côté agent)
+EXECUTE_READ_TIMEOUT_SECONDS = float(os.getenv("EXECUTE_READ_TIMEOUT_SECONDS", "130"))
+# Suivi d'un lancement asynchrone : période de relève et durée max (file + pull + démarrage),
+# au-delà le lancement est annulé sur l'agent (DELETE /launches/<id>). À garder sous
+# RESERVATION_TTL_SECONDS : la réservation doit couvrir tout le lancement
+EXECUTE_POLL_INTERVAL_SECONDS = float(os.getenv("EXECUTE_POLL_INTERVAL_SECONDS", "0.5"))
+EXECUTE_TIMEOUT_SECONDS = float(os.getenv("EXECUTE_TIMEOUT_SECONDS", "170"))
+
+# Jobs de lancement asynchrones
+LAUNCH_WORKERS = int(os.getenv("LAUNCH_WORKERS", "16"))
+JOB_TTL_SECONDS = float(os.getenv("JOB_TTL_SECONDS", "900"))
+JOB_STREAM_KEEPALIVE_SECONDS = 15
+
+# Interrogation parallèle des agents (/info)
+AGENTS_POLL_WORKERS = int(os.getenv("AGENTS_POLL_WORKERS", "32"))
+# Délai global : au-delà, les agents qui n'ont pas répondu sont marqués "stale"
+AGENTS_POLL_DEADLINE_SECONDS = float(os.getenv("AGENTS_POLL_DEADLINE_SECONDS", "4"))
+# Snapshot partagé : période de rafraîchissement en tâche de fond
+AGENTS_REFRESH_INTERVAL_SECONDS = float(os.getenv("AGENTS_REFRESH_INTERVAL_SECONDS", "3"))
+# Âge maximal accepté lors d'un lancement avant rafraîchissement synchrone
+AGENTS_CACHE_MAX_AGE_SECONDS = float(os.getenv("AGENTS_CACHE_MAX_AGE_SECONDS", "15"))
+# Flux SSE : keepalive et durée max d'une connexion (le navigateur se reconnecte)
+AGENTS_STREAM_KEEPALIVE_SECONDS = float(os.getenv("AGENTS_STREAM_KEEPALIVE_SECONDS", "15"))
+AGENTS_STREAM_MAX_SECONDS = float(os.getenv("AGENTS_STREAM_MAX_SECONDS", "300"))
+# Chaque flux SSE occupe un thread gunicorn tant qu'il est ouvert : au-delà de SSE_MAX_STREAMS
+# flux simultanés (moitié des threads par défaut), 503 + Retry-After et le navigateur repasse
+# en polling ETag ; le reste des threads reste disponible pour les requêtes ordinaires
+SSE_MAX_STREAMS = int(os.getenv("SSE_MAX_STREAMS", str(max(int(os.getenv("SERVER_THREADS", "128")) // 2, 1))))
+SSE_RETRY_AFTER_SECONDS = int(os.getenv("SSE_RETRY_AFTER_SECONDS", "60"))
+
+# Politique de placement : best-fit | spread (worst-fit) | dominant-resource
+SCHEDULER_POLICY = os.getenv("SCHEDULER_POLICY", "spread")
+# Durée de vie max d'une réservation (lancement en cours)
+RESERVATION_TTL_SECONDS = float(os.getenv("RESERVATION_TTL_SECONDS", "180"))
+# Disjoncteur par agent : échecs consécutifs avant ouverture, durée d'ouverture
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "3"))
+CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))
+# Lancement "hedgé" : au-delà de ce délai sans réponse, un 2e agent est tenté en parallèle (0 = désactivé)
+HEDGE_AFTER_SECONDS = float(os.getenv("HEDGE_AFTER_SECONDS", "0"))
+# File d'admission quand la flotte est pleine
+ADMISSION_TICK_SECONDS = float(os.getenv("ADMISSION_TICK_SECONDS", "3"))
+QUEUE_MAX_WAIT_SECONDS = float(os.getenv("QUEUE_MAX_WAIT_SECONDS", "1800"))
+
+# /metrics : jeton optionnel (Authorization: Bearer <jeton>) ; vide = accès libre
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+# /api/sessions/stats : durée de réutilisation d'une collecte cgroup de toute la flotte
+SESSION_STATS_CACHE_SECONDS = float(os.getenv("SESSION_STATS_CACHE_SECONDS", "5"))
+
+
+# Fichiers de config : parsés une fois, rechargés dès que leur signature change
+agents_config = ConfigFile(AGENTS_FILE, parse_agents, CONFIG_CHECK_INTERVAL_SECONDS)
+images_config = ConfigFile(IMAGES_FILE, parse_images, CONFIG_CHECK_INTERVAL_SECONDS)
 
 def load_agents():
-    agents = []
-    if not os.path.exists(AGENTS_FILE):
-        return agents
-    with open(AGENTS_FILE, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line or line.startswith("#"):
-                continue
-            parts = line.split()
-            if len(parts) >= 2:
-                agents.append({"agent_id": parts[0], "url": parts[1].rstrip("/")})
-    return agents
+    return agents_config.get()
 
 def load_images():
-    images = []
-    if not os.path.exists(IMAGES_FILE):
-        return images
-    with open(IMAGES_FILE, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if line and not line.startswith("#"):
-                images.append(line)
-    return images
+    return images_config.get()
 
 # ==============================
-# Templates (inchangés)
+# Templates (compilés une fois au démarrage, CSS/JS dans static/)
 # ==============================
 MAIN_PAGE = """<!DOCTYPE html><html lang='fr'>
 <head>
 <meta charset='utf-8'>
 <title><center>Bureaux Virtuels Techlab</center></title>
 <meta name='viewport' content='width=device-width,initial-scale=1'>
-<style>
-/* (styles identiques – coupés ici pour concision si besoin de maintenance future) */
-:root { --bg:#0f1115; --card:#1d232c; --accent:#4f7dff; --accent-hover:#3668f6; --danger:#d94141; --ok:#3fbf62; --text:#ecf1f8; --muted:#9aa4b1; --radius:14px; --mono: ui-monospace, SFMono-Regular, Menlo, Consolas, "Liberation Mono", monospace; --grad:linear-gradient(135deg,#2641ff,#4f7dff 60%,#7aa8ff); }
-*{box-sizing:border-box;} body{margin:0;font-family:system-ui,-apple-system,Segoe UI,Roboto,sans-serif;background:radial-gradient(circle at 20% 20%, #18202a, #0f1115);color:var(--text);line-height:1.45;-webkit-font-smoothing:antialiased;padding:30px 18px 60px;}
-h1{margin:0 0 30px;font-size:clamp(1.9rem,2.8vw,2.6rem);background:var(--grad);-webkit-background-clip:text;color:transparent;letter-spacing:.5px;}
-a{color:var(--accent);text-decoration:none;} a:hover{text-decoration:underline;}
-.grid{display:grid;gap:28px;max-width:1250px;margin:0 auto;grid-template-columns:repeat(auto-fit,minmax(340px,1fr));}
-.card{background:var(--card);border:1px solid #263140;border-radius:var(--radius);padding:22px 22px 26px;position:relative;box-shadow:0 4px 18px -4px rgba(0,0,0,.55), 0 0 0 1px rgba(255,255,255,.02) inset;backdrop-filter:blur(6px);}
-.card h3{margin:0 0 14px;font-size:18px;font-weight:600;letter-spacing:.5px;}
-label{font-size:13px;text-transform:uppercase;letter-spacing:1px;color:var(--muted);display:block;margin-top:14px;margin-bottom:4px;font-weight:600;}
-input,select{width:100%;background:#14181f;border:1px solid #2b333f;color:var(--text);padding:10px 12px;border-radius:8px;font-size:14px;font-family:inherit;transition:.18s border, .18s background;}
-input:focus,select:focus{outline:none;border-color:var(--accent);background:#101318;}
-button{background:var(--grad);border:none;color:#fff;font-weight:600;letter-spacing:.4px;padding:13px 20px;font-size:15px;border-radius:10px;margin-top:22px;cursor:pointer;box-shadow:0 4px 14px -2px rgba(0,0,0,.55);transition:.22s transform, .22s box-shadow, .22s filter;}
-button:hover{filter:brightness(1.08);transform:translateY(-2px);box-shadow:0 10px 26px -6px rgba(0,0,0,.65);}
-button:active{transform:translateY(0);filter:brightness(.95);}
-.smallrow{display:flex;gap:14px;flex-wrap:wrap;}
-.smallrow > div{flex:1 1 120px;min-width:120px;}
-pre{background:#06090d;border:1px solid #222d3a;padding:16px 18px;border-radius:10px;font-size:13px;font-family:var(--mono);color:#8af08a;min-height:120px;overflow:auto;line-height:1.4;}
-table{width:100%;border-collapse:collapse;font-size:13.5px;font-family:var(--mono);}
-th,td{border-bottom:1px solid #22303d;padding:6px 6px;text-align:left;vertical-align:middle;}
-th{font-weight:600;color:var(--muted);font-size:12px;text-transform:uppercase;letter-spacing:1px;}
-.bad{color:var(--danger);} .ok{color:var(--ok);}
-.userbar{position:fixed;top:12px;right:14px;font-size:13px;background:#151b22;border:1px solid #263140;padding:10px 14px;border-radius:10px;display:flex;align-items:center;gap:12px;box-shadow:0 4px 16px -6px rgba(0,0,0,.6);}
-.tag{background:#213044;padding:2px 8px 3px;border-radius:20px;font-size:11px;letter-spacing:.5px;font-weight:600;text-transform:uppercase;color:#8fb3d5;}
-.logout{background:#212c39;border:1px solid #2f3d4d;color:#d5dde6;padding:6px 12px;font-size:12px;font-weight:500;border-radius:8px;text-decoration:none;transition:.2s background;}
-.logout:hover{background:#2e3c4d;}
-.note{font-size:12px;color:var(--muted);margin-top:6px;}
-.form-inline-msg{margin-top:8px;font-size:12px;color:var(--muted);font-style:italic;}
-.success{color:var(--ok);} .error{color:var(--danger);}
-.password-box pre {min-height:auto;}
-footer{margin-top:60px;text-align:center;font-size:12px;color:#566374;}
-</style>
+<link rel='stylesheet' href='{{ asset_url("main.css") }}'>
 </head>
 <body>
 <div class='userbar'>
@@ -155,105 +172,13 @@ footer{margin-top:60px;text-align:center;font-size:12px;color:#566374;}
   Techlab Mines Nancy
 </footer>
 
-<script>
-async function fetchAgents(){
-  try{
-    const r = await fetch('/api/agents');
-    const data = await r.json();
-    const box = document.getElementById('agentsBox');
-    if(!data.agents.length){
-      box.innerHTML = "<i>Aucun agent</i>";
-      return;
-    }
-    let html = "<table><tr><th>ID</th><th>CPU (used/total)</th><th>RAM (used/total MB)</th><th>Cont.</th><th>GPU</th><th>OK?</th></tr>";
-    data.agents.forEach(a=>{
-      html += `<tr>
-        <td>${a.agent_id}</td>
-        <td>${a.used_cpu.toFixed(1)}/${a.total_cpu}</td>
-        <td>${a.used_mem_mb}/${a.total_mem_mb}</td>
-        <td>${a.running_containers}</td>
-        <td>${a.gpu_capable ? 'oui':'non'}</td>
-        <td>${a.online ? '✅':'❌'}</td>
-      </tr>`;
-    });
-    html += "</table>";
-    box.innerHTML = html;
-  }catch(e){
-    console.error(e);
-  }
-}
-setInterval(fetchAgents, 6000);
-fetchAgents();
-
-document.getElementById('launchForm').addEventListener('submit', async (e)=>{
-  e.preventDefault();
-  const out = document.getElementById('output');
-  out.textContent = "Sélection d'un agent...";
-  const fd = new FormData(e.target);
-  const payload = {
-    image: fd.get('image'),
-    cpu_limit: parseInt(fd.get('cpu_limit'),10),
-    memory_limit_gb: parseInt(fd.get('memory_limit_gb'),10),
-    gpu: fd.get('gpu') === '1'
-  };
-  try{
-    const r = await fetch('/launch', {
-      method:'POST',
-      headers:{'Content-Type':'application/json'},
-      body: JSON.stringify(payload)
-    });
-    const txt = await r.text();
-    out.textContent = txt;
-  }catch(err){
-    out.textContent = "Erreur réseau: "+err;
-  }
-});
-
-document.getElementById('pwdForm').addEventListener('submit', async (e)=>{
-  e.preventDefault();
-  const po = document.getElementById('pwdOutput');
-  po.textContent = "Mise à jour...";
-  const fd = new FormData(e.target);
-  try{
-    const r = await fetch('/change_password', {
-      method:'POST',
-      headers:{'Content-Type':'application/json'},
-      body: JSON.stringify({
-        old_password: fd.get('old_password'),
-        new_password: fd.get('new_password')
-      })
-    });
-    const js = await r.json();
-    if(js.status === 'ok'){
-      po.textContent = "Mot de passe changé ✅";
-      e.target.reset();
-    }else{
-      po.textContent = "Erreur: "+js.error;
-    }
-  }catch(err){
-    po.textContent = "Erreur réseau: "+err;
-  }
-});
-</script>
+<script src='{{ asset_url("main.js") }}' defer></script>
 </body></html>
 """
 
 LOGIN_PAGE = """<!DOCTYPE html><html lang='fr'><head><meta charset='utf-8'><title>Login – Techlab</title>
 <meta name='viewport' content='width=device-width,initial-scale=1'>
-<style>
-/* styles login (inchangés) */
-body{font-family:system-ui,-apple-system,Segoe UI,Roboto,sans-serif;background:radial-gradient(circle at 25% 20%, #18202a, #0f1115);margin:0;color:#ecf1f8;}
-.wrap{max-width:380px;margin:90px auto;background:#1d232c;padding:34px 34px 42px;border-radius:18px;border:1px solid #263140;box-shadow:0 6px 30px -8px rgba(0,0,0,.65),0 0 0 1px rgba(255,255,255,.03) inset;}
-h2{margin:0 0 10px;font-weight:600;font-size:26px;letter-spacing:.5px;background:linear-gradient(120deg,#668dff,#b4cfff);-webkit-background-clip:text;color:transparent;}
-p.sub{margin:0 0 22px;font-size:13px;color:#98a6b8;letter-spacing:.3px;}
-label{font-size:12px;text-transform:uppercase;letter-spacing:1px;color:#8da3bb;font-weight:600;margin-top:14px;display:block;}
-input{width:100%;margin-top:6px;background:#14181f;border:1px solid #2d3845;color:#fff;padding:12px 14px;font-size:14px;border-radius:10px;transition:.2s border, .2s background;}
-input:focus{outline:none;background:#101318;border-color:#4f7dff;}
-button{width:100%;margin-top:26px;background:linear-gradient(135deg,#2641ff,#4f7dff 60%,#7aa8ff);color:#fff;font-weight:600;letter-spacing:.5px;padding:14px 16px;border:none;border-radius:12px;font-size:15px;cursor:pointer;box-shadow:0 6px 22px -6px rgba(0,0,0,.6);transition:.22s transform, .22s box-shadow;}
-button:hover{transform:translateY(-2px);box-shadow:0 14px 32px -10px rgba(0,0,0,.7);}
-.err{margin-top:18px;background:#331c1c;border:1px solid #5d2c2c;padding:10px 14px;border-radius:10px;font-size:13px;color:#ff9e9e;}
-footer{text-align:center;margin-top:40px;font-size:11px;color:#5f6e7d;letter-spacing:.5px;}
-</style></head><body>
+<link rel='stylesheet' href='{{ asset_url("login.css") }}'></head><body>
 <div class='wrap'>
   <h2>Techlab</h2>
   <p class='sub'>Connexion aux bureaux virtuels</p>
@@ -270,6 +195,30 @@ footer{text-align:center;margin-top:40px;font-size:11px;color:#5f6e7d;letter-spa
 </body></html>
 """
 
+assets = AssetRegistry(os.path.join(os.path.dirname(os.path.abspath(__file__)), "static"))
+
+def asset_url(name):
+    return url_for('asset', filename=assets.hashed_name(name))
+
+app.jinja_env.globals["asset_url"] = asset_url
+MAIN_TEMPLATE = app.jinja_env.from_string(MAIN_PAGE)
+LOGIN_TEMPLATE = app.jinja_env.from_string(LOGIN_PAGE)
+
+@app.route('/assets/<filename>')
+def asset(filename):
+    """CSS/JS à URL hashée : cache long, variante gzip/brotli pré-calculée."""
+    a = assets.lookup(filename)
+    if a is None:
+        abort(404)
+    encoding = assets.pick_encoding(a, request.headers.get('Accept-Encoding', ''))
+    resp = Response(a.encodings[encoding], mimetype=a.mimetype)
+    if encoding != "identity":
+        resp.headers["Content-Encoding"] = encoding
+    resp.headers["Vary"] = "Accept-Encoding"
+    resp.headers["Cache-Control"] = f"public, max-age={ASSET_MAX_AGE_SECONDS}, immutable"
+    resp.set_etag(a.digest)
+    return resp.make_conditional(request)
+
 # ==============================
 # Auth
 # ==============================
@@ -298,7 +247,7 @@ def login():
                 return redirect(url_for('index'))
             else:
                 error = "Identifiants invalides."
-    return render_template_string(LOGIN_PAGE, error=error)
+    return LOGIN_TEMPLATE.render(error=error)
 
 @app.route('/logout')
 def logout():
@@ -308,41 +257,146 @@ def logout():
 # ==============================
 # Agents (dynamic reload)
 # ==============================
+agent_clients = AgentClientPool(AGENT_POOL_SIZE, AGENT_CONNECT_TIMEOUT_SECONDS, REQUEST_TIMEOUT_SECONDS)
+
+_poll_executor = ThreadPoolExecutor(max_workers=AGENTS_POLL_WORKERS, thread_name_prefix="agent-info")
+
+# ==============================
+# Métriques (/metrics)
+# ==============================
+metrics = Registry()
+AGENT_INFO_SECONDS = metrics.histogram(
+    "rdp_agent_info_seconds", "Durée des appels /info par agent", ["agent_id"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 4, 6, 10))
+AGENT_INFO_ERRORS = metrics.counter(
+    "rdp_agent_info_errors_total", "Appels /info en échec (réseau, HTTP, JSON) par agent", ["agent_id"])
+AGENT_INFO_STALE = metrics.counter(
+    "rdp_agent_info_stale_total", "Agents sans réponse avant AGENTS_POLL_DEADLINE_SECONDS", ["agent_id"])
+LAUNCH_SECONDS = metrics.histogram(
+    "rdp_launch_seconds", "Durée totale d'un lancement (de /launch au résultat)", ["outcome"])
+LAUNCH_PHASE_SECONDS = metrics.histogram(
+    "rdp_launch_phase_seconds", "Temps passé dans chaque phase d'un lancement", ["phase"])
+LAUNCHES = metrics.counter(
+    "rdp_launches_total", "Lancements terminés par résultat (ready, failed) et code HTTP", ["outcome", "status"])
+AGENT_EXECUTES = metrics.counter(
+    "rdp_agent_execute_total",
+    "Appels /execute par agent et résultat (ok, error, refused : agent plein (409), circuit_open, discarded)",
+    ["agent_id", "result"])
+AGENT_EXECUTE_SECONDS = metrics.histogram(
+    "rdp_agent_execute_seconds", "Durée des appels /execute par agent", ["agent_id"])
+LAUNCH_FALLBACKS = metrics.counter(
+    "rdp_launch_fallbacks_total", "Replis vers cet agent après l'échec du candidat précédent", ["agent_id"])
+SSE_REFUSED = metrics.counter(
+    "rdp_sse_refused_total", "Flux SSE refusés (503) car SSE_MAX_STREAMS flux étaient déjà ouverts")
+LAUNCH_HEDGES = metrics.counter(
+    "rdp_launch_hedges_total", "Lancements de secours (hedging) déclenchés")
+
+def offline_agent_info(agent, stale=False):
+    """État d'un agent injoignable (stale=True : pas de réponse avant le délai global)."""
+    return {
+        "agent_id": agent["agent_id"],
+        "url": agent["url"],
+        "total_cpu": 0,
+        "used_cpu": 0,
+        "total_mem_mb": 0,
+        "used_mem_mb": 0,
+        "running_containers": 0,
+        "paused_containers": 0,
+        "paused_cpu": 0,
+        "paused_mem_mb": 0,
+        "committed_cpu": 0,
+        "committed_mem_mb": 0,
+        "allocatable_cpu": 0,
+        "allocatable_mem_mb": 0,
+        "gpu_capable": False,
+        "sessions_by_user": {},
+        "online": False,
+        "stale": stale
+    }
+
 def fetch_agent_info(agent):
-    url = f"{agent['url']}/info"
+    started = time.monotonic()
+    # Heure d'envoi de la sonde : la réponse reflète au moins tout ce qui était fait avant
+    probed_at = time.time()
     try:
-        r = requests.get(url, timeout=REQUEST_TIMEOUT_SECONDS)
+        r = agent_clients.get(agent["url"]).get("/info")
+        AGENT_INFO_SECONDS.observe(time.monotonic() - started, agent["agent_id"])
         if r.status_code != 200:
-            return {**agent, "online": False}
+            AGENT_INFO_ERRORS.inc(agent["agent_id"])
+            return offline_agent_info(agent)
         data = r.json()
         return {
             "agent_id": agent["agent_id"],
             "url": agent["url"],
             "total_cpu": data.get("total_cpu", 0),
-            "used_cpu": data.get("used_cpu", 0),
+            # Arrondi : évite de signaler un changement à chaque fluctuation infime
+            "used_cpu": round(data.get("used_cpu", 0), 1),
             "total_mem_mb": data.get("total_mem_mb", 0),
             "used_mem_mb": data.get("used_mem_mb", 0),
             "running_containers": data.get("running_containers", 0),
+            # Sessions gelées faute de trafic (incluses dans running_containers) : CPU récupérable
+            "paused_containers": data.get("paused_containers", 0),
+            "paused_cpu": data.get("paused_cpu", 0),
+            "paused_mem_mb": data.get("paused_mem_mb", 0),
+            # Capacité engagée (somme des limites des sessions) et allouable (total x surengagement)
+            "committed_cpu": data.get("committed_cpu", 0),
+            "committed_mem_mb": data.get("committed_mem_mb", 0),
+            "allocatable_cpu": data.get("allocatable_cpu", 0),
+            "allocatable_mem_mb": data.get("allocatable_mem_mb", 0),
             "gpu_capable": data.get("gpu_capable", False),
-            "online": True
+            "sessions_by_user": data.get("sessions_by_user", {}),
+            "probed_at": probed_at,
+            "online": True,
+            "stale": False
         }
     except Exception:
-        return {
-            "agent_id": agent["agent_id"],
-            "url": agent["url"],
-            "total_cpu": 0,
-            "used_cpu": 0,
-            "total_mem_mb": 0,
-            "used_mem_mb": 0,
-            "running_containers": 0,
-            "gpu_capable": False,
-            "online": False
-        }
+        AGENT_INFO_ERRORS.inc(agent["agent_id"])
+        return offline_agent_info(agent)
 
 def list_agents_live():
-    # Reload agents file at every request for dynamic update
+    # agents.txt rechargé automatiquement s'il a changé (ajout/suppression dynamique)
     agents = load_agents()
-    return [fetch_agent_info(a) for a in agents]
+    agent_clients.prune(a["url"] for a in agents)
+    # Les /info partent en parallèle : la latence totale est bornée par l'agent
+    # le plus lent ou par AGENTS_POLL_DEADLINE_SECONDS, pas par leur somme.
+    futures = [_poll_executor.submit(fetch_agent_info, a) for a in agents]
+    done, _ = wait(futures, timeout=AGENTS_POLL_DEADLINE_SECONDS)
+    results = []
+    for agent, fut in zip(agents, futures):
+        if fut in done:
+            results.append(fut.result())
+        else:
+            # La requête continue en arrière-plan (bornée par REQUEST_TIMEOUT_SECONDS)
+            fut.cancel()
+            AGENT_INFO_STALE.inc(agent["agent_id"])
+            results.append(offline_agent_info(agent, stale=True))
+    return results
+
+# Un seul poller par processus ; démarré au premier accès
+agent_cache = AgentCache(list_agents_live, AGENTS_REFRESH_INTERVAL_SECONDS)
+
+def observe_job(job):
+    """Métriques d'un lancement terminé : durée totale et temps passé par phase."""
+    outcome = job.phase
+    LAUNCHES.inc(outcome, str(job.http_status))
+    LAUNCH_SECONDS.observe(job.finished_at - job.created_at, outcome)
+    spent = {}
+    for current, following in zip(job.history, job.history[1:]):
+        spent[current["phase"]] = spent.get(current["phase"], 0) + following["ts"] - current["ts"]
+    for phase, seconds in spent.items():
+        LAUNCH_PHASE_SECONDS.observe(seconds, phase)
+
+jobs = JobStore(LAUNCH_WORKERS, JOB_TTL_SECONDS, on_finished=observe_job)
+
+scheduler = Scheduler(get_policy(SCHEDULER_POLICY))
+
+# Réservations et disjoncteurs modifient l'état affiché d'un agent : poussé aux flux SSE
+reservations = ReservationLedger(RESERVATION_TTL_SECONDS, on_change=agent_cache.mark_changed)
+breakers = CircuitBreakerRegistry(CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_OPEN_SECONDS, on_change=agent_cache.mark_changed)
+# Appels /execute (jusqu'à 2 par job en mode hedgé)
+_execute_pool = ThreadPoolExecutor(max_workers=2 * LAUNCH_WORKERS, thread_name_prefix="agent-execute")
+# Sérialise "lecture des réservations + placement + réservation"
+_placement_lock = threading.Lock()
 
 # ==============================
 # Pages
@@ -352,9 +406,8 @@ def list_agents_live():
 def index():
     role = session.get('role', 'standard')
     limits = ROLE_LIMITS.get(role, ROLE_LIMITS['standard'])
-    images = load_images()  # Rechargées à chaque affichage
-    return render_template_string(
-        MAIN_PAGE,
+    images = load_images()  # Rechargées si images.txt a changé
+    return MAIN_TEMPLATE.render(
         username=session.get('username',''),
         role=role,
         limits=limits,
@@ -364,14 +417,441 @@ def index():
 @app.route('/api/agents')
 @login_required
 def api_agents():
-    return jsonify({"agents": list_agents_live()})
+    force = request.args.get('refresh') == '1'
+    version, agents = agent_cache.versioned_snapshot(force=force)
+    agents = reservations.annotate(breakers.annotate(agents))
+    resp = jsonify({"agents": agents, "version": version})
+    # ETag faible : le contenu (âge des entrées) varie, l'état des agents non
+    resp.set_etag(f"agents-{version}-{reservations.version}-{breakers.version}", weak=True)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp.make_conditional(request)
+
+@app.route('/api/config')
+@login_required
+def api_config():
+    """État des fichiers de config (nombre de rechargements, dernier rechargement)."""
+    return jsonify({"agents": agents_config.status(), "images": images_config.status()})
+
+@app.route('/api/agents/connections')
+@login_required
+def api_agents_connections():
+    """Statistiques des connexions keep-alive vers chaque agent."""
+    stats = agent_clients.stats()
+    return jsonify({"agents": [
+        {"agent_id": a["agent_id"], "url": a["url"], **stats[a["url"]]}
+        for a in load_agents() if a["url"] in stats
+    ]})
+
+def _sse(event, data, event_id=None):
+    msg = f"event: {event}\n"
+    if event_id is not None:
+        msg += f"id: {event_id}\n"
+    return msg + f"data: {json.dumps(data)}\n\n"
+
+# Flux SSE ouverts (bornés à SSE_MAX_STREAMS)
+_streams_lock = threading.Lock()
+_streams_open = 0
+
+def _release_stream():
+    global _streams_open
+    with _streams_lock:
+        _streams_open -= 1
+
+def _sse_response(generate):
+    """
+    Réponse SSE si un créneau est libre, sinon 503 + Retry-After : le navigateur ferme
+    le flux et repasse en polling (ETag / 304) au lieu d'immobiliser un thread de plus.
+    Le créneau est rendu à la fermeture de la réponse (fin du flux ou client parti).
+    """
+    global _streams_open
+    with _streams_lock:
+        if _streams_open >= SSE_MAX_STREAMS:
+            SSE_REFUSED.inc()
+            resp = jsonify({"error": "Trop de flux ouverts, utiliser le polling"})
+            resp.status_code = 503
+            resp.headers["Retry-After"] = str(SSE_RETRY_AFTER_SECONDS)
+            return resp
+        _streams_open += 1
+    resp = Response(generate(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+    resp.call_on_close(_release_stream)
+    return resp
+
+@app.route('/api/agents/stream')
+@login_required
+def api_agents_stream():
+    """
+    Server-Sent Events : un snapshot complet à la connexion, puis uniquement
+    les agents dont l'état a changé.
+    """
+    def generate():
+        version, agents = agent_cache.versioned_snapshot()
+        yield "retry: 3000\n"
+        yield _sse("snapshot", {"agents": reservations.annotate(breakers.annotate(agents)), "version": version}, version)
+        deadline = time.time() + AGENTS_STREAM_MAX_SECONDS
+        while time.time() < deadline:
+            changes = agent_cache.wait_for_changes(version, timeout=AGENTS_STREAM_KEEPALIVE_SECONDS)
+            if changes is None:
+                yield ": keepalive\n\n"
+                continue
+            version, changed, removed = changes
+            yield _sse("update", {"agents": reservations.annotate(breakers.annotate(changed)), "removed": removed, "version": version}, version)
+
+    return _sse_response(generate)
 
 # ==============================
 # Lancement
 # ==============================
+def execute_on_agent(agent, payload, cancel=None, on_progress=None):
+    """
+    Lance une session sur `agent` et attend son résultat ; retourne (réponse JSON, None)
+    ou (None, message d'erreur). `cancel` (threading.Event) : abandon du lancement.
+    Un succès n'est pas compté ici : l'appelant sait s'il est retenu (ok) ou écarté
+    (discarded), et chaque /execute n'a qu'un résultat dans AGENT_EXECUTES.
+    """
+    started = time.monotonic()
+    try:
+        rj, error = _execute_on_agent(agent, payload, cancel, on_progress)
+    finally:
+        AGENT_EXECUTE_SECONDS.observe(time.monotonic() - started, agent['agent_id'])
+    if rj is None:
+        if isinstance(error, AgentRefusal):
+            result = "refused"
+        elif isinstance(error, LaunchCancelled):
+            result = "discarded"
+        else:
+            result = "error"
+        AGENT_EXECUTES.inc(agent['agent_id'], result)
+    return rj, error
+
+class AgentRefusal(str):
+    """Erreur d'un agent plein (409) : refus normal, pas une panne pour son disjoncteur."""
+
+class LaunchCancelled(str):
+    """Lancement abandonné par le serveur (autre agent retenu) : ni succès ni panne de l'agent."""
+
+def _execute_on_agent(agent, payload, cancel=None, on_progress=None):
+    client = agent_clients.get(agent['url'])
+    try:
+        # Un agent récent répond 202 tout de suite ; un ancien ignore `async` et répond à la fin
+        resp = client.post("/execute", params={"async": 1}, json=payload, read_timeout=EXECUTE_READ_TIMEOUT_SECONDS)
+    except requests.RequestException as e:
+        return None, f"[{agent['agent_id']}] réseau: {e}"
+
+    if resp.status_code == 409:
+        try:
+            reason = resp.json().get("error", "capacité insuffisante")
+        except Exception:
+            reason = "capacité insuffisante"
+        return None, AgentRefusal(f"[{agent['agent_id']}] refus: {reason}")
+    if resp.status_code not in (200, 202):
+        return None, f"[{agent['agent_id']}] HTTP {resp.status_code}"
+
+    try:
+        rj = resp.json()
+    except Exception:
+        return None, f"[{agent['agent_id']}] réponse non JSON"
+
+    if resp.status_code == 202:
+        rj, error = _follow_launch(agent, rj.get("launch_id"), cancel, on_progress)
+        if rj is None:
+            return None, error
+
+    if rj.get("status") != "ok":
+        return None, f"[{agent['agent_id']}] erreur: {rj.get('error','?')}"
+    return rj, None
+
+def _follow_launch(agent, launch_id, cancel=None, on_progress=None):
+    """
+    Suit GET /launches/<id> jusqu'au résultat ; retourne (résultat de /execute, None) ou
+    (None, erreur). Délai dépassé ou `cancel` : le lancement est annulé sur l'agent,
+    qui supprime le conteneur s'il a déjà démarré (pas de session orpheline).
+    """
+    client = agent_clients.get(agent['url'])
+    cancel = cancel or threading.Event()
+    deadline = time.monotonic() + EXECUTE_TIMEOUT_SECONDS
+    last_error = None
+    while not cancel.wait(EXECUTE_POLL_INTERVAL_SECONDS):
+        if time.monotonic() > deadline:
+            _cancel_launch(agent, launch_id)
+            detail = f" ({last_error})" if last_error else ""
+            return None, f"[{agent['agent_id']}] délai de {EXECUTE_TIMEOUT_SECONDS:g}s dépassé, lancement annulé{detail}"
+        try:
+            resp = client.get(f"/launches/{launch_id}")
+        except requests.RequestException as e:
+            # Coupure passagère : on réessaie jusqu'au délai
+            last_error = f"réseau: {e}"
+            continue
+        if resp.status_code == 404:
+            return None, f"[{agent['agent_id']}] lancement {launch_id} inconnu (agent redémarré ?)"
+        if resp.status_code != 200:
+            last_error = f"HTTP {resp.status_code}"
+            continue
+        try:
+            state = resp.json()
+        except ValueError:
+            last_error = "réponse non JSON"
+            continue
+        if state.get("result") is not None:
+            return state["result"], None
+        if on_progress is not None:
+            on_progress(state)
+    _cancel_launch(agent, launch_id)
+    return None, LaunchCancelled(f"[{agent['agent_id']}] lancement annulé (autre agent retenu)")
+
+def _cancel_launch(agent, launch_id):
+    """DELETE /launches/<id> : l'agent arrête le lancement ou supprime le conteneur déjà démarré."""
+    try:
+        agent_clients.get(agent['url']).delete(f"/launches/{launch_id}")
+    except requests.RequestException as e:
+        print(f"[LAUNCH] Impossible d'annuler le lancement {launch_id} sur {agent['agent_id']}: {e}")
+
+def discard_container(agent, container_id):
+    """Supprime le conteneur d'un lancement perdant (mode hedgé)."""
+    try:
+        agent_clients.get(agent['url']).delete(f"/containers/{container_id}")
+    except requests.RequestException as e:
+        print(f"[LAUNCH] Impossible de supprimer {container_id} sur {agent['agent_id']}: {e}")
+
+def _discard_late_winner(future, agent, reservation_id):
+    """Callback pour un /execute encore en vol quand un autre agent a déjà gagné."""
+    reservations.release(reservation_id)
+    rj, error = future.result()
+    if rj is not None:
+        breakers.record_success(agent['agent_id'])
+        AGENT_EXECUTES.inc(agent['agent_id'], "discarded")
+        discard_container(agent, rj.get('container_id'))
+    elif isinstance(error, LaunchCancelled):
+        # Annulé à notre demande : rien à reprocher à l'agent
+        pass
+    elif isinstance(error, AgentRefusal):
+        breakers.record_success(agent['agent_id'])
+    else:
+        breakers.record_failure(agent['agent_id'])
+
+def user_sessions(username, agents_info=None):
+    """Sessions de l'utilisateur : vues par les agents + lancements pas encore visibles."""
+    if agents_info is None:
+        agents_info = agent_cache.snapshot()
+    seen = sum(a.get('sessions_by_user', {}).get(username, 0) for a in agents_info)
+    return seen + reservations.count_for(username, agents_info)
+
+def users_sessions(usernames):
+    """`user_sessions` de plusieurs utilisateurs sur un seul snapshot (ordre de la file d'admission)."""
+    agents_info = agent_cache.snapshot()
+    reserved = reservations.counts_by_owner(agents_info)
+    return {
+        username: sum(a.get('sessions_by_user', {}).get(username, 0) for a in agents_info) + reserved.get(username, 0)
+        for username in usernames
+    }
+
+def place_and_reserve(req):
+    """Placement + réservation sur le premier candidat, atomiquement vis-à-vis des autres lancements."""
+    agents_info = agent_cache.snapshot(max_age=AGENTS_CACHE_MAX_AGE_SECONDS)
+    with _placement_lock:
+        decision = scheduler.place(reservations.annotate(breakers.annotate(agents_info)), req)
+        first_reservation = None
+        if decision.candidates:
+            first_reservation = reservations.reserve(
+                decision.candidates[0]['agent_id'], req["cpu_limit"], req["memory_limit_mb"], owner=req["username"]
+            )
+    return agents_info, decision, first_reservation
+
+def fits_empty_fleet(agents_info, req):
+    """Vrai si la demande tiendrait sur au moins un agent en ligne une fois libéré."""
+    return any(
+        a['online'] and (a['gpu_capable'] or not req['gpu'])
+        and a['total_cpu'] >= req['cpu_limit'] and a['total_mem_mb'] >= req['memory_limit_mb']
+        for a in agents_info
+    )
+
+def run_launch(job, req):
+    """Placement d'une session (exécuté en arrière-plan par `jobs`)."""
+    jobs.update(job, PHASE_SCHEDULING, "Sélection d'un agent...")
+    agents_info, decision, first_reservation = place_and_reserve(req)
+
+    if not decision.candidates:
+        if not fits_empty_fleet(agents_info, req):
+            jobs.fail(job, "Aucun agent n'a les ressources ou est en ligne.", 503, {"decision": decision.to_dict()})
+            return
+        # Flotte pleine : le job attend dans la file d'admission (sans occuper de worker)
+        limits = ROLE_LIMITS.get(req["role"], ROLE_LIMITS['standard'])
+        admission.enqueue(job, req, limits["queue_weight"])
+        return True
+
+    run_placement(job, req, decision, first_reservation)
+
+def run_placement(job, req, decision, first_reservation):
+    """Envoie /execute aux candidats de `decision` (disjoncteurs, hedging) et termine le job."""
+    cpu_limit = req["cpu_limit"]
+    memory_limit_mb = req["memory_limit_mb"]
+    gpu = req["gpu"]
+
+    payload = {
+        "username": req["username"],
+        "password": req["password"],
+        "image": req["image"],
+        "cpu_limit": cpu_limit,
+        "memory_limit_mb": memory_limit_mb,
+        "gpu": gpu
+    }
+
+    errors = []
+    remaining = iter(decision.candidates)
+    in_flight = {}  # future -> (agent, reservation_id)
+    cancels = {}  # future -> threading.Event (abandon du lancement sur l'agent)
+
+    def progress(agent):
+        """Phase du lancement sur l'agent, reprise dans le message du job (pull : couches)."""
+        shown = {}
+
+        def on_progress(state):
+            pull = state.get("pull") or {}
+            if state.get("phase") == "pulling" and pull.get("layers_total"):
+                message = (f"Pull de l'image sur l'agent {agent['agent_id']} : "
+                           f"{pull['layers_done']}/{pull['layers_total']} couches")
+            elif state.get("phase") == "creating":
+                message = f"Création du conteneur sur l'agent {agent['agent_id']}..."
+            else:
+                return
+            if shown.get("message") != message:
+                shown["message"] = message
+                jobs.update(job, PHASE_STARTING, message)
+        return on_progress
+
+    def start_next():
+        """Lance /execute sur le prochain candidat autorisé par son disjoncteur ; retourne cet agent (ou None)."""
+        nonlocal first_reservation
+        for agent in remaining:
+            reservation_id, first_reservation = first_reservation, None
+            if not breakers.allow(agent['agent_id']):
+                errors.append(f"[{agent['agent_id']}] circuit ouvert, ignoré")
+                AGENT_EXECUTES.inc(agent['agent_id'], "circuit_open")
+                if reservation_id is not None:
+                    reservations.release(reservation_id)
+                continue
+            if reservation_id is None:
+                reservation_id = reservations.reserve(agent['agent_id'], cpu_limit, memory_limit_mb, owner=req["username"])
+            jobs.update(job, PHASE_STARTING, f"Démarrage sur l'agent {agent['agent_id']} (pull de l'image si nécessaire)...")
+            cancel = threading.Event()
+            future = _execute_pool.submit(execute_on_agent, agent, payload, cancel, progress(agent))
+            in_flight[future] = (agent, reservation_id)
+            cancels[future] = cancel
+            return agent
+        return None
+
+    start_next()
+    winner = None
+    hedged = False
+    while in_flight and winner is None:
+        # Un seul lancement de secours (hedge) par job
+        budget = HEDGE_AFTER_SECONDS if HEDGE_AFTER_SECONDS > 0 and not hedged else None
+        done, _ = wait(in_flight, timeout=budget, return_when=FIRST_COMPLETED)
+        if not done:
+            hedged = True
+            if start_next() is not None:
+                LAUNCH_HEDGES.inc()
+            continue
+        for future in done:
+            agent, reservation_id = in_flight.pop(future)
+            rj, error = future.result()
+            if rj is None:
+                errors.append(error)
+                reservations.release(reservation_id)
+                if isinstance(error, AgentRefusal):
+                    # L'agent a répondu vite et correctement : il est juste plein
+                    breakers.record_success(agent['agent_id'])
+                else:
+                    breakers.record_failure(agent['agent_id'])
+            elif winner is None:
+                breakers.record_success(agent['agent_id'])
+                AGENT_EXECUTES.inc(agent['agent_id'], "ok")
+                reservations.confirm(reservation_id)
+                winner = (agent, rj)
+            else:
+                # Les deux ont réussi en même temps : on garde le premier
+                breakers.record_success(agent['agent_id'])
+                AGENT_EXECUTES.inc(agent['agent_id'], "discarded")
+                reservations.release(reservation_id)
+                discard_container(agent, rj.get('container_id'))
+        if winner is None and not in_flight:
+            fallback = start_next()
+            if fallback is not None:
+                LAUNCH_FALLBACKS.inc(fallback['agent_id'])
+
+    # Lancements encore en vol : annulés sur l'agent ; un conteneur démarré malgré tout
+    # (agent sans mode asynchrone) sera supprimé à leur terminaison
+    for future, (agent, reservation_id) in in_flight.items():
+        cancels[future].set()
+        future.add_done_callback(lambda f, a=agent, r=reservation_id: _discard_late_winner(f, a, r))
+
+    # Des réservations ont pu être libérées : la file d'admission peut avancer
+    admission.notify()
+
+    if winner is None:
+        jobs.fail(job, "Échec sur tous les agents:\n" + "\n".join(errors), 502, {"decision": decision.to_dict()})
+        return
+
+    agent, rj = winner
+    decision.chosen = agent['agent_id']
+    result = {
+        "agent_id": agent['agent_id'],
+        "rdp_host": rj.get('rdp_host'),
+        "rdp_port": rj.get('rdp_port'),
+        "container_id": rj.get('container_id'),
+        "image": req["image"],
+        "cpu_limit": cpu_limit,
+        "memory_limit_mb": memory_limit_mb,
+        "gpu": gpu,
+        "hedged": hedged,
+        "decision": decision.to_dict()
+    }
+    jobs.finish(job, (
+        f"✅ Session lancée sur agent {agent['agent_id']}\n\n"
+        f"Connexion RDP : {rj.get('rdp_host')}:{rj.get('rdp_port')}\n"
+        f"USER : {req['username']}\n"
+        f"PASS : {req['password']}\n"
+        f"Container : {rj.get('container_id')}\n"
+        f"Image : {req['image']}\n"
+        f"CPU : {cpu_limit} | RAM : {memory_limit_mb // 1024}GB | GPU : {'oui' if gpu else 'non'}\n"
+        f"Placement : {decision.policy} ({len(decision.candidates)} candidat(s))"
+    ), result)
+
+def try_admit(entry):
+    """Tente de placer une demande en file ; True si elle quitte la file."""
+    if entry.job.done:
+        return True
+    req = entry.req
+    limits = ROLE_LIMITS.get(req["role"], ROLE_LIMITS['standard'])
+    if user_sessions(req["username"]) >= limits["max_sessions"]:
+        return False
+    _, decision, first_reservation = place_and_reserve(req)
+    if not decision.candidates:
+        return False
+    jobs.update(entry.job, PHASE_SCHEDULING, "Admis : sélection d'un agent...")
+    jobs.resume(entry.job, run_placement, req, decision, first_reservation)
+    return True
+
+def on_queue_position(entry):
+    jobs.update(entry.job, PHASE_QUEUED, f"Flotte pleine : en file d'attente (position {entry.position}/{len(admission)})")
+
+def on_queue_expire(entry):
+    jobs.fail(entry.job, "Temps d'attente dépassé : aucune capacité libérée.", 503)
+
+admission = AdmissionQueue(
+    try_admit, users_sessions, on_queue_position, on_queue_expire,
+    ADMISSION_TICK_SECONDS, QUEUE_MAX_WAIT_SECONDS
+)
+
 @app.route('/launch', methods=['POST'])
 @login_required
 def launch():
+    """
+    Crée un job de lancement et répond immédiatement (202 + job_id).
+    `?wait=1` conserve l'ancien comportement bloquant (réponse texte).
+    """
     try:
         data = request.get_json(force=True, silent=True) or {}
     except Exception:
@@ -395,70 +875,82 @@ def launch():
     if cpu_limit > limits['max_cpu'] or memory_limit_gb > limits['max_ram_gb']:
         return f"Dépasse les limites de ton rôle ({role}) : max {limits['max_cpu']} CPU / {limits['max_ram_gb']} Go", 403
 
-    memory_limit_mb = memory_limit_gb * 1024
-
-    agents_info = list_agents_live()
-    candidates = []
-    for a in agents_info:
-        if not a['online']:
-            continue
-        free_cpu = a['total_cpu'] - a['used_cpu']
-        free_mem = a['total_mem_mb'] - a['used_mem_mb']
-        if free_cpu >= cpu_limit and free_mem >= memory_limit_mb:
-            if gpu and not a['gpu_capable']:
-                continue
-            candidates.append(a)
-
-    if not candidates:
-        return "Aucun agent n'a les ressources ou est en ligne.", 503
-
-    candidates.sort(key=lambda x: (x['total_cpu'] - x['used_cpu']), reverse=True)
+    queued = admission.queued_for(username)
+    if queued:
+        return f"Une demande est déjà en file d'attente (position {queued[0].position}).", 409
+    if user_sessions(username) >= limits['max_sessions']:
+        return f"Nombre maximal de sessions simultanées atteint pour ton rôle ({role}) : {limits['max_sessions']}", 429
 
-    payload = {
+    req = {
         "username": username,
         "password": password,
+        "role": role,
         "image": image,
         "cpu_limit": cpu_limit,
-        "memory_limit_mb": memory_limit_mb,
+        "memory_limit_mb": memory_limit_gb * 1024,
         "gpu": gpu
     }
+    job = jobs.submit(username, run_launch, req)
 
-    errors = []
-    for agent in candidates:
-        execute_url = f"{agent['url']}/execute"
-        try:
-            resp = requests.post(execute_url, json=payload, timeout=REQUEST_TIMEOUT_SECONDS)
-        except requests.RequestException as e:
-            errors.append(f"[{agent['agent_id']}] réseau: {e}")
-            time.sleep(FALLBACK_RETRY_DELAY)
-            continue
+    if request.args.get('wait') == '1':
+        while not job.done:
+            jobs.wait(job, job.version, timeout=JOB_STREAM_KEEPALIVE_SECONDS)
+        return job.message, job.http_status
 
-        if resp.status_code != 200:
-            errors.append(f"[{agent['agent_id']}] HTTP {resp.status_code}")
-            time.sleep(FALLBACK_RETRY_DELAY)
-            continue
+    return jsonify({
+        "job_id": job.id,
+        "status_url": url_for('api_job', job_id=job.id),
+        "stream_url": url_for('api_job_stream', job_id=job.id)
+    }), 202
 
-        try:
-            rj = resp.json()
-        except Exception:
-            errors.append(f"[{agent['agent_id']}] réponse non JSON")
-            continue
+@app.route('/api/jobs')
+@login_required
+def api_jobs():
+    """Jobs récents de l'utilisateur (rattachement après rechargement de page)."""
+    return jsonify({"jobs": [j.to_dict() for j in jobs.list_for(session.get('username',''))]})
 
-        if rj.get("status") == "ok":
-            return (
-                f"✅ Session lancée sur agent {agent['agent_id']}\n\n"
-                f"Connexion RDP : {rj.get('rdp_host')}:{rj.get('rdp_port')}\n"
-                f"USER : {username}\n"
-                f"PASS : {password}\n"
-                f"Container : {rj.get('container_id')}\n"
-                f"Image : {image}\n"
-                f"CPU : {cpu_limit} | RAM : {memory_limit_gb}GB | GPU : {'oui' if gpu else 'non'}"
-            )
-        else:
-            errors.append(f"[{agent['agent_id']}] erreur: {rj.get('error','?')}")
-            time.sleep(FALLBACK_RETRY_DELAY)
+@app.route('/api/jobs/<job_id>')
+@login_required
+def api_job(job_id):
+    job = jobs.get(job_id, session.get('username',''))
+    if job is None:
+        return jsonify({"error": "Job inconnu ou expiré"}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+@login_required
+def api_job_cancel(job_id):
+    """Retire un job de la file d'admission."""
+    job = jobs.get(job_id, session.get('username',''))
+    if job is None:
+        return jsonify({"error": "Job inconnu ou expiré"}), 404
+    if admission.remove(job_id) is None:
+        return jsonify({"error": "Job hors file d'attente (déjà en cours ou terminé)"}), 409
+    jobs.fail(job, "Demande annulée.", 409)
+    return jsonify(job.to_dict())
+
+@app.route('/api/jobs/<job_id>/stream')
+@login_required
+def api_job_stream(job_id):
+    """Progression d'un job en Server-Sent Events (un événement par changement de phase)."""
+    job = jobs.get(job_id, session.get('username',''))
+    if job is None:
+        return jsonify({"error": "Job inconnu ou expiré"}), 404
 
-    return "Échec sur tous les agents:\n" + "\n".join(errors), 502
+    def generate():
+        yield "retry: 3000\n"
+        version = -1
+        while True:
+            if job.version > version:
+                state = job.to_dict()
+                version = state["version"]
+                yield _sse("job", state, version)
+                if state["done"]:
+                    return
+            elif not jobs.wait(job, version, timeout=JOB_STREAM_KEEPALIVE_SECONDS):
+                yield ": keepalive\n\n"
+
+    return _sse_response(generate)
 
 # ==============================
 # Changement de mot de passe
@@ -483,6 +975,137 @@ def change_pwd():
     session['password'] = new_password
     return jsonify({"status":"ok"})
 
+# ==============================
+# Métriques : jauges (calculées au scrape) et endpoint
+# ==============================
+def _fleet_gauge(field):
+    def collect():
+        return [((a["agent_id"],), a[field]) for a in agent_cache.snapshot() if a["online"]]
+    return collect
+
+def _fleet_totals():
+    agents = reservations.annotate(agent_cache.snapshot())
+    online = [a for a in agents if a["online"]]
+    return [
+        (("cpu", "capacity"), sum(a["total_cpu"] for a in online)),
+        (("cpu", "used"), sum(a["used_cpu"] for a in online)),
+        (("cpu", "reserved"), sum(a["reserved_cpu"] for a in online)),
+        (("cpu", "reclaimable"), sum(a["paused_cpu"] for a in online)),
+        (("cpu", "committed"), sum(a["committed_cpu"] for a in online)),
+        (("cpu", "allocatable"), sum(a["allocatable_cpu"] for a in online)),
+        (("memory_mb", "capacity"), sum(a["total_mem_mb"] for a in online)),
+        (("memory_mb", "used"), sum(a["used_mem_mb"] for a in online)),
+        (("memory_mb", "reserved"), sum(a["reserved_mem_mb"] for a in online)),
+        (("memory_mb", "committed"), sum(a["committed_mem_mb"] for a in online)),
+        (("memory_mb", "allocatable"), sum(a["allocatable_mem_mb"] for a in online)),
+    ]
+
+metrics.gauge("rdp_fleet_resources", "Capacité, usage et réservations de la flotte (agents en ligne)",
+              ["resource", "kind"], _fleet_totals)
+metrics.gauge("rdp_agent_cpu_total", "CPU total par agent", ["agent_id"], _fleet_gauge("total_cpu"))
+metrics.gauge("rdp_agent_cpu_used", "CPU utilisé par agent", ["agent_id"], _fleet_gauge("used_cpu"))
+metrics.gauge("rdp_agent_memory_total_mb", "RAM totale par agent (Mo)", ["agent_id"], _fleet_gauge("total_mem_mb"))
+metrics.gauge("rdp_agent_memory_used_mb", "RAM utilisée par agent (Mo)", ["agent_id"], _fleet_gauge("used_mem_mb"))
+metrics.gauge("rdp_agent_containers", "Conteneurs en marche par agent", ["agent_id"], _fleet_gauge("running_containers"))
+metrics.gauge("rdp_agent_paused_containers", "Sessions gelées (sans trafic) par agent", ["agent_id"],
+              _fleet_gauge("paused_containers"))
+metrics.gauge("rdp_agent_up", "1 si l'agent a répondu au dernier /info", ["agent_id"],
+              lambda: [((a["agent_id"],), int(a["online"])) for a in agent_cache.snapshot()])
+metrics.gauge("rdp_agent_circuit_open", "1 si le disjoncteur de l'agent est ouvert", ["agent_id"],
+              lambda: [((a["agent_id"],), int(breakers.state(a["agent_id"]) == "open")) for a in load_agents()])
+metrics.gauge("rdp_agents_snapshot_age_seconds", "Âge du snapshot des agents", [],
+              lambda: [((), round(time.time() - agent_cache.refreshed_at, 3))] if agent_cache.refreshed_at else [])
+metrics.gauge("rdp_admission_queue_length", "Demandes en file d'admission", [], lambda: [((), len(admission))])
+metrics.gauge("rdp_sse_streams_open", "Flux SSE ouverts (un thread chacun)", [], lambda: [((), _streams_open)])
+metrics.gauge("rdp_launch_jobs_active", "Lancements en cours (non terminés)", [], lambda: [((), jobs.active_count())])
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Métriques au format Prometheus (pas de session : jeton optionnel METRICS_TOKEN)."""
+    if METRICS_TOKEN and request.headers.get("Authorization") != f"Bearer {METRICS_TOKEN}":
+        abort(401)
+    return Response(metrics.render(), content_type=Registry.CONTENT_TYPE)
+
+# ==============================
+# Télémétrie des sessions (cgroups v2 des agents)
+# ==============================
+SESSION_STATS_SORT_KEYS = ("cpu_rate", "cpu_of_limit", "cpu_throttled_ratio", "memory_current",
+                           "io_read_bps", "io_write_bps", "pids_current")
+_session_stats_lock = threading.Lock()
+_session_stats = {"at": 0.0, "data": None}
+
+def fetch_agent_stats(agent):
+    try:
+        r = agent_clients.get(agent["url"]).get("/containers/stats")
+        if r.status_code != 200:
+            return None, f"HTTP {r.status_code}"
+        return r.json(), None
+    except Exception as e:
+        return None, str(e)
+
+def collect_session_stats():
+    """
+    Télémétrie de toutes les sessions de la flotte : un GET /containers/stats par agent
+    en ligne, en parallèle, borné par AGENTS_POLL_DEADLINE_SECONDS. Le résultat est
+    partagé pendant SESSION_STATS_CACHE_SECONDS : le coût ne dépend pas du nombre de lecteurs.
+    """
+    with _session_stats_lock:
+        if _session_stats["data"] is not None and time.time() - _session_stats["at"] < SESSION_STATS_CACHE_SECONDS:
+            return _session_stats["data"]
+        agents = [a for a in agent_cache.snapshot() if a["online"]]
+        futures = [_poll_executor.submit(fetch_agent_stats, a) for a in agents]
+        done, _ = wait(futures, timeout=AGENTS_POLL_DEADLINE_SECONDS)
+        summary, sessions = [], []
+        for agent, fut in zip(agents, futures):
+            data, error = fut.result() if fut in done else (None, "délai dépassé")
+            entry = {"agent_id": agent["agent_id"], "error": error}
+            if data is not None:
+                containers = data.get("containers", [])
+                entry.update({
+                    "containers": len(containers),
+                    "collect_ms": data.get("collect_ms"),
+                    "cpu_rate": round(sum(c.get("cpu_rate") or 0 for c in containers), 3),
+                    "memory_current": sum(c.get("memory_current") or 0 for c in containers),
+                })
+                sessions.extend({**c, "agent_id": agent["agent_id"]} for c in containers)
+            summary.append(entry)
+        _session_stats["data"] = {"ts": time.time(), "agents": summary, "sessions": sessions}
+        _session_stats["at"] = time.time()
+        return _session_stats["data"]
+
+@app.route('/api/sessions/stats')
+def api_sessions_stats():
+    """
+    CPU, mémoire, E/S et PIDs des sessions (cgroups v2), débits compris.
+    Session web : ses propres sessions ; jeton METRICS_TOKEN : toute la flotte.
+    `?sort=<champ>&top=N` : les N sessions les plus lourdes selon ce champ.
+    """
+    fleet = bool(METRICS_TOKEN) and request.headers.get("Authorization") == f"Bearer {METRICS_TOKEN}"
+    if not fleet and 'username' not in session:
+        abort(401)
+    data = collect_session_stats()
+    sessions = data["sessions"]
+    if not fleet:
+        sessions = [s for s in sessions if s.get("owner") == session['username']]
+    sort = request.args.get("sort")
+    if sort:
+        if sort not in SESSION_STATS_SORT_KEYS:
+            return jsonify({"error": f"sort doit être parmi {', '.join(SESSION_STATS_SORT_KEYS)}"}), 400
+        sessions = sorted(sessions, key=lambda s: (s.get(sort) is None, -(s.get(sort) or 0)))
+    top = request.args.get("top", type=int)
+    if top:
+        sessions = sessions[:top]
+    return jsonify({"ts": data["ts"], "agents": data["agents"] if fleet else None, "sessions": sessions})
+
+# ==============================
+# Démarrage
+# ==============================
+def start_background():
+    """Démarre les threads de fond (appelé par gunicorn dans le worker ; sinon au premier usage)."""
+    agent_cache.start()
+    admission.start()
+
 if __name__ == '__main__':
+    # Serveur de développement (SERVER_MODE=dev) ; en production : gunicorn -c gunicorn.conf.py app:app
     port = int(os.getenv("SERVER_PORT", "5000"))
-    app.run(host='0.0.0.0', port=port, debug=True)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=port, debug=True, threaded=True)
\ No newline at end of file
@@ -0,0 +1,61 @@
+import os
+import gzip
+import hashlib
+import mimetypes
+from typing import Dict, Optional
+
+try:
+    import brotli
+except ImportError:  # brotli optionnel : gzip seul
+    brotli = None
+
+# Les URLs contiennent le hash du contenu : cache navigateur d'un an
+ASSET_MAX_AGE_SECONDS = 365 * 24 * 3600
+
+
+class Asset:
+    def __init__(self, name: str, content: bytes):
+        self.name = name
+        self.digest = hashlib.sha256(content).hexdigest()[:12]
+        base, ext = os.path.splitext(name)
+        self.hashed_name = f"{base}.{self.digest}{ext}"
+        self.mimetype = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        # Variantes pré-compressées une fois au démarrage
+        self.encodings: Dict[str, bytes] = {"identity": content}
+        self.encodings["gzip"] = gzip.compress(content, compresslevel=9, mtime=0)
+        if brotli is not None:
+            self.encodings["br"] = brotli.compress(content, quality=11)
+
+
+class AssetRegistry:
+    """
+    Fichiers statiques (CSS/JS) chargés en mémoire au démarrage, servis sous
+    une URL contenant le hash de leur contenu (`main.<hash>.css`).
+    """
+
+    def __init__(self, static_dir: str):
+        self._by_name: Dict[str, Asset] = {}
+        self._by_hashed_name: Dict[str, Asset] = {}
+        for name in sorted(os.listdir(static_dir)):
+            path = os.path.join(static_dir, name)
+            if not os.path.isfile(path):
+                continue
+            with open(path, "rb") as f:
+                asset = Asset(name, f.read())
+            self._by_name[name] = asset
+            self._by_hashed_name[asset.hashed_name] = asset
+
+    def hashed_name(self, name: str) -> str:
+        return self._by_name[name].hashed_name
+
+    def lookup(self, hashed_name: str) -> Optional[Asset]:
+        return self._by_hashed_name.get(hashed_name)
+
+    @staticmethod
+    def pick_encoding(asset: Asset, accept_encoding: str) -> str:
+        """Meilleure variante acceptée par le client (br > gzip > identity)."""
+        accepted = {part.split(";")[0].strip().lower() for part in accept_encoding.split(",")}
+        for encoding in ("br", "gzip"):
+            if encoding in asset.encodings and encoding in accepted:
+                return encoding
+        return "identity"
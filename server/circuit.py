@@ -0,0 +1,107 @@
+import time
+import threading
+from typing import Callable, Dict, List, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    def __init__(self):
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+
+
+class CircuitBreakerRegistry:
+    """
+    Disjoncteur par agent pour /execute.
+
+    - closed : l'agent est utilisé normalement ;
+    - open : après `failure_threshold` échecs consécutifs, l'agent est ignoré
+      pendant `open_seconds` ;
+    - half_open : à l'issue de ce délai, un seul lancement « sonde » est autorisé ;
+      son succès referme le circuit, son échec le rouvre.
+    `on_change(agent_id)` est appelé (hors verrou) à chaque changement d'état d'un disjoncteur.
+    """
+
+    def __init__(self, failure_threshold: int, open_seconds: float,
+                 on_change: Optional[Callable[[str], None]] = None):
+        self._failure_threshold = failure_threshold
+        self._open_seconds = open_seconds
+        self._lock = threading.Lock()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self.version = 0
+        self.on_change = on_change
+
+    def _notify(self, agent_id: str, changed: bool) -> None:
+        if changed and self.on_change is not None:
+            self.on_change(agent_id)
+
+    def _get(self, agent_id: str) -> CircuitBreaker:
+        breaker = self._breakers.get(agent_id)
+        if breaker is None:
+            breaker = self._breakers[agent_id] = CircuitBreaker()
+        return breaker
+
+    def _refresh_state(self, breaker: CircuitBreaker) -> bool:
+        """Passe en half_open à l'issue du délai d'ouverture ; vrai si l'état a changé."""
+        if breaker.state == OPEN and time.time() - breaker.opened_at >= self._open_seconds:
+            breaker.state = HALF_OPEN
+            breaker.probe_in_flight = False
+            self.version += 1
+            return True
+        return False
+
+    def state(self, agent_id: str) -> str:
+        with self._lock:
+            breaker = self._get(agent_id)
+            changed = self._refresh_state(breaker)
+            state = breaker.state
+        self._notify(agent_id, changed)
+        return state
+
+    def allow(self, agent_id: str) -> bool:
+        """Vrai si un /execute peut être tenté (réserve la sonde en half_open)."""
+        with self._lock:
+            breaker = self._get(agent_id)
+            changed = self._refresh_state(breaker)
+            allowed = breaker.state == CLOSED
+            if breaker.state == HALF_OPEN and not breaker.probe_in_flight:
+                breaker.probe_in_flight = True
+                allowed = True
+        self._notify(agent_id, changed)
+        return allowed
+
+    def record_success(self, agent_id: str) -> None:
+        with self._lock:
+            breaker = self._get(agent_id)
+            changed = breaker.state != CLOSED or breaker.failures > 0
+            if changed:
+                self.version += 1
+            breaker.state = CLOSED
+            breaker.failures = 0
+            breaker.probe_in_flight = False
+        self._notify(agent_id, changed)
+
+    def record_failure(self, agent_id: str) -> None:
+        with self._lock:
+            breaker = self._get(agent_id)
+            breaker.failures += 1
+            breaker.probe_in_flight = False
+            # Lecture et transition sous le même verrou : deux échecs concurrents en half_open
+            # n'ouvrent le circuit qu'une fois, et un échec tardif ne prolonge pas l'ouverture
+            changed = breaker.state != OPEN and (
+                breaker.state == HALF_OPEN or breaker.failures >= self._failure_threshold)
+            if changed:
+                breaker.state = OPEN
+                breaker.opened_at = time.time()
+                self.version += 1
+        # Seul l'état du disjoncteur est affiché : pas d'événement pour un échec isolé
+        self._notify(agent_id, changed)
+
+    def annotate(self, agents: List[Dict]) -> List[Dict]:
+        """Ajoute `circuit` (état du disjoncteur) à chaque agent du snapshot."""
+        return [{**a, "circuit": self.state(a['agent_id'])} for a in agents]
@@ -0,0 +1,92 @@
+import os
+import time
+import threading
+from types import MappingProxyType
+from typing import Callable, Dict, Tuple
+
+
+def parse_agents(path: str) -> Tuple:
+    """agents.txt : `agent_id URL` par ligne."""
+    agents = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            parts = line.split()
+            if len(parts) >= 2:
+                agents.append(MappingProxyType({"agent_id": parts[0], "url": parts[1].rstrip("/")}))
+    return tuple(agents)
+
+
+def parse_images(path: str) -> Tuple:
+    """images.txt : une image par ligne."""
+    images = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                images.append(line)
+    return tuple(images)
+
+
+class ConfigFile:
+    """
+    Fichier de configuration parsé une fois, re-parsé uniquement quand sa
+    signature (mtime, taille, inode) change. Le résultat est immuable et partagé.
+
+    On s'appuie sur `stat` plutôt que sur inotify : avec un fichier monté seul en
+    bind-mount, une édition sur l'hôte par renommage n'est pas vue par inotify
+    dans le conteneur, alors que le changement de mtime/taille l'est.
+    `min_check_interval` limite le nombre de `stat` sous forte charge.
+    """
+
+    def __init__(self, path: str, parser: Callable[[str], Tuple], min_check_interval: float = 1.0):
+        self.path = path
+        self._parser = parser
+        self._min_check_interval = min_check_interval
+        self._lock = threading.Lock()
+        self._value: Tuple = ()
+        self._signature = None
+        self._checked_at = 0.0
+        self.reloads = 0
+        self.last_reload = 0.0
+        self.last_error = None
+
+    def _stat_signature(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def get(self) -> Tuple:
+        now = time.time()
+        if now - self._checked_at < self._min_check_interval:
+            return self._value
+        with self._lock:
+            if now - self._checked_at < self._min_check_interval:
+                return self._value
+            self._checked_at = now
+            signature = self._stat_signature()
+            if signature != self._signature:
+                try:
+                    self._value = self._parser(self.path) if signature is not None else ()
+                    self._signature = signature
+                    self.reloads += 1
+                    self.last_reload = now
+                    self.last_error = None
+                except Exception as e:
+                    # On garde la dernière version valide
+                    self.last_error = str(e)
+                    print(f"[CONFIG] Erreur lecture {self.path}: {e}")
+            return self._value
+
+    def status(self) -> Dict:
+        return {
+            "path": self.path,
+            "entries": len(self._value),
+            "reloads": self.reloads,
+            "last_reload": self.last_reload,
+            "last_error": self.last_error,
+        }
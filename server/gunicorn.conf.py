@@ -0,0 +1,40 @@
+# Configuration gunicorn du serveur (mode production)
+# Lancement : gunicorn -c gunicorn.conf.py app:app
+import os
+
+bind = f"0.0.0.0:{os.getenv('SERVER_PORT', '5000')}"
+
+# Le snapshot des agents, les réservations, les jobs et la file d'admission vivent
+# en mémoire : ils doivent être partagés par toutes les requêtes. On tourne donc
+# avec UN seul processus et un pool de threads (gthread), jamais plusieurs workers.
+workers = 1
+if int(os.getenv("SERVER_WORKERS", "1")) > 1:
+    print("[GUNICORN] SERVER_WORKERS > 1 ignoré : l'état (jobs, réservations, file) est en mémoire, 1 processus seulement")
+worker_class = "gthread"
+# Chaque flux SSE ouvert (/api/agents/stream, /api/jobs/<id>/stream) occupe un thread :
+# l'application en ouvre au plus SSE_MAX_STREAMS (moitié des threads par défaut), au-delà
+# elle répond 503 et la page repasse en polling ETag
+threads = int(os.getenv("SERVER_THREADS", "128"))
+if int(os.getenv("SSE_MAX_STREAMS", "0")) >= threads:
+    print("[GUNICORN] SSE_MAX_STREAMS >= SERVER_THREADS : les flux SSE peuvent occuper tous les threads")
+
+# Pas de preload : l'application (et ses threads de fond) est importée dans le worker
+preload_app = False
+
+# Arrêt propre : SIGTERM → les requêtes en cours ont graceful_timeout secondes pour finir
+graceful_timeout = int(os.getenv("SERVER_GRACEFUL_TIMEOUT", "30"))
+timeout = 60
+keepalive = 5
+
+# Recyclage du worker après N requêtes (0 = désactivé). Attention : le recyclage
+# perd l'état en mémoire (jobs en cours, réservations, file d'attente).
+max_requests = int(os.getenv("SERVER_MAX_REQUESTS", "0"))
+max_requests_jitter = max(max_requests // 10, 0)
+
+accesslog = "-" if os.getenv("VERBOSE_LOG", "0") == "1" else None
+errorlog = "-"
+
+
+def post_worker_init(worker):
+    from app import start_background
+    start_background()
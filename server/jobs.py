@@ -0,0 +1,151 @@
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+# Phases d'un lancement
+PHASE_QUEUED = "queued"
+PHASE_SCHEDULING = "scheduling"
+PHASE_STARTING = "starting"
+PHASE_READY = "ready"
+PHASE_FAILED = "failed"
+
+FINAL_PHASES = (PHASE_READY, PHASE_FAILED)
+
+
+class Job:
+    def __init__(self, owner: str):
+        self.id = uuid.uuid4().hex
+        self.owner = owner
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self.finished_at: Optional[float] = None
+        self.phase = PHASE_QUEUED
+        self.message = "En file d'attente..."
+        self.result: Optional[Dict] = None
+        self.http_status = 202
+        self.version = 0
+        self.history: List[Dict] = [{"phase": self.phase, "message": self.message, "ts": self.created_at}]
+
+    @property
+    def done(self) -> bool:
+        return self.phase in FINAL_PHASES
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.id,
+            "phase": self.phase,
+            "message": self.message,
+            "done": self.done,
+            "result": self.result,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "version": self.version,
+            "history": list(self.history),
+        }
+
+
+class JobStore:
+    """
+    Jobs de lancement exécutés par un pool de threads borné.
+
+    Les jobs terminés sont conservés `ttl` secondes pour qu'un rechargement
+    de page puisse se rattacher au résultat.
+    """
+
+    def __init__(self, workers: int, ttl: float, on_finished: Optional[Callable[[Job], None]] = None):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="launch-job")
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._jobs: Dict[str, Job] = {}
+        # Appelé une fois le job terminé (ready/failed), hors verrou : métriques
+        self._on_finished = on_finished
+
+    def submit(self, owner: str, fn: Callable[..., Optional[bool]], *args) -> Job:
+        """
+        Crée un job et exécute `fn(job, *args)` en arrière-plan.
+        `fn` retourne True si le job a été confié ailleurs (file d'admission) :
+        il sera repris plus tard par `resume`.
+        """
+        job = Job(owner)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, fn, *args)
+        return job
+
+    def resume(self, job: Job, fn: Callable[..., Optional[bool]], *args) -> None:
+        """Reprend un job mis en attente : exécute `fn(job, *args)` en arrière-plan."""
+        self._executor.submit(self._run, job, fn, *args)
+
+    def _run(self, job: Job, fn: Callable[..., Optional[bool]], *args) -> None:
+        try:
+            if fn(job, *args):
+                return
+        except Exception as e:
+            self.fail(job, f"Exception: {e}", 500)
+        if not job.done:
+            self.fail(job, "Lancement interrompu", 500)
+
+    def _prune(self) -> None:
+        now = time.time()
+        expired = [jid for jid, j in self._jobs.items() if j.finished_at and now - j.finished_at > self._ttl]
+        for jid in expired:
+            del self._jobs[jid]
+
+    def update(self, job: Job, phase: str, message: str) -> None:
+        with self._changed:
+            job.phase = phase
+            job.message = message
+            job.updated_at = time.time()
+            job.version += 1
+            job.history.append({"phase": phase, "message": message, "ts": job.updated_at})
+            self._changed.notify_all()
+
+    def finish(self, job: Job, message: str, result: Dict) -> None:
+        with self._changed:
+            job.result = result
+            job.http_status = 200
+            job.finished_at = time.time()
+        self.update(job, PHASE_READY, message)
+        self._finished(job)
+
+    def fail(self, job: Job, message: str, http_status: int, result: Optional[Dict] = None) -> None:
+        with self._changed:
+            job.result = result
+            job.http_status = http_status
+            job.finished_at = time.time()
+        self.update(job, PHASE_FAILED, message)
+        self._finished(job)
+
+    def _finished(self, job: Job) -> None:
+        if self._on_finished is None:
+            return
+        try:
+            self._on_finished(job)
+        except Exception as e:
+            print(f"[JOBS] Erreur on_finished: {e}")
+
+    def get(self, job_id: str, owner: str) -> Optional[Job]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None or job.owner != owner:
+            return None
+        return job
+
+    def list_for(self, owner: str) -> List[Job]:
+        with self._lock:
+            self._prune()
+            jobs = [j for j in self._jobs.values() if j.owner == owner]
+        return sorted(jobs, key=lambda j: j.created_at, reverse=True)
+
+    def active_count(self) -> int:
+        with self._lock:
+            return sum(1 for j in self._jobs.values() if not j.done)
+
+    def wait(self, job: Job, since_version: int, timeout: float) -> bool:
+        """Attend une mise à jour du job postérieure à `since_version`."""
+        with self._changed:
+            return self._changed.wait_for(lambda: job.version > since_version, timeout=timeout)
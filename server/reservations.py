@@ -0,0 +1,115 @@
+import time
+import uuid
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
+
+
+class Reservation:
+    def __init__(self, agent_id: str, cpu: float, mem_mb: int, ttl: float, owner: Optional[str] = None):
+        self.id = uuid.uuid4().hex
+        self.agent_id = agent_id
+        self.owner = owner
+        self.cpu = cpu
+        self.mem_mb = mem_mb
+        self.created_at = time.time()
+        self.expires_at = self.created_at + ttl
+        self.confirmed_at: Optional[float] = None
+
+
+class ReservationLedger:
+    """
+    Réservations optimistes de ressources sur les agents.
+
+    Un lancement en cours déduit son CPU/RAM de l'agent choisi, pour que les
+    lancements concurrents (qui lisent le même snapshot) se répartissent.
+    Une réservation disparaît :
+      - si le lancement échoue (`release`) ;
+      - après confirmation de l'agent, dès que le snapshot de cet agent vient
+        d'une sonde /info envoyée après la confirmation (`probed_at`) : la mesure
+        reflète alors la session. Une sonde partie avant la confirmation et revenue
+        après ne compte pas ; une entrée sans sonde (agent injoignable) non plus ;
+      - à expiration (`ttl`), quoi qu'il arrive.
+    `on_change(agent_id)` est appelé (hors verrou) quand les réservations d'un agent changent.
+    """
+
+    def __init__(self, ttl: float, on_change: Optional[Callable[[str], None]] = None):
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._reservations: Dict[str, Reservation] = {}
+        self.version = 0
+        self.on_change = on_change
+
+    def _notify(self, agent_ids: Iterable[str]) -> None:
+        if self.on_change is not None:
+            for agent_id in set(agent_ids):
+                self.on_change(agent_id)
+
+    def reserve(self, agent_id: str, cpu: float, mem_mb: int, owner: Optional[str] = None) -> str:
+        res = Reservation(agent_id, cpu, mem_mb, self._ttl, owner)
+        with self._lock:
+            self._reservations[res.id] = res
+            self.version += 1
+        self._notify([agent_id])
+        return res.id
+
+    def confirm(self, reservation_id: str) -> None:
+        with self._lock:
+            res = self._reservations.get(reservation_id)
+            if res is not None:
+                res.confirmed_at = time.time()
+                self.version += 1
+
+    def release(self, reservation_id: str) -> None:
+        with self._lock:
+            res = self._reservations.pop(reservation_id, None)
+            if res is not None:
+                self.version += 1
+        if res is not None:
+            self._notify([res.agent_id])
+
+    def _prune(self, probed_at: Dict[str, float]) -> List[str]:
+        """Retire les réservations expirées ou reflétées par le snapshot ; retourne les agents concernés."""
+        now = time.time()
+        expired = [
+            rid for rid, r in self._reservations.items()
+            if r.expires_at < now or (r.confirmed_at and probed_at.get(r.agent_id, 0) > r.confirmed_at)
+        ]
+        agent_ids = [self._reservations.pop(rid).agent_id for rid in expired]
+        if expired:
+            self.version += 1
+        return agent_ids
+
+    def count_for(self, owner: str, agents: List[Dict]) -> int:
+        """Sessions de `owner` en cours de lancement ou pas encore visibles dans le snapshot."""
+        with self._lock:
+            pruned = self._prune({a['agent_id']: a.get('probed_at', 0) for a in agents})
+            count = sum(1 for r in self._reservations.values() if r.owner == owner)
+        self._notify(pruned)
+        return count
+
+    def counts_by_owner(self, agents: List[Dict]) -> Dict[str, int]:
+        """`count_for` de tous les propriétaires en une passe."""
+        with self._lock:
+            pruned = self._prune({a['agent_id']: a.get('probed_at', 0) for a in agents})
+            counts: Dict[str, int] = {}
+            for r in self._reservations.values():
+                counts[r.owner] = counts.get(r.owner, 0) + 1
+        self._notify(pruned)
+        return counts
+
+    def annotate(self, agents: List[Dict]) -> List[Dict]:
+        """Ajoute `reserved_cpu`, `reserved_mem_mb` et `reservations` à chaque agent du snapshot."""
+        with self._lock:
+            pruned = self._prune({a['agent_id']: a.get('probed_at', 0) for a in agents})
+            totals: Dict[str, List] = {}
+            for r in self._reservations.values():
+                t = totals.setdefault(r.agent_id, [0, 0, 0])
+                t[0] += r.cpu
+                t[1] += r.mem_mb
+                t[2] += 1
+        self._notify(pruned)
+        annotated = []
+        for a in agents:
+            cpu, mem, count = totals.get(a['agent_id'], (0, 0, 0))
+            annotated.append({**a, "reserved_cpu": cpu, "reserved_mem_mb": mem, "reservations": count})
+        return annotated
@@ -0,0 +1,7 @@
+# Limites par rôle (partagées par app.py et le simulateur bench/simulate.py)
+# max_sessions : sessions simultanées par utilisateur
+# queue_weight : part relative dans la file d'admission (plus grand = prioritaire à usage égal)
+ROLE_LIMITS = {
+    "standard": {"max_cpu": 4, "max_ram_gb": 4, "max_sessions": 2, "queue_weight": 1},
+    "power": {"max_cpu": 10, "max_ram_gb": 32, "max_sessions": 4, "queue_weight": 2}
+}
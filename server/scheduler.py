@@ -0,0 +1,153 @@
+from typing import Dict, List, Optional, Tuple
+
+# Pénalité appliquée aux agents GPU pour une demande sans GPU :
+# ils ne sont choisis que si aucun agent sans GPU ne convient.
+GPU_RESERVE_PENALTY = 1000.0
+
+
+def free_resources(agent: Dict) -> Tuple[float, float]:
+    """
+    CPU (vCPU) et mémoire (MB) libres d'un agent, réservations en cours déduites.
+    Si l'agent publie sa capacité engagée (somme des limites des sessions), c'est elle qui
+    compte face à l'allouable : des sessions inactives occupent quand même leur place.
+    Les sessions gelées (`paused_cpu`) aussi : l'agent les compte comme engagées et un client
+    peut les dégeler à tout moment. `paused_cpu` ne sert qu'à la supervision.
+    Sinon (ancien agent), on se rabat sur l'usage instantané de l'hôte.
+    """
+    if agent.get('allocatable_cpu'):
+        free_cpu = agent['allocatable_cpu'] - agent.get('committed_cpu', 0) - agent.get('reserved_cpu', 0)
+        free_mem = agent.get('allocatable_mem_mb', 0) - agent.get('committed_mem_mb', 0) - agent.get('reserved_mem_mb', 0)
+        return free_cpu, free_mem
+    free_cpu = agent.get('total_cpu', 0) - agent.get('used_cpu', 0) - agent.get('reserved_cpu', 0)
+    free_mem = agent.get('total_mem_mb', 0) - agent.get('used_mem_mb', 0) - agent.get('reserved_mem_mb', 0)
+    return free_cpu, free_mem
+
+
+def _utilization_after(agent: Dict, req: Dict) -> Tuple[float, float]:
+    """Taux d'occupation CPU / RAM de l'agent si la demande y est placée."""
+    free_cpu, free_mem = free_resources(agent)
+    total_cpu = agent.get('allocatable_cpu') or agent.get('total_cpu') or 1
+    total_mem = agent.get('allocatable_mem_mb') or agent.get('total_mem_mb') or 1
+    u_cpu = 1 - (free_cpu - req['cpu_limit']) / total_cpu
+    u_mem = 1 - (free_mem - req['memory_limit_mb']) / total_mem
+    return u_cpu, u_mem
+
+
+class Policy:
+    """
+    Politique de placement : attribue un score à chaque agent candidat
+    (plus petit = meilleur). Les agents sont déjà filtrés (en ligne, capacité, GPU).
+    """
+    name = ""
+    # Poids du nombre de conteneurs par cœur (contention entre sessions)
+    container_weight = 0.05
+
+    def fit_score(self, agent: Dict, req: Dict) -> float:
+        raise NotImplementedError
+
+    def score(self, agent: Dict, req: Dict) -> float:
+        score = self.fit_score(agent, req)
+        # Les sessions gelées ne consomment pas de CPU : pas de contention
+        active = agent.get('running_containers', 0) - agent.get('paused_containers', 0)
+        score += self.container_weight * active / (agent.get('total_cpu') or 1)
+        if agent.get('gpu_capable') and not req['gpu']:
+            score += GPU_RESERVE_PENALTY
+        return score
+
+
+class BestFitPolicy(Policy):
+    """Remplit d'abord les agents les plus occupés : limite la fragmentation."""
+    name = "best-fit"
+
+    def fit_score(self, agent, req):
+        u_cpu, u_mem = _utilization_after(agent, req)
+        return (1 - u_cpu) + (1 - u_mem)
+
+
+class SpreadPolicy(Policy):
+    """Worst-fit : répartit la charge sur les agents les plus libres."""
+    name = "spread"
+    container_weight = 0.2
+
+    def fit_score(self, agent, req):
+        u_cpu, u_mem = _utilization_after(agent, req)
+        return u_cpu + u_mem
+
+
+class DominantResourcePolicy(Policy):
+    """
+    Minimise la part de la ressource dominante après placement, puis le
+    déséquilibre CPU/RAM : évite d'épuiser la mémoire d'un agent dont le CPU reste libre.
+    """
+    name = "dominant-resource"
+
+    def fit_score(self, agent, req):
+        u_cpu, u_mem = _utilization_after(agent, req)
+        return max(u_cpu, u_mem) + 0.5 * abs(u_cpu - u_mem)
+
+
+POLICIES = {
+    "best-fit": BestFitPolicy,
+    "spread": SpreadPolicy,
+    "worst-fit": SpreadPolicy,
+    "dominant-resource": DominantResourcePolicy,
+    "drf": DominantResourcePolicy,
+}
+
+
+def get_policy(name: str) -> Policy:
+    try:
+        return POLICIES[name.strip().lower()]()
+    except KeyError:
+        raise ValueError(f"Politique de placement inconnue: {name} (choix: {', '.join(sorted(POLICIES))})")
+
+
+class Decision:
+    """Résultat d'un placement : candidats classés et raisons de rejet."""
+
+    def __init__(self, policy: str):
+        self.policy = policy
+        self.candidates: List[Dict] = []
+        self.scores: Dict[str, float] = {}
+        self.rejected: Dict[str, str] = {}
+        self.chosen: Optional[str] = None
+
+    def to_dict(self) -> Dict:
+        return {
+            "policy": self.policy,
+            "chosen": self.chosen,
+            "ranking": [{"agent_id": a['agent_id'], "score": round(self.scores[a['agent_id']], 4)} for a in self.candidates],
+            "rejected": dict(self.rejected),
+        }
+
+
+class Scheduler:
+    def __init__(self, policy: Policy):
+        self.policy = policy
+
+    def rejection_reason(self, agent: Dict, req: Dict) -> Optional[str]:
+        if not agent.get('online'):
+            return "hors ligne"
+        if agent.get('circuit') == "open":
+            return "circuit ouvert"
+        if req['gpu'] and not agent.get('gpu_capable'):
+            return "pas de GPU"
+        free_cpu, free_mem = free_resources(agent)
+        if free_cpu < req['cpu_limit']:
+            return "CPU insuffisant"
+        if free_mem < req['memory_limit_mb']:
+            return "RAM insuffisante"
+        return None
+
+    def place(self, agents: List[Dict], req: Dict) -> Decision:
+        """Filtre et classe les agents pour la demande `req` (cpu_limit, memory_limit_mb, gpu)."""
+        decision = Decision(self.policy.name)
+        for agent in agents:
+            reason = self.rejection_reason(agent, req)
+            if reason:
+                decision.rejected[agent['agent_id']] = reason
+                continue
+            decision.scores[agent['agent_id']] = self.policy.score(agent, req)
+            decision.candidates.append(agent)
+        decision.candidates.sort(key=lambda a: decision.scores[a['agent_id']])
+        return decision
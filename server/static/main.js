@@ -0,0 +1,165 @@
+const agentsById = new Map();
+
+function renderAgents(){
+  const box = document.getElementById('agentsBox');
+  if(!agentsById.size){
+    box.innerHTML = "<i>Aucun agent</i>";
+    return;
+  }
+  let html = "<table><tr><th>ID</th><th>CPU (used/total)</th><th>RAM (used/total MB)</th><th>Cont.</th><th>GPU</th><th>OK?</th></tr>";
+  agentsById.forEach(a=>{
+    html += `<tr>
+      <td>${a.agent_id}</td>
+      <td>${a.used_cpu.toFixed(1)}/${a.total_cpu}${a.reserved_cpu ? ` (+${a.reserved_cpu} rés.)` : ''}</td>
+      <td>${a.used_mem_mb}/${a.total_mem_mb}${a.reserved_mem_mb ? ` (+${a.reserved_mem_mb} rés.)` : ''}</td>
+      <td>${a.running_containers}</td>
+      <td>${a.gpu_capable ? 'oui':'non'}</td>
+      <td>${a.online ? (a.circuit === 'open' ? '⛔':'✅') : (a.stale ? '⏳':'❌')}</td>
+    </tr>`;
+  });
+  html += "</table>";
+  box.innerHTML = html;
+}
+
+function applyAgents(agents, removed, reset){
+  if(reset) agentsById.clear();
+  agents.forEach(a=>agentsById.set(a.agent_id, a));
+  (removed || []).forEach(id=>agentsById.delete(id));
+  renderAgents();
+}
+
+let agentsEtag = null;
+let agentsPolling = null;
+
+async function fetchAgents(){
+  try{
+    // ETag : 304 tant que l'état des agents n'a pas changé (pas de corps à relire)
+    const r = await fetch('/api/agents', {
+      cache: 'no-store',
+      headers: agentsEtag ? {'If-None-Match': agentsEtag} : {}
+    });
+    if(r.status === 304) return;
+    const data = await r.json();
+    agentsEtag = r.headers.get('ETag');
+    applyAgents(data.agents, [], true);
+  }catch(e){
+    console.error(e);
+  }
+}
+
+function pollAgents(){
+  if(agentsPolling) return;
+  fetchAgents();
+  agentsPolling = setInterval(fetchAgents, 6000);
+}
+
+if(window.EventSource){
+  // Flux SSE : le serveur ne pousse que les agents modifiés
+  const es = new EventSource('/api/agents/stream');
+  es.addEventListener('snapshot', ev=>{
+    applyAgents(JSON.parse(ev.data).agents, [], true);
+  });
+  es.addEventListener('update', ev=>{
+    const d = JSON.parse(ev.data);
+    applyAgents(d.agents, d.removed, false);
+  });
+  // Fin de flux normale : le navigateur se reconnecte seul (CONNECTING).
+  // Flux refusé (503 : trop de flux ouverts) ou en échec : polling ETag à la place.
+  es.onerror = ()=>{
+    if(es.readyState === EventSource.CLOSED){
+      es.close();
+      pollAgents();
+    }
+  };
+}else{
+  pollAgents();
+}
+
+function followJob(jobId){
+  // Suit la progression d'un job de lancement ; l'id est mémorisé pour rattacher après rechargement
+  const out = document.getElementById('output');
+  localStorage.setItem('launchJob', jobId);
+  const show = job=>{
+    out.textContent = job.message;
+    if(job.done) localStorage.removeItem('launchJob');
+  };
+  const poll = async ()=>{
+    const r = await fetch(`/api/jobs/${jobId}`);
+    if(r.status === 404){ localStorage.removeItem('launchJob'); return; }
+    const job = await r.json();
+    show(job);
+    if(!job.done) setTimeout(poll, 2000);
+  };
+  if(window.EventSource){
+    const es = new EventSource(`/api/jobs/${jobId}/stream`);
+    es.addEventListener('job', ev=>{
+      const job = JSON.parse(ev.data);
+      show(job);
+      if(job.done) es.close();
+    });
+    // Flux coupé ou refusé (503 : trop de flux ouverts) : on repasse en polling
+    es.onerror = ()=>{
+      es.close();
+      poll();
+    };
+  }else{
+    poll();
+  }
+}
+
+const pendingJob = localStorage.getItem('launchJob');
+if(pendingJob) followJob(pendingJob);
+
+document.getElementById('launchForm').addEventListener('submit', async (e)=>{
+  e.preventDefault();
+  const out = document.getElementById('output');
+  out.textContent = "Envoi de la demande...";
+  const fd = new FormData(e.target);
+  const payload = {
+    image: fd.get('image'),
+    cpu_limit: parseInt(fd.get('cpu_limit'),10),
+    memory_limit_gb: parseInt(fd.get('memory_limit_gb'),10),
+    gpu: fd.get('gpu') === '1'
+  };
+  try{
+    const r = await fetch('/launch', {
+      method:'POST',
+      headers:{'Content-Type':'application/json'},
+      body: JSON.stringify(payload)
+    });
+    if(r.status === 202){
+      const js = await r.json();
+      followJob(js.job_id);
+    }else{
+      out.textContent = await r.text();
+    }
+  }catch(err){
+    out.textContent = "Erreur réseau: "+err;
+  }
+});
+
+document.getElementById('pwdForm').addEventListener('submit', async (e)=>{
+  e.preventDefault();
+  const po = document.getElementById('pwdOutput');
+  po.textContent = "Mise à jour...";
+  const fd = new FormData(e.target);
+  try{
+    const r = await fetch('/change_password', {
+      method:'POST',
+      headers:{'Content-Type':'application/json'},
+      body: JSON.stringify({
+        old_password: fd.get('old_password'),
+        new_password: fd.get('new_password')
+      })
+    });
+    const js = await r.json();
+    if(js.status === 'ok'){
+      po.textContent = "Mot de passe changé ✅";
+      e.target.reset();
+    }else{
+      po.textContent = "Erreur: "+js.error;
+    }
+  }catch(err){
+    po.textContent = "Erreur réseau: "+err;
+  }
+});
@@ -0,0 +1,117 @@
+import os
+import sys
+import time
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from admission import AdmissionQueue, QueueEntry, fair_order  # noqa: E402
+
+
+class Job:
+    def __init__(self, job_id):
+        self.id = job_id
+
+
+class AdmissionQueueTestCase(unittest.TestCase):
+    def setUp(self):
+        self.usage = {}
+        self.usage_calls = []
+        self.admit = lambda entry: False
+        self.positions = []
+        self.expired = []
+        self.queue = AdmissionQueue(
+            lambda entry: self.admit(entry), self._usage, self.positions.append, self.expired.append,
+            tick_seconds=3600, max_wait_seconds=60
+        )
+
+    def _usage(self, usernames):
+        self.usage_calls.append(set(usernames))
+        return {u: self.usage.get(u, 0) for u in usernames}
+
+    def enqueue(self, job_id, username, weight=1.0):
+        return self.queue.enqueue(Job(job_id), {"username": username}, weight)
+
+    def usernames(self):
+        return [e.req["username"] for e in self.queue._entries]
+
+
+class FairOrderTest(AdmissionQueueTestCase):
+    def test_weighted_usage_then_age(self):
+        older = QueueEntry(Job("1"), {"username": "alice"}, 1.0)
+        newer = QueueEntry(Job("2"), {"username": "bob"}, 1.0)
+        power = QueueEntry(Job("3"), {"username": "carol"}, 2.0)
+        older.enqueued_at, newer.enqueued_at, power.enqueued_at = 1, 2, 3
+        usage = {"alice": 1, "bob": 1, "carol": 1}
+        # carol : 1 session / poids 2 = 0.5, passe devant ; alice et bob à égalité : le plus ancien
+        self.assertEqual(fair_order([newer, older, power], usage.get), [power, older, newer])
+
+    def test_queue_orders_with_one_usage_call_per_reorder(self):
+        self.usage = {"alice": 3, "bob": 0}
+        alice = self.enqueue("1", "alice")
+        bob = self.enqueue("2", "bob")
+        self.assertEqual(self.usernames(), ["bob", "alice"])
+        self.assertEqual((bob.position, alice.position), (1, 2))
+        self.assertEqual(self.usage_calls[-1], {"alice", "bob"})
+        self.assertIn(alice, self.positions)
+
+
+class AdmitWhileCancelTest(AdmissionQueueTestCase):
+    def test_cancel_during_admission_does_not_remove_the_entry(self):
+        entered, release = threading.Event(), threading.Event()
+        results = []
+
+        def admit(entry):
+            entered.set()
+            release.wait(5)
+            return False
+
+        self.admit = admit
+        self.enqueue("job-1", "alice")
+        worker = threading.Thread(target=self.queue.admit_pending)
+        worker.start()
+        self.assertTrue(entered.wait(5))
+        # Lancement commencé : l'annulation échoue, la demande reste visible pour l'utilisateur
+        results.append(self.queue.remove("job-1"))
+        self.assertEqual(len(self.queue.queued_for("alice")), 1)
+        self.assertEqual(len(self.queue), 0)
+        release.set()
+        worker.join(5)
+        self.assertEqual(results, [None])
+        # Admission refusée : l'entrée revient en file et peut alors être annulée
+        self.assertEqual(self.usernames(), ["alice"])
+        self.assertIsNotNone(self.queue.remove("job-1"))
+
+    def test_cancelled_entry_is_never_admitted(self):
+        admitted = []
+        self.admit = lambda entry: admitted.append(entry) or True
+        entry = self.enqueue("job-1", "alice")
+        self.queue.remove("job-1")
+        self.queue.admit_pending()
+        self.assertEqual(admitted, [])
+        self.assertEqual(self.queue.queued_for("alice"), [])
+        self.assertIsNot(entry, None)
+
+    def test_admitted_entry_leaves_the_queue(self):
+        self.admit = lambda entry: entry.req["username"] == "bob"
+        self.usage = {"alice": 0, "bob": 1}
+        alice = self.enqueue("1", "alice")
+        self.enqueue("2", "bob")
+        self.queue.admit_pending()
+        self.assertEqual(self.usernames(), ["alice"])
+        self.assertEqual(self.queue.queued_for("bob"), [])
+        self.assertEqual(alice.position, 1)
+
+    def test_expired_entry_is_not_admitted(self):
+        admitted = []
+        self.admit = lambda entry: admitted.append(entry) or True
+        entry = self.enqueue("job-1", "alice")
+        entry.enqueued_at = time.time() - 120
+        self.queue.admit_pending()
+        self.assertEqual(admitted, [])
+        self.assertEqual(self.expired, [entry])
+        self.assertEqual(len(self.queue), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agent_cache import AgentCache  # noqa: E402
+from reservations import ReservationLedger  # noqa: E402
+
+
+class ProbeTimingTest(unittest.TestCase):
+    """Une réservation confirmée ne disparaît qu'avec une sonde /info envoyée après la confirmation."""
+
+    def setUp(self):
+        self.ledger = ReservationLedger(ttl=60)
+        self.during_probe = None
+        self.cache = AgentCache(self._fetch_all, interval=3600, min_refresh_interval=0)
+        # Pas de thread de polling : les tests rafraîchissent à la main
+        self.cache.start = lambda: None
+
+    def _fetch_all(self):
+        # Comme fetch_agent_info : l'heure de la sonde est prise avant la requête
+        probed_at = time.time()
+        time.sleep(0.01)
+        if self.during_probe is not None:
+            self.during_probe()
+            self.during_probe = None
+        time.sleep(0.01)
+        return [{"agent_id": "a1", "probed_at": probed_at, "running_containers": 0}]
+
+    def reservations(self):
+        return self.ledger.annotate(self.cache.snapshot())[0]["reservations"]
+
+    def test_probe_in_flight_at_confirmation_does_not_prune(self):
+        rid = self.ledger.reserve("a1", 1, 512)
+        # /execute confirmé pendant que la sonde est en vol : sa réponse ne montre pas la session
+        self.during_probe = lambda: self.ledger.confirm(rid)
+        self.cache.refresh()
+        self.assertEqual(self.reservations(), 1)
+        self.cache.refresh()
+        self.assertEqual(self.reservations(), 0)
+
+    def test_probe_time_alone_does_not_bump_the_version(self):
+        self.cache.refresh()
+        version, _ = self.cache.versioned_snapshot()
+        self.cache.refresh()
+        self.assertEqual(self.cache.versioned_snapshot()[0], version)
+
+
+if __name__ == "__main__":
+    unittest.main()
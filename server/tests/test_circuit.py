@@ -0,0 +1,72 @@
+import os
+import sys
+import time
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from circuit import CLOSED, HALF_OPEN, OPEN, CircuitBreakerRegistry  # noqa: E402
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def setUp(self):
+        self.changes = []
+        self.breakers = CircuitBreakerRegistry(3, 0.1, on_change=self.changes.append)
+
+    def half_open(self):
+        for _ in range(3):
+            self.breakers.record_failure("a1")
+        time.sleep(0.11)
+        self.assertEqual(self.breakers.state("a1"), HALF_OPEN)
+        self.changes.clear()
+
+    def test_opens_at_the_threshold(self):
+        self.breakers.record_failure("a1")
+        self.breakers.record_failure("a1")
+        self.assertEqual(self.breakers.state("a1"), CLOSED)
+        self.assertEqual(self.changes, [])
+        self.breakers.record_failure("a1")
+        self.assertEqual(self.breakers.state("a1"), OPEN)
+        self.assertFalse(self.breakers.allow("a1"))
+        self.assertEqual(self.changes, ["a1"])
+
+    def test_half_open_allows_a_single_probe(self):
+        self.half_open()
+        self.assertTrue(self.breakers.allow("a1"))
+        self.assertFalse(self.breakers.allow("a1"))
+        self.breakers.record_success("a1")
+        self.assertEqual(self.breakers.state("a1"), CLOSED)
+        self.assertEqual(self.changes, ["a1"])
+
+    def test_late_failure_does_not_extend_the_open_period(self):
+        for _ in range(3):
+            self.breakers.record_failure("a1")
+        version = self.breakers.version
+        time.sleep(0.06)
+        # Lancement parti avant l'ouverture, en échec après
+        self.breakers.record_failure("a1")
+        self.assertEqual(self.breakers.version, version)
+        time.sleep(0.06)
+        self.assertEqual(self.breakers.state("a1"), HALF_OPEN)
+
+    def test_concurrent_half_open_failures_reopen_once(self):
+        self.half_open()
+        version = self.breakers.version
+        barrier = threading.Barrier(8)
+
+        def fail():
+            barrier.wait()
+            self.breakers.record_failure("a1")
+
+        threads = [threading.Thread(target=fail) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(self.breakers.state("a1"), OPEN)
+        self.assertEqual(self.changes, ["a1"])
+        self.assertEqual(self.breakers.version, version + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
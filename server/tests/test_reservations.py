@@ -0,0 +1,69 @@
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from reservations import ReservationLedger  # noqa: E402
+
+
+def agent(agent_id="a1", probed_at=0.0):
+    return {"agent_id": agent_id, "probed_at": probed_at}
+
+
+class ReservationLedgerTest(unittest.TestCase):
+    def setUp(self):
+        self.changes = []
+        self.ledger = ReservationLedger(ttl=60, on_change=self.changes.append)
+
+    def reserved(self, probed_at=0.0):
+        annotated = self.ledger.annotate([agent(probed_at=probed_at)])[0]
+        return annotated["reserved_cpu"], annotated["reserved_mem_mb"], annotated["reservations"]
+
+    def test_release_after_failed_launch_frees_the_capacity(self):
+        rid = self.ledger.reserve("a1", 2, 1024, owner="alice")
+        self.assertEqual(self.reserved(), (2, 1024, 1))
+        self.assertEqual(self.ledger.count_for("alice", [agent()]), 1)
+        # /execute en échec : run_placement libère la réservation
+        self.ledger.release(rid)
+        self.assertEqual(self.reserved(), (0, 0, 0))
+        self.assertEqual(self.ledger.count_for("alice", [agent()]), 0)
+        self.assertEqual(self.changes, ["a1", "a1"])
+
+    def test_release_is_idempotent(self):
+        rid = self.ledger.reserve("a1", 1, 512)
+        self.ledger.release(rid)
+        version = self.ledger.version
+        self.ledger.release(rid)
+        self.assertEqual(self.ledger.version, version)
+        self.assertEqual(self.changes, ["a1", "a1"])
+
+    def test_unconfirmed_reservation_survives_newer_probes(self):
+        self.ledger.reserve("a1", 1, 512)
+        self.assertEqual(self.reserved(probed_at=time.time() + 10)[2], 1)
+
+    def test_confirmed_reservation_pruned_only_by_a_probe_sent_after_confirmation(self):
+        rid = self.ledger.reserve("a1", 1, 512)
+        probe_sent = time.time()
+        time.sleep(0.01)
+        self.ledger.confirm(rid)
+        # Sonde partie avant la confirmation et revenue après : la session n'y est pas encore
+        self.assertEqual(self.reserved(probed_at=probe_sent)[2], 1)
+        self.assertEqual(self.reserved(probed_at=time.time() + 0.01)[2], 0)
+
+    def test_expired_reservation_is_pruned(self):
+        ledger = ReservationLedger(ttl=0)
+        ledger.reserve("a1", 1, 512, owner="alice")
+        time.sleep(0.01)
+        self.assertEqual(ledger.count_for("alice", [agent()]), 0)
+
+    def test_counts_by_owner_matches_count_for(self):
+        for owner in ("alice", "alice", "bob"):
+            self.ledger.reserve("a1", 1, 512, owner=owner)
+        counts = self.ledger.counts_by_owner([agent()])
+        self.assertEqual(counts, {"alice": 2, "bob": 1})
+        self.assertEqual(counts["alice"], self.ledger.count_for("alice", [agent()]))
+
+
+if __name__ == "__main__":
+    unittest.main()
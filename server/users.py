@@ -1,102 +1,361 @@
-import os
-import hashlib
-from typing import Dict, Tuple, Optional
-
-# Chemin du fichier utilisateurs
-USER_FILE = "users.txt"
-
-def hash_password(password: str) -> str:
-    return hashlib.sha256(password.encode()).hexdigest()
-
-def load_users() -> Dict[str, Dict]:
-    """
-    Charge les utilisateurs.
-    Formats acceptés :
-      username:hash
-      username:hash:first_login
-      username:hash:first_login:role
-    first_login -> true/false (false par défaut)
-    role -> standard/power (standard par défaut)
-    """
-    if not os.path.exists(USER_FILE):
-        return {}
-
-    users = {}
-    try:
-        with open(USER_FILE, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line or line.startswith("#"):
-                    continue
-                parts = line.split(":")
-                if len(parts) < 2:
-                    continue
-                username = parts[0]
-                password_hash = parts[1]
-                first_login = False
-                role = "standard"
-
-                if len(parts) >= 3 and parts[2]:
-                    first_login = parts[2].lower() == "true"
-                if len(parts) >= 4 and parts[3]:
-                    role_candidate = parts[3].strip().lower()
-                    if role_candidate in ("power", "standard"):
-                        role = role_candidate
-
-                users[username] = {
-                    "password_hash": password_hash,
-                    "first_login": first_login,
-                    "role": role
-                }
-    except Exception as e:
-        print(f"Erreur lors du chargement des utilisateurs: {e}")
-
-    return users
-
-def save_users(users: Dict[str, Dict]) -> None:
-    """
-    Sauvegarde au format complet (3 ou 4 champs selon présence du rôle).
-    Toujours écrit le rôle pour homogénéiser.
-    """
-    try:
-        with open(USER_FILE, "w", encoding="utf-8") as f:
-            f.write("# Format: username:password_hash:first_login:role\n")
-            f.write("# role = standard|power\n")
-            for username, data in users.items():
-                first_login = "true" if data.get("first_login", False) else "false"
-                role = data.get("role", "standard")
-                f.write(f"{username}:{data['password_hash']}:{first_login}:{role}\n")
-    except Exception as e:
-        print(f"Erreur lors de la sauvegarde des utilisateurs: {e}")
-
-def verify_user(username: str, password: str) -> Tuple[bool, bool]:
-    users = load_users()
-    user = users.get(username)
-    if not user:
-        return False, False
-    if hash_password(password) == user["password_hash"]:
-        return True, user.get("first_login", False)
-    return False, False
-
-def get_user_role(username: str) -> str:
-    users = load_users()
-    user = users.get(username)
-    if not user:
-        return "standard"
-    return user.get("role", "standard")
-
-def change_password(username: str, old_password: str, new_password: str) -> bool:
-    """
-    Change le mot de passe si l'ancien est correct.
-    """
-    users = load_users()
-    user = users.get(username)
-    if not user:
-        return False
-    if hash_password(old_password) != user["password_hash"]:
-        return False
-    user["password_hash"] = hash_password(new_password)
-    user["first_login"] = False
-    users[username] = user
-    save_users(users)
-    return True
\ No newline at end of file
+import os
+import errno
+import fcntl
+import hashlib
+import sqlite3
+import tempfile
+import threading
+from typing import Dict, Tuple, Optional
+
+# Chemin du fichier utilisateurs
+USER_FILE = "users.txt"
+# Backend : "file" (users.txt) ou "sqlite" (milliers de comptes)
+USERS_BACKEND = os.getenv("USERS_BACKEND", "file").strip().lower()
+# Base SQLite : à placer sur un volume persistant (les mots de passe changés n'y sont écrits que là)
+USERS_DB = os.getenv("USERS_DB", os.path.join("data", "users.db"))
+
+USER_FILE_HEADER = "# Format: username:password_hash:first_login:role\n# role = standard|power\n"
+
+def hash_password(password: str) -> str:
+    return hashlib.sha256(password.encode()).hexdigest()
+
+def parse_users(path: str) -> Dict[str, Dict]:
+    """
+    Charge les utilisateurs.
+    Formats acceptés :
+      username:hash
+      username:hash:first_login
+      username:hash:first_login:role
+    first_login -> true/false (false par défaut)
+    role -> standard/power (standard par défaut)
+    """
+    if not os.path.exists(path):
+        return {}
+
+    users = {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                parts = line.split(":")
+                if len(parts) < 2:
+                    continue
+                username = parts[0]
+                password_hash = parts[1]
+                first_login = False
+                role = "standard"
+
+                if len(parts) >= 3 and parts[2]:
+                    first_login = parts[2].lower() == "true"
+                if len(parts) >= 4 and parts[3]:
+                    role_candidate = parts[3].strip().lower()
+                    if role_candidate in ("power", "standard"):
+                        role = role_candidate
+
+                users[username] = {
+                    "password_hash": password_hash,
+                    "first_login": first_login,
+                    "role": role
+                }
+    except Exception as e:
+        print(f"Erreur lors du chargement des utilisateurs: {e}")
+
+    return users
+
+def format_users(users: Dict[str, Dict]) -> str:
+    """Format complet (toujours 4 champs, rôle compris, pour homogénéiser)."""
+    lines = [USER_FILE_HEADER]
+    for username, data in users.items():
+        first_login = "true" if data.get("first_login", False) else "false"
+        role = data.get("role", "standard")
+        lines.append(f"{username}:{data['password_hash']}:{first_login}:{role}\n")
+    return "".join(lines)
+
+
+class FileUserStore:
+    """
+    Index en mémoire de users.txt.
+
+    Le fichier n'est re-parsé que si sa signature (mtime, taille, inode) change.
+    Les écritures se font sous verrou (thread + flock inter-processus) en écrivant
+    un fichier temporaire puis en le renommant. Si le renommage est impossible
+    (fichier monté seul en bind-mount Docker → EBUSY), on réécrit en place, toujours sous verrou.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        self._users: Dict[str, Dict] = {}
+        self._signature = None
+
+    def _stat_signature(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _refresh(self) -> None:
+        signature = self._stat_signature()
+        if signature != self._signature:
+            self._users = parse_users(self.path)
+            self._signature = signature
+
+    def get(self, username: str) -> Optional[Dict]:
+        with self._lock:
+            self._refresh()
+            user = self._users.get(username)
+            return dict(user) if user else None
+
+    def all(self) -> Dict[str, Dict]:
+        with self._lock:
+            self._refresh()
+            return {u: dict(d) for u, d in self._users.items()}
+
+    def _write(self, users: Dict[str, Dict]) -> None:
+        content = format_users(users)
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".users.", dir=directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+            if os.path.exists(self.path):
+                os.chmod(tmp_path, os.stat(self.path).st_mode & 0o777)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            if e.errno not in (errno.EBUSY, errno.EXDEV, errno.EPERM):
+                raise
+            with open(self.path, "w", encoding="utf-8") as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _locked_update(self, mutate) -> bool:
+        """Relit, applique `mutate(users)` et réécrit si elle retourne True."""
+        with self._lock:
+            with open(self.path + ".lock", "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    self._refresh()
+                    users = {u: dict(d) for u, d in self._users.items()}
+                    if not mutate(users):
+                        return False
+                    self._write(users)
+                    self._users = users
+                    self._signature = self._stat_signature()
+                    return True
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def save_all(self, users: Dict[str, Dict]) -> None:
+        def replace(current):
+            current.clear()
+            current.update({u: dict(d) for u, d in users.items()})
+            return True
+        self._locked_update(replace)
+
+    def set_password(self, username: str, old_hash: str, new_hash: str) -> bool:
+        def mutate(users):
+            user = users.get(username)
+            if not user or user["password_hash"] != old_hash:
+                return False
+            user["password_hash"] = new_hash
+            user["first_login"] = False
+            return True
+        return self._locked_update(mutate)
+
+
+class SqliteUserStore:
+    """
+    Backend SQLite (même API que FileUserStore) pour les déploiements à
+    plusieurs milliers de comptes.
+
+    users.txt reste la source des comptes : il est réimporté quand sa signature
+    (mtime, taille, inode) change, comme FileUserStore le re-parse. L'import ajoute
+    les nouveaux comptes, supprime ceux retirés du fichier et applique les rôles ;
+    un mot de passe n'est repris du fichier que si sa ligne a changé depuis l'import
+    précédent (`imported_hash`), un mot de passe changé par l'utilisateur est conservé.
+    La signature importée est gardée dans la base (pas de réimport au redémarrage).
+    """
+
+    def __init__(self, db_path: str, import_from: Optional[str] = None):
+        self.db_path = db_path
+        self.import_from = import_from
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._signature = None
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS users ("
+                " username TEXT PRIMARY KEY,"
+                " password_hash TEXT NOT NULL,"
+                " first_login INTEGER NOT NULL DEFAULT 0,"
+                " role TEXT NOT NULL DEFAULT 'standard',"
+                " imported_hash TEXT)"
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(users)")}
+            if "imported_hash" not in columns:
+                conn.execute("ALTER TABLE users ADD COLUMN imported_hash TEXT")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            row = conn.execute("SELECT value FROM meta WHERE key = 'users_file_signature'").fetchone()
+            self._signature = row[0] if row else None
+        self._refresh()
+
+    def _file_signature(self) -> Optional[str]:
+        try:
+            st = os.stat(self.import_from)
+        except (FileNotFoundError, TypeError):
+            return None
+        return f"{st.st_mtime_ns}:{st.st_size}:{st.st_ino}"
+
+    def _refresh(self) -> None:
+        """Réimporte users.txt si sa signature a changé depuis le dernier import."""
+        signature = self._file_signature()
+        if signature is None or signature == self._signature:
+            return
+        with self._lock:
+            if signature == self._signature:
+                return
+            users = parse_users(self.import_from)
+            with self._conn() as conn:
+                added, updated, removed = self._import(conn, users)
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('users_file_signature', ?)",
+                             (signature,))
+            self._signature = signature
+        print(f"[USERS] {self.import_from} importé dans {self.db_path} : "
+              f"{added} ajouté(s), {updated} mis à jour, {removed} supprimé(s)")
+
+    @staticmethod
+    def _import(conn: sqlite3.Connection, users: Dict[str, Dict]) -> Tuple[int, int, int]:
+        current = {
+            r[0]: r[1:] for r in conn.execute("SELECT username, password_hash, first_login, role, imported_hash FROM users")
+        }
+        added = updated = 0
+        for username, data in users.items():
+            file_hash = data["password_hash"]
+            first_login = int(data.get("first_login", False))
+            role = data.get("role", "standard")
+            if username not in current:
+                conn.execute(
+                    "INSERT INTO users (username, password_hash, first_login, role, imported_hash) VALUES (?, ?, ?, ?, ?)",
+                    (username, file_hash, first_login, role, file_hash)
+                )
+                added += 1
+                continue
+            password_hash, db_first_login, _, imported_hash = current[username]
+            # Ligne du fichier modifiée depuis l'import précédent : mot de passe réinitialisé par l'admin.
+            # Sans import précédent connu (base antérieure), le mot de passe de la base est gardé.
+            if imported_hash is not None and file_hash != imported_hash:
+                password_hash, db_first_login = file_hash, first_login
+            row = (password_hash, db_first_login, role, file_hash)
+            if row != current[username]:
+                conn.execute(
+                    "UPDATE users SET password_hash = ?, first_login = ?, role = ?, imported_hash = ? WHERE username = ?",
+                    row + (username,)
+                )
+                updated += 1
+        removed_users = [u for u in current if u not in users]
+        conn.executemany("DELETE FROM users WHERE username = ?", [(u,) for u in removed_users])
+        return added, updated, len(removed_users)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _row(row) -> Dict:
+        return {"password_hash": row[0], "first_login": bool(row[1]), "role": row[2]}
+
+    def get(self, username: str) -> Optional[Dict]:
+        self._refresh()
+        row = self._conn().execute(
+            "SELECT password_hash, first_login, role FROM users WHERE username = ?", (username,)
+        ).fetchone()
+        return self._row(row) if row else None
+
+    def all(self) -> Dict[str, Dict]:
+        self._refresh()
+        rows = self._conn().execute("SELECT username, password_hash, first_login, role FROM users")
+        return {r[0]: self._row(r[1:]) for r in rows}
+
+    def save_all(self, users: Dict[str, Dict]) -> None:
+        # `imported_hash` (dernier hash lu dans users.txt) est conservé : sans lui, une
+        # réinitialisation de mot de passe faite ensuite dans le fichier ne serait plus appliquée
+        with self._conn() as conn:
+            imported = dict(conn.execute("SELECT username, imported_hash FROM users"))
+            conn.execute("DELETE FROM users")
+            conn.executemany(
+                "INSERT INTO users (username, password_hash, first_login, role, imported_hash) VALUES (?, ?, ?, ?, ?)",
+                [(u, d["password_hash"], int(d.get("first_login", False)), d.get("role", "standard"),
+                  imported.get(u, d["password_hash"]))
+                 for u, d in users.items()]
+            )
+
+    def set_password(self, username: str, old_hash: str, new_hash: str) -> bool:
+        self._refresh()
+        with self._conn() as conn:
+            cur = conn.execute(
+                "UPDATE users SET password_hash = ?, first_login = 0 WHERE username = ? AND password_hash = ?",
+                (new_hash, username, old_hash)
+            )
+            return cur.rowcount == 1
+
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_store():
+    """Store choisi par USERS_BACKEND, créé au premier usage."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            if USERS_BACKEND == "sqlite":
+                _store = SqliteUserStore(USERS_DB, import_from=USER_FILE)
+            else:
+                _store = FileUserStore(USER_FILE)
+        return _store
+
+def load_users() -> Dict[str, Dict]:
+    return get_store().all()
+
+def save_users(users: Dict[str, Dict]) -> None:
+    try:
+        get_store().save_all(users)
+    except Exception as e:
+        print(f"Erreur lors de la sauvegarde des utilisateurs: {e}")
+
+def verify_user(username: str, password: str) -> Tuple[bool, bool]:
+    user = get_store().get(username)
+    if not user:
+        return False, False
+    if hash_password(password) == user["password_hash"]:
+        return True, user.get("first_login", False)
+    return False, False
+
+def get_user_role(username: str) -> str:
+    user = get_store().get(username)
+    if not user:
+        return "standard"
+    return user.get("role", "standard")
+
+def change_password(username: str, old_password: str, new_password: str) -> bool:
+    """
+    Change le mot de passe si l'ancien est correct (vérification et écriture atomiques).
+    """
+    try:
+        return get_store().set_password(username, hash_password(old_password), hash_password(new_password))
+    except Exception as e:
+        print(f"Erreur lors de la sauvegarde des utilisateurs: {e}")
+        return False